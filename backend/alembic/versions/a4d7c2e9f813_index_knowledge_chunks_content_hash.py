@@ -0,0 +1,31 @@
+"""index knowledge chunks content hash
+
+Revision ID: a4d7c2e9f813
+Revises: f2b9d4e6a1c3
+Create Date: 2026-03-11 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d7c2e9f813"
+down_revision: Union[str, Sequence[str], None] = "f2b9d4e6a1c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_knowledge_chunks_content_hash",
+        "knowledge_chunks",
+        ["content_hash"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_knowledge_chunks_content_hash", table_name="knowledge_chunks")
@@ -0,0 +1,34 @@
+"""expire query embedding cache entries
+
+Revision ID: a7d3e9c1f582
+Revises: f4c8d2a7b936
+Create Date: 2026-03-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7d3e9c1f582"
+down_revision: Union[str, Sequence[str], None] = "f4c8d2a7b936"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Expired entries are purged by created_at
+    op.create_index(
+        "ix_query_embedding_cache_created_at",
+        "query_embedding_cache",
+        ["created_at"],
+    )
+    # Keys no longer casefold the query text: old entries would never be hit again
+    op.execute("DELETE FROM query_embedding_cache")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_query_embedding_cache_created_at", table_name="query_embedding_cache")
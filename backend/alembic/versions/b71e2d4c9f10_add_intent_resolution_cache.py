@@ -0,0 +1,48 @@
+"""add intent resolution cache
+
+Revision ID: b71e2d4c9f10
+Revises: 9a13e0f8dce1
+Create Date: 2026-03-02 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b71e2d4c9f10"
+down_revision: Union[str, Sequence[str], None] = "9a13e0f8dce1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "intent_resolution_cache",
+        sa.Column("query_key", sa.String(length=64), nullable=False),
+        sa.Column("cache_key", sa.String(length=64), nullable=False),
+        sa.Column("intent_json", sa.Text(), nullable=False),
+        sa.Column("rag_json", sa.Text(), nullable=False),
+        sa.Column("latency_ms", sa.Float(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("query_key"),
+        sa.UniqueConstraint("cache_key", name="uq_intent_resolution_cache_cache_key"),
+    )
+    op.create_index(
+        "ix_intent_resolution_cache_expires_at",
+        "intent_resolution_cache",
+        ["expires_at"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_intent_resolution_cache_expires_at",
+        table_name="intent_resolution_cache",
+    )
+    op.drop_table("intent_resolution_cache")
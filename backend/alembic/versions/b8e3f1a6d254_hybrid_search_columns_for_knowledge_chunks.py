@@ -0,0 +1,74 @@
+"""hybrid search columns for knowledge chunks
+
+Revision ID: b8e3f1a6d254
+Revises: a4d7c2e9f813
+Create Date: 2026-03-13 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e3f1a6d254"
+down_revision: Union[str, Sequence[str], None] = "a4d7c2e9f813"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UUID_REGEX = (
+    "[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "content_tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', content)", persisted=True),
+        ),
+    )
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "uuid_tokens",
+            postgresql.ARRAY(sa.Text()),
+            nullable=False,
+            server_default="{}",
+        ),
+    )
+    # Backfill; new rows get their tokens from ingestion
+    op.execute(
+        f"""
+        UPDATE knowledge_chunks
+        SET uuid_tokens = ARRAY(
+            SELECT DISTINCT lower(match[1])
+            FROM regexp_matches(content, '({UUID_REGEX})', 'g') AS match
+        )
+        """
+    )
+    op.create_index(
+        "ix_knowledge_chunks_content_tsv",
+        "knowledge_chunks",
+        ["content_tsv"],
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_knowledge_chunks_uuid_tokens",
+        "knowledge_chunks",
+        ["uuid_tokens"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_knowledge_chunks_uuid_tokens", table_name="knowledge_chunks")
+    op.drop_index("ix_knowledge_chunks_content_tsv", table_name="knowledge_chunks")
+    op.drop_column("knowledge_chunks", "uuid_tokens")
+    op.drop_column("knowledge_chunks", "content_tsv")
@@ -0,0 +1,62 @@
+"""notify api key changes
+
+Revision ID: c6f1e8a3d927
+Revises: b8e3f1a6d254
+Create Date: 2026-03-14 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c6f1e8a3d927"
+down_revision: Union[str, Sequence[str], None] = "b8e3f1a6d254"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Payload is the affected key_hash; '' (TRUNCATE) tells listeners to drop everything
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_api_key_changed() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                PERFORM pg_notify('api_key_changed', '');
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('api_key_changed', OLD.key_hash);
+            ELSE
+                PERFORM pg_notify('api_key_changed', NEW.key_hash);
+                IF TG_OP = 'UPDATE' AND OLD.key_hash IS DISTINCT FROM NEW.key_hash THEN
+                    PERFORM pg_notify('api_key_changed', OLD.key_hash);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER api_keys_notify_changed
+        AFTER INSERT OR UPDATE OR DELETE ON api_keys
+        FOR EACH ROW EXECUTE FUNCTION notify_api_key_changed()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER api_keys_notify_truncated
+        AFTER TRUNCATE ON api_keys
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_api_key_changed()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS api_keys_notify_truncated ON api_keys")
+    op.execute("DROP TRIGGER IF EXISTS api_keys_notify_changed ON api_keys")
+    op.execute("DROP FUNCTION IF EXISTS notify_api_key_changed()")
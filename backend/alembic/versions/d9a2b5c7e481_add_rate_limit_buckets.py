@@ -0,0 +1,44 @@
+"""add rate limit buckets
+
+Revision ID: d9a2b5c7e481
+Revises: c6f1e8a3d927
+Create Date: 2026-03-15 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d9a2b5c7e481"
+down_revision: Union[str, Sequence[str], None] = "c6f1e8a3d927"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.Text(), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("granted", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        "ix_rate_limit_buckets_updated_at",
+        "rate_limit_buckets",
+        ["updated_at"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_rate_limit_buckets_updated_at",
+        table_name="rate_limit_buckets",
+    )
+    op.drop_table("rate_limit_buckets")
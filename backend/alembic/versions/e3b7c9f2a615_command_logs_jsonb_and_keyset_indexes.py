@@ -0,0 +1,89 @@
+"""command logs jsonb and keyset indexes
+
+Revision ID: e3b7c9f2a615
+Revises: d9a2b5c7e481
+Create Date: 2026-03-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3b7c9f2a615"
+down_revision: Union[str, Sequence[str], None] = "d9a2b5c7e481"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows that are not valid JSON become {} instead of failing the cast
+    op.execute(
+        """
+        CREATE FUNCTION pg_temp.try_jsonb(value text) RETURNS jsonb AS $$
+        BEGIN
+            RETURN value::jsonb;
+        EXCEPTION WHEN others THEN
+            RETURN '{}'::jsonb;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # One ALTER TABLE, so the table is rewritten once for the type change and
+    # the stored generated columns
+    op.execute(
+        """
+        ALTER TABLE command_logs
+            ALTER COLUMN intent_json TYPE jsonb USING pg_temp.try_jsonb(intent_json),
+            ADD COLUMN action text
+                GENERATED ALWAYS AS (intent_json ->> 'action') STORED,
+            ADD COLUMN provider text
+                GENERATED ALWAYS AS (intent_json #>> '{resolution,provider}') STORED,
+            ADD COLUMN api_key_name text
+                GENERATED ALWAYS AS (intent_json #>> '{resolution,auth,api_key_name}') STORED,
+            ADD COLUMN role text
+                GENERATED ALWAYS AS (intent_json #>> '{resolution,auth,role}') STORED
+        """
+    )
+
+    # Keyset pagination walks (created_at, id) backwards; each filter gets the
+    # same order as a suffix so a filtered page is a single index range
+    op.create_index("ix_command_logs_created_at_id", "command_logs", ["created_at", "id"])
+    op.create_index(
+        "ix_command_logs_action_created_at_id",
+        "command_logs",
+        ["action", "created_at", "id"],
+    )
+    op.create_index(
+        "ix_command_logs_status_created_at_id",
+        "command_logs",
+        ["status", "created_at", "id"],
+    )
+    # Also serves the api_keys foreign key
+    op.create_index(
+        "ix_command_logs_api_key_id_created_at_id",
+        "command_logs",
+        ["api_key_id", "created_at", "id"],
+    )
+    op.drop_index("ix_command_logs_api_key_id", table_name="command_logs")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_command_logs_api_key_id", "command_logs", ["api_key_id"])
+    op.drop_index("ix_command_logs_api_key_id_created_at_id", table_name="command_logs")
+    op.drop_index("ix_command_logs_status_created_at_id", table_name="command_logs")
+    op.drop_index("ix_command_logs_action_created_at_id", table_name="command_logs")
+    op.drop_index("ix_command_logs_created_at_id", table_name="command_logs")
+    op.execute(
+        """
+        ALTER TABLE command_logs
+            DROP COLUMN role,
+            DROP COLUMN api_key_name,
+            DROP COLUMN provider,
+            DROP COLUMN action,
+            ALTER COLUMN intent_json TYPE text USING intent_json::text
+        """
+    )
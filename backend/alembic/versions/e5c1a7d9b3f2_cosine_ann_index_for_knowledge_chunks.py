@@ -0,0 +1,42 @@
+"""cosine ann index for knowledge chunks
+
+Revision ID: e5c1a7d9b3f2
+Revises: d3a8f61b2c47
+Create Date: 2026-03-06 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5c1a7d9b3f2"
+down_revision: Union[str, Sequence[str], None] = "d3a8f61b2c47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The original ivfflat index had no operator class (vector_l2_ops) and no
+    # lists, so ORDER BY embedding <=> :q never used it.
+    # Literal defaults keep this revision independent of the environment it
+    # runs in; app.scripts.rebuild_vector_index rebuilds the index with the
+    # deployment's PGVECTOR_* settings.
+    op.execute("DROP INDEX IF EXISTS ix_knowledge_chunks_embedding")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_knowledge_chunks_embedding ON knowledge_chunks "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_knowledge_chunks_embedding")
+    op.create_index(
+        "ix_knowledge_chunks_embedding",
+        "knowledge_chunks",
+        ["embedding"],
+        postgresql_using="ivfflat",
+    )
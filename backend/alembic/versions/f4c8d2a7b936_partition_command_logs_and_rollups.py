@@ -0,0 +1,165 @@
+"""partition command logs and add hourly rollups
+
+Revision ID: f4c8d2a7b936
+Revises: e3b7c9f2a615
+Create Date: 2026-03-17 10:00:00.000000
+
+The slow parts run outside the migration transaction and without blocking
+writes: the (id, created_at) unique index is built CONCURRENTLY and the
+partition bound is proven by a CHECK constraint validated under SHARE UPDATE
+EXCLUSIVE. What is left (renames, creating the parent, ATTACH PARTITION)
+takes an ACCESS EXCLUSIVE lock on command_logs for catalog changes only,
+typically well under a second; commands wait for it rather than fail.
+Downtime is limited to that moment, plus waiting for long transactions
+on command_logs to finish before the lock is granted.
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f4c8d2a7b936"
+down_revision: Union[str, Sequence[str], None] = "e3b7c9f2a615"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = """
+    id varchar(36) NOT NULL,
+    raw_text text NOT NULL,
+    intent_json jsonb NOT NULL,
+    status varchar(32) NOT NULL,
+    api_key_id varchar(36),
+    created_at timestamp without time zone NOT NULL,
+    action text GENERATED ALWAYS AS (intent_json ->> 'action') STORED,
+    provider text GENERATED ALWAYS AS (intent_json #>> '{resolution,provider}') STORED,
+    api_key_name text
+        GENERATED ALWAYS AS (intent_json #>> '{resolution,auth,api_key_name}') STORED,
+    role text GENERATED ALWAYS AS (intent_json #>> '{resolution,auth,role}') STORED
+"""
+
+_INDEXES = {
+    "ix_command_logs_created_at_id": ["created_at", "id"],
+    "ix_command_logs_action_created_at_id": ["action", "created_at", "id"],
+    "ix_command_logs_status_created_at_id": ["status", "created_at", "id"],
+    "ix_command_logs_api_key_id_created_at_id": ["api_key_id", "created_at", "id"],
+}
+
+_COPY_COLUMNS = "id, raw_text, intent_json, status, api_key_id, created_at"
+
+# Proves the legacy table fits its partition bound before ATTACH
+_BOUND_CHECK = "command_logs_legacy_created_at_bound"
+
+
+def _rename_index(name: str, table: str) -> None:
+    op.execute(f"ALTER INDEX {name} RENAME TO {name.replace('command_logs', table, 1)}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The existing table becomes the first partition instead of being copied:
+    # it covers everything up to tomorrow, newer rows go to the partitions
+    # created by the command_logs maintenance task
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    bound = (today + timedelta(days=1)).isoformat(sep=" ")
+
+    with op.get_context().autocommit_block():
+        # A failed earlier run may have left an INVALID index or the constraint
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS command_logs_legacy_id_created_at_key")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY command_logs_legacy_id_created_at_key "
+            "ON command_logs (id, created_at)"
+        )
+        op.execute(f"ALTER TABLE command_logs DROP CONSTRAINT IF EXISTS {_BOUND_CHECK}")
+        # NOT VALID only takes the lock briefly; VALIDATE scans without blocking writes
+        op.execute(
+            f"ALTER TABLE command_logs ADD CONSTRAINT {_BOUND_CHECK} "
+            f"CHECK (created_at < '{bound}') NOT VALID"
+        )
+        op.execute(f"ALTER TABLE command_logs VALIDATE CONSTRAINT {_BOUND_CHECK}")
+
+    op.execute("ALTER TABLE command_logs RENAME TO command_logs_legacy")
+    for name in _INDEXES:
+        _rename_index(name, "command_logs_legacy")
+    # ATTACH only reuses an index backed by a constraint of the same kind:
+    # the new index becomes the primary key in place of the (id) one
+    op.execute("ALTER TABLE command_logs_legacy DROP CONSTRAINT command_logs_pkey")
+    op.execute(
+        "ALTER TABLE command_logs_legacy ADD CONSTRAINT command_logs_legacy_pkey "
+        "PRIMARY KEY USING INDEX command_logs_legacy_id_created_at_key"
+    )
+
+    # The partition key has to be part of the primary key
+    op.execute(
+        f"""
+        CREATE TABLE command_logs (
+            {_COLUMNS},
+            CONSTRAINT command_logs_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT fk_command_logs_api_key_id
+                FOREIGN KEY (api_key_id) REFERENCES api_keys (id)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    for name, columns in _INDEXES.items():
+        op.create_index(name, "command_logs", columns)
+
+    # The legacy indexes match the parent's and are attached as they are;
+    # the validated CHECK spares the scan for rows outside the bound
+    op.execute(
+        "ALTER TABLE command_logs ATTACH PARTITION command_logs_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{bound}')"
+    )
+    op.execute(f"ALTER TABLE command_logs_legacy DROP CONSTRAINT {_BOUND_CHECK}")
+    # Catches rows no partition was created for yet; kept empty by maintenance
+    op.execute("CREATE TABLE command_logs_default PARTITION OF command_logs DEFAULT")
+
+    op.create_table(
+        "command_log_rollups_hourly",
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        # '' stands for NULL: primary key columns cannot be NULL
+        sa.Column("action", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("provider", sa.Text(), nullable=False),
+        sa.Column("mode", sa.Text(), nullable=False),
+        sa.Column("api_key_id", sa.String(length=36), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("bucket", "action", "status", "provider", "mode", "api_key_id"),
+    )
+    op.create_table(
+        "command_log_rollup_state",
+        sa.Column("name", sa.Text(), nullable=False),
+        sa.Column("watermark", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("command_log_rollup_state")
+    op.drop_table("command_log_rollups_hourly")
+
+    op.execute("ALTER TABLE command_logs RENAME TO command_logs_partitioned")
+    op.execute("ALTER INDEX command_logs_pkey RENAME TO command_logs_partitioned_pkey")
+    for name in _INDEXES:
+        _rename_index(name, "command_logs_partitioned")
+    op.execute(
+        f"""
+        CREATE TABLE command_logs (
+            {_COLUMNS},
+            CONSTRAINT command_logs_pkey PRIMARY KEY (id),
+            CONSTRAINT fk_command_logs_api_key_id
+                FOREIGN KEY (api_key_id) REFERENCES api_keys (id)
+        )
+        """
+    )
+    # Detached partitions are not brought back
+    op.execute(
+        f"INSERT INTO command_logs ({_COPY_COLUMNS}) "
+        f"SELECT {_COPY_COLUMNS} FROM command_logs_partitioned"
+    )
+    op.execute("DROP TABLE command_logs_partitioned")
+    for name, columns in _INDEXES.items():
+        op.create_index(name, "command_logs", columns)
@@ -1,9 +1,10 @@
-from fastapi import HTTPException, Request
+from fastapi import Depends, HTTPException, Request
 
+from app.api.dependencies.db import get_unit_of_work
 from app.domain.types.auth import AuthContext
-from app.infra.models.api_key_model import ApiKeyModel
-from app.infra.session import get_session
+from app.infra.unit_of_work import UnitOfWork
 from app.infra.settings import settings
+from app.services.api_key_cache import api_key_cache
 from app.services.api_key_service import hash_api_key
 from app.services.rate_limiter import rate_limiter
 
@@ -18,7 +19,7 @@ def _unauthorized() -> HTTPException:
     )
 
 
-def get_auth_context(request: Request) -> AuthContext:
+async def get_auth_context(request: Request) -> AuthContext:
     if settings.auth_mode != "api_key":
         return AuthContext(
             mode="off",
@@ -33,10 +34,9 @@ def get_auth_context(request: Request) -> AuthContext:
         raise _unauthorized()
 
     key_hash = hash_api_key(header_value)
-    with get_session() as session:
-        api_key = session.query(ApiKeyModel).filter_by(key_hash=key_hash).first()
-
-    if not api_key or not api_key.active:
+    # None for unknown and deactivated keys alike
+    api_key = await api_key_cache.get(key_hash)
+    if api_key is None:
         raise _unauthorized()
 
     return AuthContext(
@@ -48,9 +48,13 @@ def get_auth_context(request: Request) -> AuthContext:
     )
 
 
-def enforce_rate_limit(request: Request) -> AuthContext:
-    auth_context = get_auth_context(request)
-    if not rate_limiter.allow(auth_context.rate_limit_key):
+async def enforce_rate_limit(
+    request: Request,
+    # Opens the request's unit of work: the key lookup and the route share its session
+    unit_of_work: UnitOfWork = Depends(get_unit_of_work),
+) -> AuthContext:
+    auth_context = await get_auth_context(request)
+    if not await rate_limiter.allow(auth_context.rate_limit_key, auth_context.role):
         raise HTTPException(
             status_code=429,
             detail={
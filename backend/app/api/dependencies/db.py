@@ -0,0 +1,9 @@
+from typing import AsyncIterator
+
+from app.infra.unit_of_work import UnitOfWork, unit_of_work
+
+
+async def get_unit_of_work() -> AsyncIterator[UnitOfWork]:
+    # Cached per request by FastAPI: auth and the route share one instance
+    async with unit_of_work() as uow:
+        yield uow
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 
-from app.api.schemas.command import CommandRequest
+from app.api.schemas.command import CommandBatchRequest, CommandRequest
 from app.api.dependencies.auth import enforce_rate_limit
 from app.domain.types.auth import AuthContext
 from app.services.command_service import CommandService
@@ -9,9 +9,18 @@ router = APIRouter(prefix="/commands", tags=["commands"])
 
 
 @router.post("")
-def execute_command(
+async def execute_command(
     command: CommandRequest,
     auth_context: AuthContext = Depends(enforce_rate_limit),
 ):
     service = CommandService()
-    return service.execute(command, auth_context)
+    return await service.execute(command, auth_context)
+
+
+@router.post("/batch")
+async def execute_command_batch(
+    batch: CommandBatchRequest,
+    auth_context: AuthContext = Depends(enforce_rate_limit),
+):
+    service = CommandService()
+    return await service.execute_batch(batch.commands, auth_context)
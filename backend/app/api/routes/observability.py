@@ -1,21 +1,45 @@
-import json
+import base64
+from datetime import datetime, timedelta
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, literal_column, select, tuple_
 
 from app.api.dependencies.auth import enforce_rate_limit
-from app.api.schemas.logs import AssetSummary, CommandLogItem, TaskSummary
+from app.api.schemas.logs import (
+    AssetSummary,
+    CommandLogItem,
+    CommandLogStats,
+    CommandLogStatsRow,
+    TaskSummary,
+)
 from app.domain.types.auth import AuthContext
 from app.infra.models.asset_model import AssetModel
 from app.infra.models.command_log_model import CommandLogModel
+from app.infra.models.command_log_rollup_model import CommandLogRollupModel
 from app.infra.models.task_model import TaskModel
-from app.infra.session import get_session
 from app.infra.settings import settings
+from app.infra.unit_of_work import request_session
+from app.services.command_log_export import (
+    MEDIA_TYPES,
+    SUPPORTED_EXPORT_FORMATS,
+    ExportFilters,
+    export_chunks,
+    parquet_available,
+)
 
 router = APIRouter()
 
 ALLOWED_READONLY_ROLES = {"admin", "runner", "readonly"}
 
+MAX_LOGS_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+STATS_BUCKETS = {"hour", "day"}
+STATS_DIMENSIONS = ("action", "status", "provider", "mode", "api_key_id")
+DEFAULT_STATS_WINDOW = timedelta(hours=24)
+
 
 def _ensure_readonly_access(auth_context: AuthContext) -> None:
     if settings.auth_mode != "api_key":
@@ -31,62 +55,261 @@ def _ensure_readonly_access(auth_context: AuthContext) -> None:
 
 
 @router.get("/command-logs", response_model=list[CommandLogItem], tags=["logs"])
-def list_command_logs(
-    limit: int = 50,
-    offset: int = 0,
+async def list_command_logs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_LOGS_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    action: Optional[str] = None,
+    status: Optional[str] = None,
+    api_key_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
     auth_context: AuthContext = Depends(enforce_rate_limit),
 ):
+    """
+    Newest first. Pass the `X-Next-Cursor` response header back as `cursor`
+    to get the next page; `offset` is still accepted but scans every
+    skipped row. `created_from` is inclusive, `created_to` exclusive.
+    """
     _ensure_readonly_access(auth_context)
 
-    with get_session() as session:
-        logs = (
-            session.execute(
-                select(CommandLogModel)
-                .order_by(CommandLogModel.created_at.desc())
-                .limit(limit)
-                .offset(offset)
-            )
-            .scalars()
-            .all()
+    stmt = select(
+        CommandLogModel.id,
+        CommandLogModel.raw_text,
+        CommandLogModel.status,
+        CommandLogModel.created_at,
+        CommandLogModel.api_key_id,
+        CommandLogModel.intent_json,
+        CommandLogModel.api_key_name,
+        CommandLogModel.role,
+    )
+    if action:
+        stmt = stmt.where(CommandLogModel.action == action)
+    if status:
+        stmt = stmt.where(CommandLogModel.status == status)
+    if api_key_id:
+        stmt = stmt.where(CommandLogModel.api_key_id == api_key_id)
+    if created_from:
+        stmt = stmt.where(CommandLogModel.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(CommandLogModel.created_at < created_to)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        # Row comparison: one range condition on the (created_at, id) index
+        stmt = stmt.where(
+            tuple_(CommandLogModel.created_at, CommandLogModel.id)
+            < tuple_(cursor_created_at, cursor_id)
+        )
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    stmt = stmt.order_by(
+        CommandLogModel.created_at.desc(),
+        CommandLogModel.id.desc(),
+    ).limit(limit)
+
+    async with request_session() as session:
+        rows = (await session.execute(stmt)).all()
+
+    if len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(last.created_at, last.id)
+
+    return [
+        CommandLogItem(
+            id=row.id,
+            raw_text=row.raw_text,
+            status=row.status,
+            created_at=row.created_at,
+            api_key_id=row.api_key_id,
+            intent_json=row.intent_json if isinstance(row.intent_json, dict) else {},
+            api_key_name=row.api_key_name,
+            role=row.role,
         )
+        for row in rows
+    ]
+
+
+def _encode_cursor(created_at: datetime, log_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{log_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
 
-    results: list[CommandLogItem] = []
-    for log in logs:
-        try:
-            intent_json = json.loads(log.intent_json)
-        except json.JSONDecodeError:
-            intent_json = {}
-
-        auth_metadata = {}
-        if isinstance(intent_json, dict):
-            resolution = intent_json.get("resolution")
-            if isinstance(resolution, dict):
-                auth_metadata = resolution.get("auth") or {}
-
-        results.append(
-            CommandLogItem(
-                id=log.id,
-                raw_text=log.raw_text,
-                status=log.status,
-                created_at=log.created_at,
-                api_key_id=log.api_key_id,
-                intent_json=intent_json if isinstance(intent_json, dict) else {},
-                api_key_name=auth_metadata.get("api_key_name"),
-                role=auth_metadata.get("role"),
-            )
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, log_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), log_id
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "error_code": "invalid_cursor",
+                "message": "Cursor is malformed; use the X-Next-Cursor value as returned.",
+            },
+        ) from exc
+
+
+@router.get("/command-logs/stats", response_model=CommandLogStats, tags=["logs"])
+async def command_log_stats(
+    bucket: str = "hour",
+    group_by: Optional[str] = Query(
+        None,
+        description="Comma-separated: action, status, provider, mode, api_key_id",
+    ),
+    action: Optional[str] = None,
+    status: Optional[str] = None,
+    provider: Optional[str] = None,
+    mode: Optional[str] = None,
+    api_key_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    auth_context: AuthContext = Depends(enforce_rate_limit),
+):
+    """
+    Command counts per hour or day from the hourly rollups, never the raw
+    log. Defaults to the last 24 hours; `created_from` is rounded down to
+    the hour. The current hour is refreshed every
+    COMMAND_LOG_ROLLUP_SECONDS, so it can trail the raw log slightly.
+    """
+    _ensure_readonly_access(auth_context)
+
+    if bucket not in STATS_BUCKETS:
+        raise _invalid_stats_param(
+            "invalid_bucket",
+            f"bucket must be one of: {', '.join(sorted(STATS_BUCKETS))}.",
+        )
+    dimensions = [name.strip() for name in (group_by or "").split(",") if name.strip()]
+    unknown = [name for name in dimensions if name not in STATS_DIMENSIONS]
+    if unknown:
+        raise _invalid_stats_param(
+            "invalid_group_by",
+            f"Unknown dimension(s) {', '.join(unknown)}; expected: {', '.join(STATS_DIMENSIONS)}.",
+        )
+    dimensions = list(dict.fromkeys(dimensions))
+
+    created_to = created_to or datetime.utcnow()
+    created_from = created_from or created_to - DEFAULT_STATS_WINDOW
+    created_from = created_from.replace(minute=0, second=0, microsecond=0)
+
+    # Validated above, so inlined: a bound parameter would differ between
+    # SELECT and GROUP BY
+    bucket_column = func.date_trunc(
+        literal_column(f"'{bucket}'"),
+        CommandLogRollupModel.bucket,
+    ).label("bucket")
+    dimension_columns = [getattr(CommandLogRollupModel, name) for name in dimensions]
+    stmt = (
+        select(
+            bucket_column,
+            *dimension_columns,
+            func.sum(CommandLogRollupModel.count).label("count"),
+        )
+        .where(
+            CommandLogRollupModel.bucket >= created_from,
+            CommandLogRollupModel.bucket < created_to,
+        )
+        .group_by(bucket_column, *dimension_columns)
+        .order_by(bucket_column, *dimension_columns)
+    )
+    filters = {
+        "action": action,
+        "status": status,
+        "provider": provider,
+        "mode": mode,
+        "api_key_id": api_key_id,
+    }
+    for name, value in filters.items():
+        if value is not None:
+            stmt = stmt.where(getattr(CommandLogRollupModel, name) == value)
+
+    async with request_session() as session:
+        rows = (await session.execute(stmt)).all()
+
+    items = [
+        CommandLogStatsRow(
+            bucket=row.bucket,
+            count=int(row.count),
+            # Rollups store NULL dimensions as ''
+            **{name: getattr(row, name) or None for name in dimensions},
+        )
+        for row in rows
+    ]
+    return CommandLogStats(
+        bucket=bucket,
+        group_by=dimensions,
+        created_from=created_from,
+        created_to=created_to,
+        total=sum(item.count for item in items),
+        rows=items,
+    )
+
+
+def _invalid_stats_param(error_code: str, message: str) -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail={"error_code": error_code, "message": message},
+    )
+
+
+@router.get("/command-logs/export", tags=["logs"])
+async def export_command_logs(
+    fmt: str = Query("ndjson", alias="format"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    api_key_id: Optional[str] = None,
+    action: Optional[str] = None,
+    status: Optional[str] = None,
+    auth_context: AuthContext = Depends(enforce_rate_limit),
+):
+    """
+    Every matching command log, oldest first, streamed as NDJSON, CSV or
+    Parquet from a server-side cursor: memory use does not grow with the
+    export. A database error mid-stream truncates the download (Parquet
+    files are then missing their footer).
+    """
+    _ensure_readonly_access(auth_context)
+
+    if fmt not in SUPPORTED_EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "error_code": "invalid_format",
+                "message": f"format must be one of: {', '.join(sorted(SUPPORTED_EXPORT_FORMATS))}.",
+            },
+        )
+    if fmt == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=501,
+            detail={
+                "error_code": "parquet_unavailable",
+                "message": "Parquet exports need pyarrow installed on the server.",
+            },
         )
 
-    return results
+    filters = ExportFilters(
+        created_from=created_from,
+        created_to=created_to,
+        api_key_id=api_key_id,
+        action=action,
+        status=status,
+    )
+    return StreamingResponse(
+        export_chunks(fmt, filters),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="command_logs.{fmt}"'},
+    )
 
 
 @router.get("/assets", response_model=list[AssetSummary], tags=["assets"])
-def list_assets(
+async def list_assets(
     auth_context: AuthContext = Depends(enforce_rate_limit),
 ):
     _ensure_readonly_access(auth_context)
-    with get_session() as session:
+    async with request_session() as session:
         assets = (
-            session.execute(select(AssetModel).order_by(AssetModel.name.asc()))
+            (await session.execute(select(AssetModel).order_by(AssetModel.name.asc())))
             .scalars()
             .all()
         )
@@ -95,13 +318,13 @@ def list_assets(
 
 
 @router.get("/tasks", response_model=list[TaskSummary], tags=["tasks"])
-def list_tasks(
+async def list_tasks(
     auth_context: AuthContext = Depends(enforce_rate_limit),
 ):
     _ensure_readonly_access(auth_context)
-    with get_session() as session:
+    async with request_session() as session:
         tasks = (
-            session.execute(select(TaskModel).order_by(TaskModel.created_at.desc()))
+            (await session.execute(select(TaskModel).order_by(TaskModel.created_at.desc())))
             .scalars()
             .all()
         )
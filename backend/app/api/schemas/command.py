@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -7,3 +7,7 @@ class CommandRequest(BaseModel):
     payload: Optional[Dict[str, Any]] = None
     requested_by: str
     raw_text: Optional[str] = None
+
+
+class CommandBatchRequest(BaseModel):
+    commands: List[CommandRequest]
@@ -23,3 +23,23 @@ class AssetSummary(BaseModel):
 class TaskSummary(BaseModel):
     id: str
     title: str
+
+
+class CommandLogStatsRow(BaseModel):
+    bucket: datetime
+    # Only the dimensions in group_by are filled
+    action: Optional[str] = None
+    status: Optional[str] = None
+    provider: Optional[str] = None
+    mode: Optional[str] = None
+    api_key_id: Optional[str] = None
+    count: int
+
+
+class CommandLogStats(BaseModel):
+    bucket: str
+    group_by: list[str]
+    created_from: datetime
+    created_to: datetime
+    total: int
+    rows: list[CommandLogStatsRow]
@@ -1,11 +1,51 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.infra.db import ping_db
+from app.infra.http_client import http_clients
+from app.infra.metrics import metrics_available, render_metrics
+from app.infra.session import ping_db, pool_stats
+from app.infra.settings import settings
+from app.services.api_key_cache import api_key_cache
+from app.services.command_log_maintenance import command_log_maintenance
+from app.services.command_log_writer import command_log_writer
+from app.services.entity_index import entity_index
+from app.services.intent_cache import intent_cache
+from app.services.rag.embedding_cache import embedding_cache
+from app.services.rag.kb_snapshot import kb_cache
+from app.services.rag.vector_index import vector_index
+from app.services.rate_limiter import rate_limiter
 from app.api.routes.commands import router as commands_router
 from app.api.routes.observability import router as observability_router
 
-app = FastAPI(title="CommandLayer AI")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # --- Startup: abre o pool HTTP compartilhado (OpenAI chat + embeddings) ---
+    http_clients.get_async_client()
+    if settings.rag_mode == "vector_local":
+        vector_index.start()
+    if settings.intent_resolution_mode == "hybrid" and settings.entity_resolver_enabled:
+        entity_index.start()
+    if settings.auth_mode == "api_key" and settings.auth_cache_enabled and settings.auth_cache_notify:
+        api_key_cache.start()
+    # Write-behind command logs: replays the local WAL left by a crash, if any
+    await command_log_writer.start()
+    # command_logs partitions, retention and hourly rollups
+    if settings.command_log_maintenance_enabled:
+        command_log_maintenance.start()
+    yield
+    # --- Shutdown ---
+    await command_log_maintenance.stop()
+    await command_log_writer.stop()
+    await api_key_cache.stop()
+    await entity_index.stop()
+    await vector_index.stop()
+    await http_clients.aclose()
+
+
+app = FastAPI(title="CommandLayer AI", lifespan=lifespan)
 
 # --- CORS (necessário para frontend web) ---
 app.add_middleware(
@@ -16,6 +56,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination cursor of /command-logs
+    expose_headers=["X-Next-Cursor"],
 )
 
 # --- Routers ---
@@ -29,8 +71,64 @@ def health():
 
 
 @app.get("/health/db")
-def health_db():
-    ok = ping_db()
+async def health_db():
+    ok = await ping_db()
     if ok:
-        return {"status": "ok", "db": "ok"}
-    return {"status": "degraded", "db": "error"}
+        return {"status": "ok", "db": "ok", "pool": pool_stats()}
+    return {"status": "degraded", "db": "error", "pool": pool_stats()}
+
+
+@app.get("/health/http")
+def health_http():
+    return {"status": "ok", "pool": http_clients.stats()}
+
+
+@app.get("/health/cache")
+def health_cache():
+    return {
+        "status": "ok",
+        "intent": intent_cache.stats(),
+        "embedding": embedding_cache.stats(),
+        "entity_index": entity_index.stats(),
+        "auth": api_key_cache.stats(),
+    }
+
+
+@app.get("/health/rag")
+def health_rag():
+    return {
+        "status": "ok",
+        "mode": settings.rag_mode,
+        "vector_index": vector_index.stats(),
+        "kb_snapshot": kb_cache.stats(),
+    }
+
+
+@app.get("/health/command_log")
+def health_command_log():
+    return {
+        # Rows stuck in the default partition or a failing maintenance run
+        "status": "degraded" if command_log_maintenance.degraded else "ok",
+        "command_log": command_log_writer.stats(),
+        "maintenance": command_log_maintenance.stats(),
+    }
+
+
+@app.get("/health/rate_limit")
+def health_rate_limit():
+    return {"status": "ok", "rate_limit": rate_limiter.stats()}
+
+
+# --- Prometheus ---
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    if not metrics_available():
+        raise HTTPException(
+            status_code=501,
+            detail={
+                "error_code": "metrics_unavailable",
+                "message": "Metrics need prometheus-client installed on the server.",
+            },
+        )
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
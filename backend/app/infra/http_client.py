@@ -0,0 +1,152 @@
+# app/infra/http_client.py
+import threading
+import time
+from typing import Any, Optional
+
+import httpx
+
+from app.infra.settings import settings
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpClientPool:
+    """
+    Process-wide, long-lived httpx clients shared by every outbound call.
+
+    Connections are kept alive between requests so a resolution or a vector
+    retrieval no longer pays a TCP+TLS handshake. Connection setup is traced
+    through httpcore's `trace` extension to report how often it is reused.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._requests = 0
+        self._connections_opened = 0
+        self._handshake_seconds = 0.0
+        self.http2 = settings.http2_enabled and _http2_available()
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None or self._async_client.is_closed:
+            with self._lock:
+                if self._async_client is None or self._async_client.is_closed:
+                    self._async_client = httpx.AsyncClient(
+                        http2=self.http2,
+                        limits=self._limits(),
+                        timeout=settings.openai_timeout_seconds,
+                        event_hooks={"request": [self._async_trace_hook]},
+                    )
+        return self._async_client
+
+    def get_sync_client(self) -> httpx.Client:
+        if self._sync_client is None or self._sync_client.is_closed:
+            with self._lock:
+                if self._sync_client is None or self._sync_client.is_closed:
+                    self._sync_client = httpx.Client(
+                        http2=self.http2,
+                        limits=self._limits(),
+                        timeout=settings.openai_timeout_seconds,
+                        event_hooks={"request": [self._sync_trace_hook]},
+                    )
+        return self._sync_client
+
+    async def aclose(self) -> None:
+        with self._lock:
+            async_client, self._async_client = self._async_client, None
+            sync_client, self._sync_client = self._sync_client, None
+        if async_client is not None:
+            await async_client.aclose()
+        if sync_client is not None:
+            sync_client.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            requests = self._requests
+            opened = self._connections_opened
+            handshake_seconds = self._handshake_seconds
+
+        active = 0
+        idle = 0
+        for client in (self._async_client, self._sync_client):
+            for connection in self._pool_connections(client):
+                if connection.is_idle():
+                    idle += 1
+                else:
+                    active += 1
+
+        reused = max(0, requests - opened)
+        return {
+            "http2": self.http2,
+            "max_connections": settings.http_max_connections,
+            "max_keepalive_connections": settings.http_max_keepalive_connections,
+            "active_connections": active,
+            "idle_connections": idle,
+            "requests": requests,
+            "connections_opened": opened,
+            "reuse_ratio": round(reused / requests, 4) if requests else None,
+            "avg_handshake_ms": (
+                round(handshake_seconds * 1000 / opened, 2) if opened else None
+            ),
+        }
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        )
+
+    @staticmethod
+    def _pool_connections(client) -> list:
+        # httpx does not expose its httpcore pool publicly; stats are best effort
+        transport = getattr(client, "_transport", None) if client else None
+        pool = getattr(transport, "_pool", None)
+        return list(getattr(pool, "connections", []) or [])
+
+    def _record_event(self, event_name: str, started: dict[str, float]) -> None:
+        if event_name.endswith(".send_request_headers.started"):
+            with self._lock:
+                self._requests += 1
+            return
+
+        if event_name == "connection.connect_tcp.started":
+            started["connect"] = time.perf_counter()
+            return
+
+        if event_name in (
+            "connection.connect_tcp.complete",
+            "connection.start_tls.complete",
+        ) and "connect" in started:
+            elapsed = time.perf_counter() - started["connect"]
+            started["connect"] = time.perf_counter()
+            with self._lock:
+                if event_name == "connection.connect_tcp.complete":
+                    self._connections_opened += 1
+                self._handshake_seconds += elapsed
+
+    def _sync_trace_hook(self, request: httpx.Request) -> None:
+        started: dict[str, float] = {}
+
+        def trace(event_name: str, info: dict) -> None:
+            self._record_event(event_name, started)
+
+        request.extensions["trace"] = trace
+
+    async def _async_trace_hook(self, request: httpx.Request) -> None:
+        started: dict[str, float] = {}
+
+        async def trace(event_name: str, info: dict) -> None:
+            self._record_event(event_name, started)
+
+        request.extensions["trace"] = trace
+
+
+http_clients = HttpClientPool()
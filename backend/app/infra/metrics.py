@@ -0,0 +1,148 @@
+# app/infra/metrics.py
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+try:  # optional: /metrics answers 501 without it and every metric is a no-op
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - depends on the environment
+    prometheus_client = None
+    multiprocess = None
+
+# From sub-millisecond stages (validation, regex) up to the LLM timeout
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0,
+)
+COMMAND_LABELS = ("mode", "provider", "action", "status")
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, value: float = 1) -> None:
+        pass
+
+
+def _histogram(name: str, documentation: str, labels: tuple[str, ...]):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Histogram(name, documentation, labels, buckets=LATENCY_BUCKETS)
+
+
+def _counter(name: str, documentation: str, labels: tuple[str, ...]):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Counter(name, documentation, labels)
+
+
+STAGE_SECONDS = _histogram(
+    "commandlayer_stage_seconds",
+    "Time spent in one stage of the command pipeline",
+    ("stage", *COMMAND_LABELS),
+)
+COMMAND_SECONDS = _histogram(
+    "commandlayer_command_seconds",
+    "End-to-end time of a /commands request",
+    COMMAND_LABELS,
+)
+COMMANDS_TOTAL = _counter(
+    "commandlayer_commands_total",
+    "Commands handled, batch items included",
+    COMMAND_LABELS,
+)
+LLM_TOKENS_TOTAL = _counter(
+    "commandlayer_llm_tokens_total",
+    "Tokens reported by the chat completions API",
+    ("model", "kind"),
+)
+LLM_REQUESTS_TOTAL = _counter(
+    "commandlayer_llm_requests_total",
+    "Chat completion calls by outcome",
+    ("model", "outcome"),
+)
+
+
+def metrics_available() -> bool:
+    return prometheus_client is not None
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposition payload and its content type."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several worker processes: aggregate the files they all write to
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+class CommandTimer:
+    """
+    Stage durations of one command. Labels such as the action or the
+    provider are only known once the intent is resolved, so stages are
+    collected first and observed together by `observe()`.
+    """
+
+    def __init__(self, **labels: Optional[str]) -> None:
+        self.started = time.perf_counter()
+        # Summed per stage: a stage entered twice is one observation
+        self.stages: dict[str, float] = {}
+        self.labels = {"mode": "direct", "provider": "direct", "action": "none", "status": "error"}
+        self.label(**labels)
+
+    def label(self, **labels: Optional[str]) -> None:
+        for name, value in labels.items():
+            self.labels[name] = value or "none"
+
+    def add(self, stage_name: str, seconds: float) -> None:
+        self.stages[stage_name] = self.stages.get(stage_name, 0.0) + seconds
+
+    @contextmanager
+    def active(self) -> Iterator["CommandTimer"]:
+        """Makes `stage()` calls further down the stack record into this timer."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def observe(self, duration: bool = True, count: bool = True) -> None:
+        for stage_name, seconds in self.stages.items():
+            STAGE_SECONDS.labels(stage=stage_name, **self.labels).observe(seconds)
+        if duration:
+            COMMAND_SECONDS.labels(**self.labels).observe(time.perf_counter() - self.started)
+        if count:
+            COMMANDS_TOTAL.labels(**self.labels).inc()
+
+
+_current: ContextVar[Optional[CommandTimer]] = ContextVar("command_timer", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times a block into the current command's timer; a no-op outside commands."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def label_command(**labels: Optional[str]) -> None:
+    """Sets labels on the current command's timer; a no-op outside commands."""
+    timer = _current.get()
+    if timer is not None:
+        timer.label(**labels)
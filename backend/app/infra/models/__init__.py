@@ -5,6 +5,14 @@ from app.infra.models.assignment_model import AssignmentModel
 from app.infra.models.command_log_model import CommandLogModel
 from app.infra.models.api_key_model import ApiKeyModel
 from app.infra.models.knowledge_chunk_model import KnowledgeChunkModel
+from app.infra.models.intent_cache_model import IntentCacheEntryModel
+from app.infra.models.query_embedding_cache_model import QueryEmbeddingCacheModel
+from app.infra.models.kb_ingestion_checkpoint_model import KnowledgeIngestionCheckpointModel
+from app.infra.models.rate_limit_bucket_model import RateLimitBucketModel
+from app.infra.models.command_log_rollup_model import (
+    CommandLogRollupModel,
+    CommandLogRollupStateModel,
+)
 
 __all__ = [
     "Base",
@@ -14,4 +22,10 @@ __all__ = [
     "CommandLogModel",
     "ApiKeyModel",
     "KnowledgeChunkModel",
+    "IntentCacheEntryModel",
+    "QueryEmbeddingCacheModel",
+    "KnowledgeIngestionCheckpointModel",
+    "RateLimitBucketModel",
+    "CommandLogRollupModel",
+    "CommandLogRollupStateModel",
 ]
@@ -1,7 +1,9 @@
 from datetime import datetime
+from typing import Any
 import uuid
 
-from sqlalchemy import DateTime, ForeignKey, String, Text
+from sqlalchemy import Computed, DateTime, ForeignKey, Index, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.infra.models.base import Base
@@ -9,6 +11,15 @@ from app.infra.models.base import Base
 
 class CommandLogModel(Base):
     __tablename__ = "command_logs"
+    __table_args__ = (
+        # Keyset pagination (created_at DESC, id DESC), optionally behind a filter
+        Index("ix_command_logs_created_at_id", "created_at", "id"),
+        Index("ix_command_logs_action_created_at_id", "action", "created_at", "id"),
+        Index("ix_command_logs_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_command_logs_api_key_id_created_at_id", "api_key_id", "created_at", "id"),
+        # Range partitions are created and retired by CommandLogMaintenance
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[str] = mapped_column(
         String(36),
@@ -17,15 +28,34 @@ class CommandLogModel(Base):
     )
 
     raw_text: Mapped[str] = mapped_column(Text, nullable=False)
-    intent_json: Mapped[str] = mapped_column(Text, nullable=False)
+    intent_json: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
     status: Mapped[str] = mapped_column(String(32), nullable=False)
     api_key_id: Mapped[str | None] = mapped_column(
         String(36),
         ForeignKey("api_keys.id"),
         nullable=True,
     )
+    # Part of the primary key because it is the partition key
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
-        nullable=False,
+        primary_key=True,
         default=datetime.utcnow,
     )
+
+    # Extracted from intent_json by Postgres, for filtering without parsing JSON
+    action: Mapped[str | None] = mapped_column(
+        Text,
+        Computed("intent_json ->> 'action'", persisted=True),
+    )
+    provider: Mapped[str | None] = mapped_column(
+        Text,
+        Computed("intent_json #>> '{resolution,provider}'", persisted=True),
+    )
+    api_key_name: Mapped[str | None] = mapped_column(
+        Text,
+        Computed("intent_json #>> '{resolution,auth,api_key_name}'", persisted=True),
+    )
+    role: Mapped[str | None] = mapped_column(
+        Text,
+        Computed("intent_json #>> '{resolution,auth,role}'", persisted=True),
+    )
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.infra.models.base import Base
+
+
+class CommandLogRollupModel(Base):
+    """command_logs counts per hour; '' stands for a NULL dimension."""
+
+    __tablename__ = "command_log_rollups_hourly"
+
+    bucket: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    action: Mapped[str] = mapped_column(Text, primary_key=True)
+    status: Mapped[str] = mapped_column(String(32), primary_key=True)
+    provider: Mapped[str] = mapped_column(Text, primary_key=True)
+    mode: Mapped[str] = mapped_column(Text, primary_key=True)
+    api_key_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class CommandLogRollupStateModel(Base):
+    __tablename__ = "command_log_rollup_state"
+
+    name: Mapped[str] = mapped_column(Text, primary_key=True)
+    # Hours before this are final in command_log_rollups_hourly
+    watermark: Mapped[datetime] = mapped_column(DateTime, nullable=False)
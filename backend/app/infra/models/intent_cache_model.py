@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Index, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.infra.models.base import Base
+
+
+class IntentCacheEntryModel(Base):
+    __tablename__ = "intent_resolution_cache"
+    __table_args__ = (
+        UniqueConstraint("cache_key", name="uq_intent_resolution_cache_cache_key"),
+        Index("ix_intent_resolution_cache_expires_at", "expires_at"),
+    )
+
+    query_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    cache_key: Mapped[str] = mapped_column(String(64), nullable=False)
+    intent_json: Mapped[str] = mapped_column(Text, nullable=False)
+    rag_json: Mapped[str] = mapped_column(Text, nullable=False)
+    latency_ms: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+    )
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.infra.models.base import Base
+
+
+class KnowledgeIngestionCheckpointModel(Base):
+    __tablename__ = "kb_ingestion_checkpoints"
+
+    source: Mapped[str] = mapped_column(Text, primary_key=True)
+    file_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Chunker configuration the file was split with; a change forces re-chunking
+    chunker: Mapped[str] = mapped_column(Text, nullable=False)
+    chunk_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
@@ -1,7 +1,8 @@
 from datetime import datetime
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import DateTime, Integer, String, Text, UniqueConstraint
+from sqlalchemy import Computed, DateTime, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.infra.models.base import Base
@@ -16,6 +17,10 @@ class KnowledgeChunkModel(Base):
             "chunk_index",
             name="uq_knowledge_chunks_source_chunk_index",
         ),
+        # Embedding reuse looks vectors up by content
+        Index("ix_knowledge_chunks_content_hash", "content_hash"),
+        Index("ix_knowledge_chunks_content_tsv", "content_tsv", postgresql_using="gin"),
+        Index("ix_knowledge_chunks_uuid_tokens", "uuid_tokens", postgresql_using="gin"),
     )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
@@ -27,6 +32,19 @@ class KnowledgeChunkModel(Base):
         Vector(settings.openai_embeddings_dim),
         nullable=False,
     )
+    # hybrid retrieval: 'simple' config keeps identifiers and pt/en words as-is
+    content_tsv: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', content)", persisted=True),
+        deferred=True,
+    )
+    # Lower-cased UUIDs mentioned in the chunk, filled in by ingestion
+    uuid_tokens: Mapped[list[str]] = mapped_column(
+        ARRAY(Text),
+        nullable=False,
+        default=list,
+        server_default="{}",
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         nullable=False,
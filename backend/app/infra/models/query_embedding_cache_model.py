@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.infra.models.base import Base
+from app.infra.settings import settings
+
+
+class QueryEmbeddingCacheModel(Base):
+    __tablename__ = "query_embedding_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(Text, nullable=False)
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+    embedding: Mapped[list[float]] = mapped_column(
+        Vector(settings.openai_embeddings_dim),
+        nullable=False,
+    )
+    # Entries older than embedding_cache_postgres_ttl_seconds are ignored and purged
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        index=True,
+    )
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.infra.models.base import Base
+
+
+class RateLimitBucketModel(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[str] = mapped_column(Text, primary_key=True)
+    # Tokens left as of updated_at; refilled lazily by the next lease
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    # Tokens handed out by the last lease (returned by the upsert)
+    granted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
@@ -1,11 +1,142 @@
 # app/infra/session.py
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 from app.infra.settings import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+
+class PoolStats:
+    """Checkout counters for one engine; survives pool recreation."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": (
+                    round(self.wait_seconds_total / self.checkouts * 1000, 3)
+                    if self.checkouts
+                    else None
+                ),
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+def _timed_pool(base: type, stats: PoolStats) -> type:
+    class TimedPool(base):
+        # Time spent getting a connection: ~0 when one is idle, the connect time
+        # when the pool grows, the queue wait (up to pool_timeout) when exhausted
+        def _do_get(self):
+            started = time.perf_counter()
+            timed_out = False
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                timed_out = True
+                raise
+            finally:
+                stats.record(time.perf_counter() - started, timed_out)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def _engine_options(pool_class: type, stats: PoolStats) -> dict[str, Any]:
+    connect_args: dict[str, Any] = {}
+    if settings.db_pgbouncer:
+        # Transaction pooling hands each transaction a different server connection:
+        # server-side prepared statements would not be found there
+        connect_args["prepare_threshold"] = None
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    if settings.db_statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    return {
+        "poolclass": _timed_pool(pool_class, stats),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+# Scripts and CLI tools; the pool only opens connections once it is used
+sync_pool_stats = PoolStats()
+engine = create_engine(settings.database_url, **_engine_options(QueuePool, sync_pool_stats))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request path (FastAPI): psycopg 3 serves both the sync and the asyncio dialect
+async_pool_stats = PoolStats()
+async_engine = create_async_engine(
+    settings.database_url,
+    **_engine_options(AsyncAdaptedQueuePool, async_pool_stats),
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 def get_session() -> Session:
     return SessionLocal()
+
+
+def get_async_session() -> AsyncSession:
+    return AsyncSessionLocal()
+
+
+async def ping_db() -> bool:
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+def pool_stats() -> dict[str, Any]:
+    """Pool state of the request-path engine."""
+    pool = async_engine.pool
+    stats: dict[str, Any] = {
+        "mode": "pgbouncer" if settings.db_pgbouncer else "pool",
+        "pool_class": type(pool).__name__,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # Connections beyond pool_size (negative while the pool is still filling)
+                "overflow": pool.overflow(),
+                "max_overflow": settings.db_max_overflow,
+                "timeout_seconds": settings.db_pool_timeout_seconds,
+                "recycle_seconds": settings.db_pool_recycle_seconds,
+                "pre_ping": settings.db_pool_pre_ping,
+            }
+        )
+        stats.update(async_pool_stats.snapshot())
+    return stats
@@ -10,6 +10,19 @@ class Settings(BaseModel):
     db_user: str = os.getenv("DB_USER", "commandlayer")
     db_password: str = os.getenv("DB_PASSWORD", "commandlayer")
     db_name: str = os.getenv("DB_NAME", "commandlayer")
+    # Connection pool (one per engine and worker process)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout_seconds: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+    # Connections older than this are replaced on checkout (beats server/LB idle timeouts)
+    db_pool_recycle_seconds: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    # Extra round trip per checkout; recycling usually makes it unnecessary
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+    # 0 = no limit
+    db_statement_timeout_ms: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    # PgBouncer in transaction mode: no app-side pool, no prepared statements and no
+    # startup options (set statement_timeout on the role instead)
+    db_pgbouncer: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
 
     # OpenAI / LLM
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
@@ -21,24 +34,155 @@ class Settings(BaseModel):
     )
     openai_embeddings_dim: int = int(os.getenv("OPENAI_EMBEDDINGS_DIM", "1536"))
 
+    # Outbound HTTP (shared, pooled clients)
+    http2_enabled: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    http_max_keepalive_connections: int = int(
+        os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    http_keepalive_expiry_seconds: float = float(
+        os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")
+    )
+
     # Intent resolution
     intent_resolution_mode: str = os.getenv("INTENT_RESOLUTION_MODE", "pre_ai")
+    intent_cache_enabled: bool = os.getenv("INTENT_CACHE_ENABLED", "true").lower() == "true"
+    # memory | postgres (postgres = memory tier + shared table across workers)
+    intent_cache_backend: str = os.getenv("INTENT_CACHE_BACKEND", "memory")
+    intent_cache_ttl_seconds: int = int(os.getenv("INTENT_CACHE_TTL_SECONDS", "300"))
+    intent_cache_max_entries: int = int(os.getenv("INTENT_CACHE_MAX_ENTRIES", "10000"))
+    # hybrid: match asset names / task titles locally before calling the LLM
+    entity_resolver_enabled: bool = (
+        os.getenv("ENTITY_RESOLVER_ENABLED", "true").lower() == "true"
+    )
+    entity_index_refresh_seconds: int = int(os.getenv("ENTITY_INDEX_REFRESH_SECONDS", "30"))
+    # Rows have no updated_at, so renames/deactivations are picked up by a periodic full reload
+    entity_index_full_refresh_seconds: int = int(
+        os.getenv("ENTITY_INDEX_FULL_REFRESH_SECONDS", "600")
+    )
+    entity_fuzzy_threshold: float = float(os.getenv("ENTITY_FUZZY_THRESHOLD", "0.88"))
 
     # RAG
     rag_mode: str = os.getenv("RAG_MODE", "off")
     rag_top_k: int = int(os.getenv("RAG_TOP_K", "6"))
     rag_max_chars: int = int(os.getenv("RAG_MAX_CHARS", "4000"))
+    # hybrid: full-text + UUID-token + vector rankings fused with RRF
+    rag_hybrid_candidates: int = int(os.getenv("RAG_HYBRID_CANDIDATES", "50"))
+    rag_hybrid_rrf_k: int = int(os.getenv("RAG_HYBRID_RRF_K", "60"))
+    # vector_local: in-process index over knowledge_chunks
+    rag_local_refresh_seconds: int = int(os.getenv("RAG_LOCAL_REFRESH_SECONDS", "30"))
+    rag_local_hnsw_threshold: int = int(os.getenv("RAG_LOCAL_HNSW_THRESHOLD", "50000"))
+    rag_local_hnsw_m: int = int(os.getenv("RAG_LOCAL_HNSW_M", "16"))
+    rag_local_hnsw_ef_construction: int = int(
+        os.getenv("RAG_LOCAL_HNSW_EF_CONSTRUCTION", "200")
+    )
+    rag_local_hnsw_ef_search: int = int(os.getenv("RAG_LOCAL_HNSW_EF_SEARCH", "64"))
+    # vector: pgvector ANN index on knowledge_chunks.embedding (hnsw | ivfflat)
+    pgvector_index_type: str = os.getenv("PGVECTOR_INDEX_TYPE", "hnsw")
+    pgvector_hnsw_m: int = int(os.getenv("PGVECTOR_HNSW_M", "16"))
+    pgvector_hnsw_ef_construction: int = int(
+        os.getenv("PGVECTOR_HNSW_EF_CONSTRUCTION", "64")
+    )
+    pgvector_hnsw_ef_search: int = int(os.getenv("PGVECTOR_HNSW_EF_SEARCH", "40"))
+    pgvector_ivfflat_lists: int = int(os.getenv("PGVECTOR_IVFFLAT_LISTS", "100"))
+    pgvector_ivfflat_probes: int = int(os.getenv("PGVECTOR_IVFFLAT_PROBES", "10"))
     knowledge_base_path: str = os.getenv(
         "KNOWLEDGE_BASE_PATH",
         "/app/knowledge_base",
     )
     kb_chunk_size: int = int(os.getenv("KB_CHUNK_SIZE", "800"))
     kb_chunk_overlap: int = int(os.getenv("KB_CHUNK_OVERLAP", "120"))
+    # fixed (character windows, KB_CHUNK_SIZE/OVERLAP) | markdown (structure-aware, token budget)
+    # | cdc (content-defined boundaries, ~KB_CHUNK_SIZE chars; edits only re-chunk locally)
+    kb_chunker: str = os.getenv("KB_CHUNKER", "fixed")
+    kb_chunk_tokens: int = int(os.getenv("KB_CHUNK_TOKENS", "200"))
+    # markdown: a heading only closes the current chunk once it holds this many tokens
+    kb_chunk_min_tokens: int = int(os.getenv("KB_CHUNK_MIN_TOKENS", "40"))
+    # Ingestion: embedding requests are sized by an estimated token budget
+    kb_embed_batch_tokens: int = int(os.getenv("KB_EMBED_BATCH_TOKENS", "50000"))
+    kb_embed_batch_max_items: int = int(os.getenv("KB_EMBED_BATCH_MAX_ITEMS", "256"))
+    kb_embed_concurrency: int = int(os.getenv("KB_EMBED_CONCURRENCY", "4"))
+    kb_embed_max_retries: int = int(os.getenv("KB_EMBED_MAX_RETRIES", "5"))
+    kb_embed_backoff_seconds: float = float(os.getenv("KB_EMBED_BACKOFF_SECONDS", "1"))
+    kb_embed_backoff_max_seconds: float = float(
+        os.getenv("KB_EMBED_BACKOFF_MAX_SECONDS", "30")
+    )
+    # lite: loaded KB snapshot, re-stat'ed at most every N seconds (or on inotify events)
+    kb_snapshot_check_seconds: float = float(os.getenv("KB_SNAPSHOT_CHECK_SECONDS", "5"))
+    kb_snapshot_inotify: bool = os.getenv("KB_SNAPSHOT_INOTIFY", "true").lower() == "true"
+    embedding_cache_enabled: bool = (
+        os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    )
+    # memory | postgres (postgres = memory tier + persistent table)
+    embedding_cache_backend: str = os.getenv("EMBEDDING_CACHE_BACKEND", "memory")
+    embedding_cache_max_entries: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2000"))
+    embedding_cache_ttl_seconds: int = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+    # Lifetime of the postgres tier's rows; expired ones are purged by the workers
+    embedding_cache_postgres_ttl_seconds: int = int(
+        os.getenv("EMBEDDING_CACHE_POSTGRES_TTL_SECONDS", "604800")
+    )
     
       # Auth
     auth_mode: str = os.getenv("AUTH_MODE", "off")
     auth_header_name: str = os.getenv("AUTH_HEADER_NAME", "X-API-Key")
     rate_limit_per_minute: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    # Per-role overrides of RATE_LIMIT_PER_MINUTE, e.g. "admin=600,runner=120,readonly=60"
+    rate_limit_role_limits: str = os.getenv("RATE_LIMIT_ROLE_LIMITS", "")
+    # memory (per process) | postgres (shared across workers and hosts)
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    rate_limit_stripes: int = int(os.getenv("RATE_LIMIT_STRIPES", "64"))
+    rate_limit_evict_seconds: int = int(os.getenv("RATE_LIMIT_EVICT_SECONDS", "60"))
+    # postgres: tokens taken from the shared bucket per round trip, and how long a
+    # worker may spend them; unspent tokens are dropped (never over the limit)
+    rate_limit_lease_size: int = int(os.getenv("RATE_LIMIT_LEASE_SIZE", "5"))
+    rate_limit_lease_seconds: float = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "2"))
+    # API-key lookups: cached per key hash; unknown hashes are cached briefly too
+    auth_cache_enabled: bool = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+    auth_cache_ttl_seconds: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    auth_cache_negative_ttl_seconds: int = int(
+        os.getenv("AUTH_CACHE_NEGATIVE_TTL_SECONDS", "10")
+    )
+    auth_cache_max_entries: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    # LISTEN on the api_keys change channel to evict entries as soon as a key changes;
+    # without it (e.g. PgBouncer in transaction mode) the TTL bounds staleness
+    auth_cache_notify: bool = os.getenv("AUTH_CACHE_NOTIFY", "true").lower() == "true"
+
+    # Commands
+    command_batch_max_size: int = int(os.getenv("COMMAND_BATCH_MAX_SIZE", "1000"))
+    # command_logs writes: sync (same transaction as the command) | async (write-behind
+    # queue, lost on crash) | async_wal (write-behind + local WAL replayed on startup)
+    command_log_mode: str = os.getenv("COMMAND_LOG_MODE", "sync")
+    command_log_queue_size: int = int(os.getenv("COMMAND_LOG_QUEUE_SIZE", "10000"))
+    command_log_batch_size: int = int(os.getenv("COMMAND_LOG_BATCH_SIZE", "500"))
+    command_log_flush_seconds: float = float(os.getenv("COMMAND_LOG_FLUSH_SECONDS", "0.5"))
+    # Each process writes to (and flocks) a subdirectory of its own; subdirectories
+    # whose lock is free at startup are replayed
+    command_log_wal_dir: str = os.getenv("COMMAND_LOG_WAL_DIR", "/app/data/command_log_wal")
+    # fsync each WAL append: survives power loss, not just a process crash
+    command_log_wal_fsync: bool = os.getenv("COMMAND_LOG_WAL_FSYNC", "false").lower() == "true"
+    # Rows the database rejects for good (constraint or data errors) are
+    # appended here as JSON lines instead of being retried
+    command_log_reject_file: str = os.getenv(
+        "COMMAND_LOG_REJECT_FILE", "/app/data/command_log_rejected.jsonl"
+    )
+    # command_logs range partitions: day | month, created this many periods ahead
+    command_log_partition_interval: str = os.getenv("COMMAND_LOG_PARTITION_INTERVAL", "month")
+    command_log_partitions_ahead: int = int(os.getenv("COMMAND_LOG_PARTITIONS_AHEAD", "2"))
+    # Partitions entirely older than this are retired (0 = keep everything);
+    # detach leaves them as plain tables for archiving, drop deletes them
+    command_log_retention_days: int = int(os.getenv("COMMAND_LOG_RETENTION_DAYS", "0"))
+    command_log_retention_action: str = os.getenv("COMMAND_LOG_RETENTION_ACTION", "detach")
+    command_log_maintenance_enabled: bool = (
+        os.getenv("COMMAND_LOG_MAINTENANCE_ENABLED", "true").lower() == "true"
+    )
+    command_log_maintenance_seconds: int = int(
+        os.getenv("COMMAND_LOG_MAINTENANCE_SECONDS", "3600")
+    )
+    command_log_rollup_seconds: int = int(os.getenv("COMMAND_LOG_ROLLUP_SECONDS", "60"))
+    # Hours are re-counted until this long after they end (late write-behind rows)
+    command_log_rollup_lag_seconds: int = int(os.getenv("COMMAND_LOG_ROLLUP_LAG_SECONDS", "300"))
+    # Rows fetched per server-side cursor round trip by /command-logs/export
+    command_log_export_batch_size: int = int(os.getenv("COMMAND_LOG_EXPORT_BATCH_SIZE", "1000"))
 
     @property
     def database_url(self) -> str:
@@ -0,0 +1,89 @@
+# app/infra/unit_of_work.py
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infra.session import get_async_session
+
+_current: ContextVar[Optional["UnitOfWork"]] = ContextVar("unit_of_work", default=None)
+
+
+class UnitOfWork:
+    """
+    One AsyncSession shared by everything a request does in the database
+    (API-key lookup, retrieval, the command itself and its log row).
+
+    The session checks a connection out on first use. `release()` ends the
+    current transaction so the connection goes back to the pool during
+    database-free work such as the LLM call; the next statement checks one
+    out again.
+    """
+
+    def __init__(self) -> None:
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = get_async_session()
+        return self._session
+
+    async def release(self) -> None:
+        if self._session is not None and self._session.in_transaction():
+            await self._session.commit()
+
+    async def commit(self) -> None:
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[UnitOfWork]:
+    uow = UnitOfWork()
+    token = _current.set(uow)
+    try:
+        yield uow
+    finally:
+        _current.reset(token)
+        # Anything not committed explicitly is rolled back here
+        await uow.close()
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    return _current.get()
+
+
+@asynccontextmanager
+async def request_session(release: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    The request's shared session inside a unit of work, otherwise a
+    short-lived session of its own (background tasks, scripts).
+
+    `release=True` is for reads whose results are fully fetched inside the
+    block: the shared connection goes back to the pool right after it.
+    """
+    uow = _current.get()
+    if uow is None:
+        async with get_async_session() as session:
+            yield session
+        return
+
+    try:
+        yield uow.session
+    except Exception:
+        # A failed statement aborts the shared transaction: reset it so the
+        # rest of the request can keep using the session
+        await uow.rollback()
+        raise
+    if release:
+        await uow.release()
@@ -0,0 +1,157 @@
+"""
+Compare the knowledge-base chunkers on the corpus in KNOWLEDGE_BASE_PATH.
+
+For each chunker reports chunk count, token sizes, embedding tokens/cost,
+how many UUID occurrences end up cut across chunks and, unless --no-embed is
+given, the retrieval hit rate@k: the share of queries whose top-k chunks
+contain the expected text.
+
+Queries come from --queries (JSONL with "query" and "expect" keys) or, by
+default, from every corpus line that mentions a UUID: the line without the
+UUID is the query and the UUID is the expected text.
+
+    docker compose exec backend python -m app.scripts.bench_chunker --k 6
+"""
+import argparse
+import json
+import re
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+from app.infra.settings import settings
+from app.services.llm.openai_embeddings_client import OpenAIEmbeddingsClient
+from app.services.rag.chunker import (
+    SUPPORTED_CHUNKERS,
+    count_tokens,
+    iter_markdown_files,
+    read_markdown_file,
+    split_content,
+)
+from app.services.rag.kb_snapshot import UUID_PATTERN
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark knowledge-base chunkers")
+    parser.add_argument("--path", default=settings.knowledge_base_path)
+    parser.add_argument(
+        "--chunkers",
+        default="fixed,markdown",
+        help=f"Comma-separated chunkers ({', '.join(sorted(SUPPORTED_CHUNKERS))})",
+    )
+    parser.add_argument("--k", type=int, default=settings.rag_top_k)
+    parser.add_argument("--queries", type=Path, default=None)
+    parser.add_argument(
+        "--price-per-million",
+        type=float,
+        default=0.02,
+        help="Embedding price in USD per 1M tokens",
+    )
+    parser.add_argument("--no-embed", action="store_true", help="Skip the retrieval hit rate")
+    return parser.parse_args()
+
+
+def load_corpus(path: Path) -> dict[str, str]:
+    corpus = {}
+    for file_path in iter_markdown_files(path):
+        content = read_markdown_file(file_path)
+        if content is not None:
+            corpus[file_path.name] = content
+    return corpus
+
+
+def load_queries(path: Path | None, corpus: dict[str, str]) -> list[tuple[str, str]]:
+    if path is not None:
+        queries = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                row = json.loads(line)
+                queries.append((row["query"], row["expect"]))
+        return queries
+
+    queries = []
+    for content in corpus.values():
+        for line in content.splitlines():
+            for match in UUID_PATTERN.finditer(line):
+                query = re.sub(r"\s+", " ", UUID_PATTERN.sub(" ", line)).strip(" -|*")
+                if query:
+                    queries.append((query, match.group(0)))
+    return queries
+
+
+def split_uuids(corpus: dict[str, str], chunks: dict[str, list[str]]) -> int:
+    # UUID occurrences per file minus the ones found whole inside some chunk
+    missing = 0
+    for name, content in corpus.items():
+        whole = {value for chunk in chunks[name] for value in UUID_PATTERN.findall(chunk)}
+        missing += sum(1 for value in set(UUID_PATTERN.findall(content)) if value not in whole)
+    return missing
+
+
+def embed(client: OpenAIEmbeddingsClient, texts: list[str]) -> np.ndarray:
+    vectors: list[list[float]] = []
+    step = max(1, settings.kb_embed_batch_max_items)
+    for start in range(0, len(texts), step):
+        vectors.extend(client.embed_texts_strict(texts[start:start + step]))
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def hit_rate(
+    client: OpenAIEmbeddingsClient,
+    chunks: list[str],
+    queries: list[tuple[str, str]],
+    query_matrix: np.ndarray,
+    k: int,
+) -> float:
+    chunk_matrix = embed(client, chunks)
+    scores = query_matrix @ chunk_matrix.T
+    hits = 0
+    for row, (_, expect) in zip(scores, queries):
+        top = np.argsort(-row)[:k]
+        hits += any(expect in chunks[index] for index in top)
+    return hits / max(1, len(queries))
+
+
+def main() -> None:
+    args = parse_args()
+    corpus = load_corpus(Path(args.path))
+    if not corpus:
+        print(f"No Markdown files under {args.path}")
+        return
+
+    chunkers = [value.strip() for value in args.chunkers.split(",") if value.strip()]
+    queries = load_queries(args.queries, corpus)
+
+    client = None
+    query_matrix = None
+    if not args.no_embed and queries:
+        client = OpenAIEmbeddingsClient()
+        query_matrix = embed(client, [query for query, _ in queries])
+
+    print(f"files={len(corpus)} queries={len(queries)} k={args.k}")
+    print(
+        f"{'chunker':>9} {'chunks':>7} {'avg_tok':>8} {'max_tok':>8} {'embed_tok':>10} "
+        f"{'cost_usd':>9} {'uuid_cut':>9} {'hit@k':>7}"
+    )
+    for chunker in chunkers:
+        per_file = {name: list(split_content(content, chunker)) for name, content in corpus.items()}
+        chunks = [chunk for values in per_file.values() for chunk in values]
+        tokens = [count_tokens(chunk) for chunk in chunks]
+        total_tokens = sum(tokens)
+
+        rate = "-"
+        if client is not None and chunks:
+            rate = f"{hit_rate(client, chunks, queries, query_matrix, args.k):.3f}"
+
+        print(
+            f"{chunker:>9} {len(chunks):>7} "
+            f"{statistics.mean(tokens) if tokens else 0:>8.1f} {max(tokens, default=0):>8} "
+            f"{total_tokens:>10} {total_tokens / 1_000_000 * args.price_per_million:>9.5f} "
+            f"{split_uuids(corpus, per_file):>9} {rate:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Micro-benchmark of command parsing on multi-KB inputs.
+
+Compares the previous pre-AI extraction (the lazy ASSIGN regex followed by
+separate asset_id/task_id scans, plus the retriever's UUID findall) with a
+single `tokenize` pass and a grammar match, on benign and adversarial text.
+`--check` instead verifies that both extract the same task_id/asset_id.
+
+    docker compose exec backend python -m app.scripts.bench_command_grammar --sizes 1,4,16,64
+    docker compose exec backend python -m app.scripts.bench_command_grammar --check
+"""
+import argparse
+import re
+import statistics
+import time
+import uuid
+
+from app.services.command_grammar import command_grammar, tokenize
+
+UUID = r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+LEGACY_ASSET_ID = re.compile(rf"asset_id\s*[:=]\s*(?P<asset_id>{UUID})", re.IGNORECASE)
+LEGACY_TASK_ID = re.compile(rf"task_id\s*[:=]\s*(?P<task_id>{UUID})", re.IGNORECASE)
+LEGACY_ASSIGN = re.compile(
+    rf"(?:assign|atribuir)\s+task\s+(?P<task_id>{UUID}).*?(?:to|ao)\s+asset\s+(?P<asset_id>{UUID})",
+    re.IGNORECASE,
+)
+LEGACY_UUID = re.compile(UUID)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark command text parsing")
+    parser.add_argument("--sizes", default="1,4,16,64", help="Input sizes in KB")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Compare extracted ids with the legacy regexes instead of timing",
+    )
+    return parser.parse_args()
+
+
+def legacy(raw_text: str) -> None:
+    if not LEGACY_ASSIGN.search(raw_text):
+        LEGACY_ASSET_ID.search(raw_text)
+        LEGACY_TASK_ID.search(raw_text)
+    LEGACY_UUID.findall(raw_text)
+
+
+def single_pass(raw_text: str) -> None:
+    command_grammar.match(tokenize(raw_text))
+
+
+def legacy_ids(raw_text: str) -> dict[str, str]:
+    assign_match = LEGACY_ASSIGN.search(raw_text)
+    if assign_match:
+        return assign_match.groupdict()
+    ids = {}
+    for field_name, regex in (("asset_id", LEGACY_ASSET_ID), ("task_id", LEGACY_TASK_ID)):
+        match = regex.search(raw_text)
+        if match:
+            ids[field_name] = match.group(field_name)
+    return ids
+
+
+def single_pass_ids(raw_text: str) -> dict[str, str]:
+    match = command_grammar.match(tokenize(raw_text))
+    return dict(match.payload) if match else {}
+
+
+def parity_inputs() -> list[str]:
+    task_id, asset_id = str(uuid.uuid4()), str(uuid.uuid4())
+    return [
+        f"assign task {task_id} to asset {asset_id}",
+        f"Please do this: assign task {task_id} to asset {asset_id}",
+        f"Note: ASSIGN TASK {task_id.upper()} now, then to asset {asset_id}",
+        f"atribuir task {task_id} ao asset {asset_id}",
+        f"status: broken, assign task {task_id} to asset {asset_id}",
+        f"asset_id: {asset_id} task_id={task_id}",
+        f"task_id = {task_id}\nasset_id:{asset_id}",
+        f"asset_id: {asset_id}, owner: maintenance",
+        f"task_id: pending, asset_id: {asset_id}",
+        f"assign task {task_id} to asset_id: {asset_id}",
+        f"assign task {task_id} to asset later",
+        "status: broken",
+        "assign task to asset",
+        "",
+    ]
+
+
+def check_parity() -> int:
+    mismatches = 0
+    for raw_text in parity_inputs():
+        expected, actual = legacy_ids(raw_text), single_pass_ids(raw_text)
+        if expected != actual:
+            mismatches += 1
+            print(f"MISMATCH {raw_text!r}: legacy={expected} single_pass={actual}")
+    print(f"{len(parity_inputs())} inputs, {mismatches} mismatches")
+    return mismatches
+
+
+def build_inputs(size: int) -> dict[str, str]:
+    task_id, asset_id = str(uuid.uuid4()), str(uuid.uuid4())
+
+    def fill(unit: str) -> str:
+        return (unit * (size // len(unit) + 1))[:size]
+
+    return {
+        "benign": fill("please check the pump schedule before the shift ends ")
+        + f" assign task {task_id} to asset {asset_id}",
+        # Every "assign task <uuid>" restarts the lazy scan to the end of the text
+        "adversarial": fill(f"assign task {task_id} "),
+        "uuids": fill(f"{uuid.uuid4()} asset_id: x "),
+    }
+
+
+def measure(function, raw_text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(raw_text)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    args = parse_args()
+    if args.check:
+        raise SystemExit(1 if check_parity() else 0)
+
+    print(f"{'size_kb':>8} {'input':>12} {'legacy_us':>12} {'single_us':>12} {'speedup':>8}")
+    for size_kb in (int(value) for value in args.sizes.split(",")):
+        for name, raw_text in build_inputs(size_kb * 1024).items():
+            legacy_us = measure(legacy, raw_text, args.repeat)
+            single_us = measure(single_pass, raw_text, args.repeat)
+            print(
+                f"{size_kb:>8} {name:>12} {legacy_us:>12.1f} {single_us:>12.1f} "
+                f"{legacy_us / max(single_us, 1e-9):>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
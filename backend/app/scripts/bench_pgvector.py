@@ -0,0 +1,180 @@
+"""
+Recall@k and latency of the pgvector ANN index against exact search.
+
+Loads synthetic, clustered unit vectors into a scratch table (`bench_vectors`)
+in growing steps and, at each size, compares exact cosine search (index scans
+disabled) with HNSW and/or IVFFlat built from the current PGVECTOR_* settings.
+
+    docker compose exec backend python -m app.scripts.bench_pgvector \
+        --sizes 10000,100000,1000000 --dim 1536 --queries 200 --k 6
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import psycopg
+
+from app.infra.settings import settings
+from app.services.rag.pgvector_index import (
+    SUPPORTED_INDEX_TYPES,
+    create_index_sql,
+    drop_index_sql,
+    search_tuning_sql,
+)
+
+TABLE = "bench_vectors"
+INDEX = "ix_bench_vectors_embedding"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark pgvector ANN recall and latency")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=settings.openai_embeddings_dim)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.rag_top_k)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument(
+        "--types",
+        default="hnsw,ivfflat",
+        help=f"Comma-separated index types ({', '.join(sorted(SUPPORTED_INDEX_TYPES))})",
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch table")
+    return parser.parse_args()
+
+
+def to_vector_text(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{value:.6f}" for value in vector) + "]"
+
+
+def sample(rng: np.random.Generator, centers: np.ndarray, count: int) -> np.ndarray:
+    labels = rng.integers(0, len(centers), size=count)
+    noise = rng.standard_normal((count, centers.shape[1])).astype(np.float32) * 0.35
+    vectors = centers[labels] + noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_rows(conn, rng, centers, start: int, stop: int) -> None:
+    batch_size = 10_000
+    with conn.cursor() as cur:
+        for offset in range(start, stop, batch_size):
+            count = min(batch_size, stop - offset)
+            vectors = sample(rng, centers, count)
+            with cur.copy(f"COPY {TABLE} (id, embedding) FROM STDIN") as copy:
+                for position, vector in enumerate(vectors):
+                    copy.write_row((offset + position, to_vector_text(vector)))
+    conn.commit()
+
+
+def run_queries(conn, queries: list[str], k: int, setup: list[str]) -> tuple[list[list[int]], list[float]]:
+    results: list[list[int]] = []
+    latencies: list[float] = []
+    with conn.cursor() as cur:
+        for query in queries:
+            for statement in setup:
+                cur.execute(statement)
+            started = time.perf_counter()
+            cur.execute(
+                f"SELECT id FROM {TABLE} ORDER BY embedding <=> %s::vector LIMIT %s",
+                (query, k),
+            )
+            rows = cur.fetchall()
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append([row[0] for row in rows])
+            conn.rollback()
+    return results, latencies
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def main() -> None:
+    args = parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    index_types = [value.strip() for value in args.types.split(",") if value.strip()]
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dim)).astype(np.float32)
+    queries = [to_vector_text(vector) for vector in sample(rng, centers, args.queries)]
+
+    url = settings.database_url.replace("postgresql+psycopg://", "postgresql://")
+    with psycopg.connect(url) as conn:
+        with conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cur.execute(
+                f"CREATE TABLE {TABLE} (id bigint PRIMARY KEY, embedding vector({args.dim}) NOT NULL)"
+            )
+        conn.commit()
+
+        print(
+            f"{'rows':>9} {'engine':>8} {'build_s':>8} {'recall@k':>9} "
+            f"{'p50_ms':>8} {'p95_ms':>8}"
+        )
+
+        loaded = 0
+        try:
+            for size in sizes:
+                load_rows(conn, rng, centers, loaded, size)
+                loaded = size
+
+                with conn.cursor() as cur:
+                    cur.execute(drop_index_sql(INDEX))
+                    cur.execute(f"ANALYZE {TABLE}")
+                conn.commit()
+
+                exact, exact_latencies = run_queries(
+                    conn,
+                    queries,
+                    args.k,
+                    ["SET LOCAL enable_indexscan = off"],
+                )
+                print(
+                    f"{size:>9} {'exact':>8} {'-':>8} {1.0:>9.3f} "
+                    f"{statistics.median(exact_latencies):>8.2f} "
+                    f"{percentile(exact_latencies, 95):>8.2f}"
+                )
+
+                for index_type in index_types:
+                    with conn.cursor() as cur:
+                        cur.execute(drop_index_sql(INDEX))
+                        started = time.perf_counter()
+                        cur.execute(
+                            create_index_sql(
+                                table=TABLE,
+                                index_name=INDEX,
+                                index_type=index_type,
+                            )
+                        )
+                        build_seconds = time.perf_counter() - started
+                        cur.execute(f"ANALYZE {TABLE}")
+                    conn.commit()
+
+                    approx, latencies = run_queries(
+                        conn,
+                        queries,
+                        args.k,
+                        search_tuning_sql(index_type),
+                    )
+                    recall = statistics.mean(
+                        len(set(found) & set(truth)) / max(1, len(truth))
+                        for found, truth in zip(approx, exact)
+                    )
+                    print(
+                        f"{size:>9} {index_type:>8} {build_seconds:>8.1f} {recall:>9.3f} "
+                        f"{statistics.median(latencies):>8.2f} "
+                        f"{percentile(latencies, 95):>8.2f}"
+                    )
+        finally:
+            if not args.keep:
+                with conn.cursor() as cur:
+                    cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+                conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from typing import BinaryIO
+
+from app.infra.session import async_engine
+from app.services.command_log_export import (
+    SUPPORTED_EXPORT_FORMATS,
+    ExportFilters,
+    export_chunks,
+    parquet_available,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Stream command_logs to a file as NDJSON, CSV or Parquet"
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(SUPPORTED_EXPORT_FORMATS),
+        default="ndjson",
+    )
+    parser.add_argument(
+        "--from",
+        dest="created_from",
+        type=datetime.fromisoformat,
+        help="Inclusive lower bound on created_at (UTC, ISO 8601)",
+    )
+    parser.add_argument(
+        "--to",
+        dest="created_to",
+        type=datetime.fromisoformat,
+        help="Exclusive upper bound on created_at (UTC, ISO 8601)",
+    )
+    parser.add_argument("--api-key-id", default=None)
+    parser.add_argument("--action", default=None)
+    parser.add_argument("--status", default=None)
+    parser.add_argument("--output", "-o", default="-", help="File path, '-' for stdout")
+    return parser.parse_args()
+
+
+async def export(args: argparse.Namespace, output: BinaryIO) -> int:
+    filters = ExportFilters(
+        created_from=args.created_from,
+        created_to=args.created_to,
+        api_key_id=args.api_key_id,
+        action=args.action,
+        status=args.status,
+    )
+    written = 0
+    try:
+        async for chunk in export_chunks(args.format, filters):
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        await async_engine.dispose()
+    return written
+
+
+def main() -> None:
+    args = parse_args()
+    if args.format == "parquet" and not parquet_available():
+        print("Parquet exports need pyarrow (pip install pyarrow).", file=sys.stderr)
+        raise SystemExit(1)
+
+    if args.output == "-":
+        written = asyncio.run(export(args, sys.stdout.buffer))
+    else:
+        with open(args.output, "wb") as output:
+            written = asyncio.run(export(args, output))
+    print(f"Exported {written} bytes ({args.format})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
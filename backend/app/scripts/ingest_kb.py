@@ -1,19 +1,122 @@
+"""
+Ingest the Markdown knowledge base into `knowledge_chunks`.
+
+    docker compose exec backend python -m app.scripts.ingest_kb --workers 4
+    docker compose exec backend python -m app.scripts.ingest_kb --sources 'runbook-*.md' --dry-run
+
+Files already checkpointed with the same mtime/size/chunker are skipped, so
+re-running after an interruption resumes where the previous run stopped.
+"""
+import argparse
+import os
+import sys
+import time
+
 from app.infra.session import get_session
-from app.services.rag.ingestion import ingest_knowledge_base
+from app.services.rag.ingestion import (
+    IngestionOptions,
+    IngestionSummary,
+    ingest_knowledge_base,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingest the knowledge base")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes used to read, chunk and hash files",
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=[],
+        metavar="PATTERN",
+        help="Only ingest files whose name matches one of these glob patterns",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would change without embedding or writing anything",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore checkpoints and re-read every file",
+    )
+    parser.add_argument(
+        "--progress-seconds",
+        type=float,
+        default=2.0,
+        help="Interval between progress lines on stderr (0 disables them)",
+    )
+    return parser.parse_args()
+
+
+def throughput(summary: IngestionSummary) -> str:
+    elapsed = max(summary.elapsed_seconds, 1e-9)
+    return (
+        f"chunks/s={summary.total / elapsed:.1f} "
+        f"embed_tokens/s={summary.embedded_tokens / elapsed:.1f}"
+    )
+
+
+class ProgressPrinter:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.last_print = 0.0
+
+    def __call__(self, summary: IngestionSummary) -> None:
+        now = time.monotonic()
+        if self.interval <= 0 or now - self.last_print < self.interval:
+            return
+        self.last_print = now
+        print(
+            f"[{summary.elapsed_seconds:7.1f}s] files={summary.files_done}/{summary.files} "
+            f"chunks={summary.total} embedded={summary.inserted + summary.updated} "
+            f"failed={summary.failed} {throughput(summary)}",
+            file=sys.stderr,
+            flush=True,
+        )
 
 
 def main() -> None:
+    args = parse_args()
+    options = IngestionOptions(
+        workers=max(1, args.workers),
+        sources=tuple(args.sources),
+        dry_run=args.dry_run,
+        full=args.full,
+    )
+
     with get_session() as session:
-        summary = ingest_knowledge_base(session)
+        summary = ingest_knowledge_base(
+            session,
+            options,
+            progress=ProgressPrinter(args.progress_seconds),
+        )
 
     print(
-        "KB ingestion complete:",
+        "KB ingestion dry run:" if summary.dry_run else "KB ingestion complete:",
+        f"files={summary.files}",
+        f"files_unchanged={summary.files_unchanged}",
+        f"files_removed={summary.files_removed}",
         f"total={summary.total}",
         f"inserted={summary.inserted}",
         f"updated={summary.updated}",
         f"deleted={summary.deleted}",
         f"skipped={summary.skipped}",
+        f"failed={summary.failed}",
+        f"failed_batches={summary.failed_batches}",
+        f"retries={summary.retries}",
+        f"reused={summary.reused}",
+        f"embed_tokens={summary.embedded_tokens}",
+        f"elapsed_s={summary.elapsed_seconds:.1f}",
+        throughput(summary),
     )
+    if summary.failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
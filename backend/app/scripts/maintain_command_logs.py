@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import json
+
+from app.infra.session import async_engine
+from app.services.command_log_maintenance import command_log_maintenance
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Create upcoming command_logs partitions, retire old ones and refresh "
+            "the hourly rollups (what the API's background task does)"
+        )
+    )
+    parser.add_argument(
+        "--rollups-only",
+        action="store_true",
+        help="Skip partition creation and retention",
+    )
+    return parser.parse_args()
+
+
+async def run(rollups_only: bool) -> dict:
+    try:
+        return await command_log_maintenance.run_once(partitions=not rollups_only)
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    args = parse_args()
+    result = asyncio.run(run(args.rollups_only))
+    print(json.dumps({**result, "stats": command_log_maintenance.stats()}, default=str))
+
+
+if __name__ == "__main__":
+    main()
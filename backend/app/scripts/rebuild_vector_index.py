@@ -0,0 +1,53 @@
+import argparse
+
+from sqlalchemy import text
+
+from app.infra.session import engine
+from app.services.rag.pgvector_index import (
+    INDEX_NAME,
+    SUPPORTED_INDEX_TYPES,
+    create_index_sql,
+    drop_index_sql,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Rebuild the knowledge_chunks ANN index with the current PGVECTOR_* settings "
+            "(migrations create it with the hnsw defaults: m=16, ef_construction=64)"
+        )
+    )
+    parser.add_argument(
+        "--type",
+        choices=sorted(SUPPORTED_INDEX_TYPES),
+        default=None,
+        help="Override PGVECTOR_INDEX_TYPE",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    staging_name = f"{INDEX_NAME}_rebuild"
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(drop_index_sql(staging_name, concurrently=True)))
+        conn.execute(
+            text(
+                create_index_sql(
+                    index_name=staging_name,
+                    index_type=args.type,
+                    concurrently=True,
+                )
+            )
+        )
+        conn.execute(text(drop_index_sql(concurrently=True)))
+        conn.execute(text(f"ALTER INDEX {staging_name} RENAME TO {INDEX_NAME}"))
+
+    print(f"Rebuilt {INDEX_NAME} ({args.type or 'settings'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import psycopg
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+
+from app.infra.models.api_key_model import ApiKeyModel
+from app.infra.settings import settings
+from app.infra.ttl_cache import TTLCache
+from app.infra.unit_of_work import request_session
+
+# Sent by the api_keys trigger; the payload is the key_hash ('' = everything)
+API_KEY_CHANNEL = "api_key_changed"
+
+_RECONNECT_SECONDS = 5
+
+
+@dataclass(frozen=True)
+class CachedApiKey:
+    id: str
+    name: str
+    role: str
+
+
+class ApiKeyCache:
+    """
+    Active API keys by key_hash, so authenticated requests skip the api_keys
+    query.
+
+    Unknown and inactive hashes get their own short-lived cache: brute-force
+    noise is absorbed without pushing real keys out of the positive cache.
+    A listener on `API_KEY_CHANNEL` evicts a hash as soon as its row is
+    inserted, updated or deleted, so a deactivated key stops working right
+    away; the TTLs only bound staleness while the listener is down.
+    """
+
+    def __init__(self) -> None:
+        self._known: TTLCache[CachedApiKey] = TTLCache(
+            settings.auth_cache_max_entries,
+            settings.auth_cache_ttl_seconds,
+        )
+        self._unknown: TTLCache[bool] = TTLCache(
+            settings.auth_cache_max_entries,
+            settings.auth_cache_negative_ttl_seconds,
+        )
+        # Bumped on every invalidation; a lookup that raced with one is not stored
+        self._generation = 0
+        self._task: Optional[asyncio.Task] = None
+        self.listening = False
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.auth_cache_enabled
+
+    async def get(self, key_hash: str) -> Optional[CachedApiKey]:
+        """The active key for `key_hash`, or None when unknown or inactive."""
+        if not self.enabled:
+            return await self._fetch(key_hash)
+
+        cached = self._known.get(key_hash)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        if self._unknown.get(key_hash):
+            self.negative_hits += 1
+            return None
+
+        self.misses += 1
+        generation = self._generation
+        api_key = await self._fetch(key_hash)
+        if generation == self._generation:
+            if api_key is not None:
+                self._known.set(key_hash, api_key)
+            else:
+                self._unknown.set(key_hash, True)
+        return api_key
+
+    def invalidate(self, key_hash: Optional[str] = None) -> None:
+        self._generation += 1
+        self.invalidations += 1
+        if key_hash:
+            self._known.delete(key_hash)
+            self._unknown.delete(key_hash)
+        else:
+            self._known.clear()
+            self._unknown.clear()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._known),
+            "negative_entries": len(self._unknown),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "listening": self.listening,
+            "hit_ratio": (
+                round((self.hits + self.negative_hits) / lookups, 4) if lookups else None
+            ),
+        }
+
+    @staticmethod
+    async def _fetch(key_hash: str) -> Optional[CachedApiKey]:
+        async with request_session() as session:
+            row = (
+                await session.execute(
+                    select(ApiKeyModel.id, ApiKeyModel.name, ApiKeyModel.role).where(
+                        ApiKeyModel.key_hash == key_hash,
+                        ApiKeyModel.active.is_(True),
+                    )
+                )
+            ).first()
+        if row is None:
+            return None
+        return CachedApiKey(id=row.id, name=row.name, role=row.role)
+
+    async def _listen_loop(self) -> None:
+        # psycopg wants a plain libpq URL, not the SQLAlchemy dialect name
+        conninfo = make_url(settings.database_url).set(drivername="postgresql")
+        conninfo = conninfo.render_as_string(hide_password=False)
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    conninfo,
+                    autocommit=True,
+                ) as conn:
+                    await conn.execute(f"LISTEN {API_KEY_CHANNEL}")
+                    # Changes made while nobody was listening were missed
+                    self.invalidate()
+                    self.listening = True
+                    async for notify in conn.notifies():
+                        self.invalidate(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Entries still expire on their TTL; reconnect on the next tick
+                pass
+            finally:
+                self.listening = False
+            await asyncio.sleep(_RECONNECT_SECONDS)
+
+
+api_key_cache = ApiKeyCache()
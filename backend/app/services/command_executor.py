@@ -1,35 +1,170 @@
-from sqlalchemy import select
-from app.infra.models import AssignmentModel
+from datetime import datetime
+from typing import Optional
+import uuid
+
+from sqlalchemy import case, exists, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from app.infra.models import AssignmentModel, CommandLogModel
 
 
 class CommandExecutor:
     @staticmethod
-    def execute(session, action: str, payload: dict):
+    async def execute(session, action: str, payload: dict, log_values: Optional[dict] = None):
+        """
+        Runs one command. With `log_values`, the command_logs row is written
+        by the same statement, its status ("success" | "noop") set from the
+        outcome. Nothing is committed here.
+        """
         if action == "assign_task":
             asset_id = payload["asset_id"]
             task_id = payload["task_id"]
 
-            # 1) Verifica se já existe (idempotência)
-            existing = session.execute(
-                select(AssignmentModel).where(
+            # Um único statement: INSERT idempotente (sem SELECT prévio) + log
+            created = (
+                insert(AssignmentModel)
+                .values(
+                    id=str(uuid.uuid4()),
+                    asset_id=asset_id,
+                    task_id=task_id,
+                    assigned_at=datetime.utcnow(),
+                )
+                .on_conflict_do_nothing(constraint="uq_assignment_asset_task")
+                .returning(AssignmentModel.id)
+                .cte("created")
+            )
+            existing_id = (
+                select(AssignmentModel.id)
+                .where(
                     AssignmentModel.asset_id == asset_id,
                     AssignmentModel.task_id == task_id,
                 )
-            ).scalar_one_or_none()
+                .scalar_subquery()
+            )
+            stmt = select(
+                select(created.c.id).scalar_subquery().label("created_id"),
+                # Same snapshot as the INSERT: only rows that existed before it
+                existing_id.label("existing_id"),
+            )
+            if log_values is not None:
+                stmt = stmt.add_cte(_log_insert(log_values, created))
+
+            row = (await session.execute(stmt)).one()
+            if row.created_id:
+                return {"assignment_id": row.created_id, "already_exists": False}
 
-            if existing:
-                return {"assignment_id": existing.id, "already_exists": True}
+            assignment_id = row.existing_id
+            if assignment_id is None:
+                # Inserted by a concurrent request that committed after our snapshot
+                assignment_id = (
+                    await session.execute(
+                        select(AssignmentModel.id).where(
+                            AssignmentModel.asset_id == asset_id,
+                            AssignmentModel.task_id == task_id,
+                        )
+                    )
+                ).scalar_one()
+            return {"assignment_id": assignment_id, "already_exists": True}
 
-            # 2) Se não existe, cria
-            assignment = AssignmentModel(
-                asset_id=asset_id,
-                task_id=task_id,
+        raise ValueError(f"Unsupported action: {action}")
+
+    @staticmethod
+    async def execute_batch(session, action: str, payloads: list[dict]) -> list[dict]:
+        """
+        Set-based version of `execute` for many payloads of the same action.
+
+        Results are aligned with `payloads` and follow the same semantics as
+        running `execute` sequentially: the first occurrence of a new pair is
+        created, every other occurrence reports `already_exists`.
+        """
+        if not payloads:
+            return []
+
+        if action == "assign_task":
+            pairs = [(payload["asset_id"], payload["task_id"]) for payload in payloads]
+            unique_pairs = list(dict.fromkeys(pairs))
+
+            # 1) Um único INSERT multi-row; conflitos = pares que já existiam
+            now = datetime.utcnow()
+            stmt = (
+                insert(AssignmentModel)
+                .values(
+                    [
+                        {
+                            "id": str(uuid.uuid4()),
+                            "asset_id": asset_id,
+                            "task_id": task_id,
+                            "assigned_at": now,
+                        }
+                        for asset_id, task_id in unique_pairs
+                    ]
+                )
+                .on_conflict_do_nothing(constraint="uq_assignment_asset_task")
+                .returning(
+                    AssignmentModel.id,
+                    AssignmentModel.asset_id,
+                    AssignmentModel.task_id,
+                )
             )
-            session.add(assignment)
+            created: dict[tuple[str, str], str] = {
+                (row.asset_id, row.task_id): row.id
+                for row in await session.execute(stmt)
+            }
+
+            # 2) IDs dos pares existentes, só quando houver algum
+            existing: dict[tuple[str, str], str] = {}
+            conflicted = [pair for pair in unique_pairs if pair not in created]
+            if conflicted:
+                existing = {
+                    (row.asset_id, row.task_id): row.id
+                    for row in await session.execute(
+                        select(
+                            AssignmentModel.id,
+                            AssignmentModel.asset_id,
+                            AssignmentModel.task_id,
+                        ).where(
+                            tuple_(AssignmentModel.asset_id, AssignmentModel.task_id).in_(
+                                conflicted
+                            )
+                        )
+                    )
+                }
 
-            # flush garante que o ID seja gerado antes do commit
-            session.flush()
+            results: list[dict] = []
+            seen: set[tuple[str, str]] = set()
+            for pair in pairs:
+                if pair in created and pair not in seen:
+                    results.append({"assignment_id": created[pair], "already_exists": False})
+                else:
+                    assignment_id = created.get(pair) or existing.get(pair)
+                    results.append({"assignment_id": assignment_id, "already_exists": True})
+                seen.add(pair)
 
-            return {"assignment_id": assignment.id, "already_exists": False}
+            return results
 
         raise ValueError(f"Unsupported action: {action}")
+
+
+def _log_insert(log_values: dict, created):
+    """INSERT into command_logs whose status depends on whether `created` returned a row."""
+    values = {
+        "id": str(uuid.uuid4()),
+        "created_at": datetime.utcnow(),
+        **{key: value for key, value in log_values.items() if key != "status"},
+    }
+    columns = list(values)
+    status = case((exists(select(created.c.id)), "success"), else_="noop")
+    return (
+        insert(CommandLogModel)
+        .from_select(
+            [*columns, "status"],
+            select(
+                *[
+                    literal(values[column], CommandLogModel.__table__.c[column].type)
+                    for column in columns
+                ],
+                status,
+            ),
+        )
+        .cte("logged")
+    )
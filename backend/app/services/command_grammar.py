@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+UUID_PATTERN = r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+
+# One left-to-right scan over the text. Every alternative is bounded or a
+# possessive-style character run, so the cost is linear in the input: no
+# `.*?` and nothing that can backtrack across the whole command.
+# Only a word followed by `:`/`=` and a UUID becomes a key=value pair
+# ("task_id: <uuid>"). Anything else after a colon stays plain words, so
+# "do this: assign task ..." still reads as a command and "status: broken"
+# keeps both terms for full-text search. The optional suffix never makes
+# the engine retry shorter words.
+_TOKEN_REGEX = re.compile(
+    rf"""
+    (?P<uuid>{UUID_PATTERN})\b
+    | (?P<word>\w+)(?:\s*[:=]\s*(?P<kv_uuid>{UUID_PATTERN})\b)?
+    """,
+    re.VERBOSE,
+)
+
+
+class Token(NamedTuple):
+    # word | uuid | kv
+    kind: str
+    # words and keys are lower-cased; uuids (kv values included) keep the input's case
+    value: str
+    key: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ParsedCommand:
+    tokens: Tuple[Token, ...]
+    # In order of appearance, first occurrence only (kv values included)
+    uuids: Tuple[str, ...]
+    # Lower-cased key -> first UUID value
+    key_values: Dict[str, str]
+    words: Tuple[str, ...]
+
+
+def parse_command(raw_text: str) -> ParsedCommand:
+    """
+    Tokenize command text once. Results are memoized, so the resolver and the
+    retriever handling the same request share one parse.
+    """
+    return _parse_cached(raw_text or "")
+
+
+@lru_cache(maxsize=256)
+def _parse_cached(raw_text: str) -> ParsedCommand:
+    return tokenize(raw_text)
+
+
+def tokenize(raw_text: str) -> ParsedCommand:
+    tokens: List[Token] = []
+    uuids: List[str] = []
+    seen_uuids: set[str] = set()
+    key_values: Dict[str, str] = {}
+    words: List[str] = []
+
+    # findall hands back plain group tuples, cheaper than Match objects
+    for uuid_value, word, kv_uuid in _TOKEN_REGEX.findall(raw_text):
+        if not word:
+            tokens.append(Token("uuid", uuid_value))
+            if uuid_value.lower() not in seen_uuids:
+                seen_uuids.add(uuid_value.lower())
+                uuids.append(uuid_value)
+            continue
+
+        word = word.lower()
+        if not kv_uuid:
+            tokens.append(Token("word", word))
+            words.append(word)
+            continue
+
+        tokens.append(Token("kv", kv_uuid, word))
+        key_values.setdefault(word, kv_uuid)
+        if kv_uuid.lower() not in seen_uuids:
+            seen_uuids.add(kv_uuid.lower())
+            uuids.append(kv_uuid)
+
+    return ParsedCommand(
+        tokens=tuple(tokens),
+        uuids=tuple(uuids),
+        key_values=key_values,
+        words=tuple(words),
+    )
+
+
+# --- Action grammar ---------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Literal:
+    """One word token from `words` (lower-case)."""
+
+    words: frozenset
+
+
+@dataclass(frozen=True)
+class Capture:
+    """One UUID token, stored in the payload under `field`."""
+
+    field: str
+
+
+@dataclass(frozen=True)
+class Gap:
+    """Any number of tokens (shortest match)."""
+
+
+Step = Union[Literal, Capture, Gap]
+
+
+def words(*values: str) -> Literal:
+    return Literal(frozenset(value.lower() for value in values))
+
+
+@dataclass(frozen=True)
+class ActionRule:
+    action: str
+    # Token sequences tried in order; the first that matches wins
+    sequences: Tuple[Tuple[Step, ...], ...] = ()
+    # Payload field -> key of a `key=<uuid>` pair, used for fields no sequence filled
+    key_fields: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ActionMatch:
+    action: str
+    payload: Dict[str, str]
+    # sequence | key_value
+    matched_by: str
+
+
+class CommandGrammar:
+    """
+    Registry of action rules evaluated over a `ParsedCommand`.
+
+    Sequences are matched segment by segment (the parts between `Gap`s),
+    each at its earliest position, which finds a match whenever one exists
+    in a single forward pass per segment.
+    """
+
+    def __init__(self) -> None:
+        self._rules: List[ActionRule] = []
+
+    @property
+    def rules(self) -> Tuple[ActionRule, ...]:
+        return tuple(self._rules)
+
+    def register(self, rule: ActionRule) -> None:
+        self._rules.append(rule)
+
+    def match(self, parsed: ParsedCommand) -> Optional[ActionMatch]:
+        """The first rule that fills at least one payload field."""
+        for rule in self._rules:
+            for sequence in rule.sequences:
+                payload = _match_sequence(parsed.tokens, sequence)
+                if payload is not None:
+                    return ActionMatch(rule.action, payload, "sequence")
+
+            payload = {}
+            for field_name, key in rule.key_fields.items():
+                value = parsed.key_values.get(key)
+                if value is not None and _is_uuid(value):
+                    payload[field_name] = value
+            if payload:
+                return ActionMatch(rule.action, payload, "key_value")
+        return None
+
+
+def _split_segments(sequence: Sequence[Step]) -> List[List[Step]]:
+    segments: List[List[Step]] = [[]]
+    for step in sequence:
+        if isinstance(step, Gap):
+            segments.append([])
+        else:
+            segments[-1].append(step)
+    return segments
+
+
+def _match_sequence(
+    tokens: Tuple[Token, ...],
+    sequence: Sequence[Step],
+) -> Optional[Dict[str, str]]:
+    segments = _split_segments(sequence)
+    payload: Dict[str, str] = {}
+    position = 0
+    for index, segment in enumerate(segments):
+        if not segment:
+            continue
+        # Without a leading Gap the first segment may still start anywhere
+        # (search semantics, like re.search)
+        found = None
+        first = segment[0]
+        for start in range(position, len(tokens) - len(segment) + 1):
+            # Cheap check on the first step before matching the whole segment
+            if isinstance(first, Literal) and tokens[start].value not in first.words:
+                continue
+            captured = _match_segment(tokens, start, segment)
+            if captured is not None:
+                found = (start, captured)
+                break
+        if found is None:
+            return None
+        start, captured = found
+        payload.update(captured)
+        position = start + len(segment)
+    return payload
+
+
+def _match_segment(
+    tokens: Tuple[Token, ...],
+    start: int,
+    segment: Sequence[Step],
+) -> Optional[Dict[str, str]]:
+    captured: Dict[str, str] = {}
+    for offset, step in enumerate(segment):
+        token = tokens[start + offset]
+        if isinstance(step, Literal):
+            if token.kind != "word" or token.value not in step.words:
+                return None
+        elif isinstance(step, Capture):
+            if token.kind != "uuid":
+                return None
+            captured[step.field] = token.value
+    return captured
+
+
+_FULL_UUID = re.compile(rf"^{UUID_PATTERN}$")
+
+
+def _is_uuid(value: str) -> bool:
+    return bool(_FULL_UUID.match(value))
+
+
+command_grammar = CommandGrammar()
+
+command_grammar.register(
+    ActionRule(
+        action="assign_task",
+        sequences=(
+            (
+                words("assign", "atribuir"),
+                words("task"),
+                Capture("task_id"),
+                Gap(),
+                words("to", "ao"),
+                words("asset"),
+                Capture("asset_id"),
+            ),
+        ),
+        key_fields={"asset_id": "asset_id", "task_id": "task_id"},
+    )
+)
@@ -0,0 +1,208 @@
+import asyncio
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy import Select, select
+
+from app.infra.models.command_log_model import CommandLogModel
+from app.infra.session import get_async_session
+from app.infra.settings import settings
+
+try:  # optional: Parquet exports
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # pragma: no cover - depends on the environment
+    pyarrow = None
+    parquet = None
+
+SUPPORTED_EXPORT_FORMATS = {"ndjson", "csv", "parquet"}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_COLUMNS = (
+    "id",
+    "created_at",
+    "status",
+    "action",
+    "provider",
+    "api_key_id",
+    "api_key_name",
+    "role",
+    "raw_text",
+    "intent_json",
+)
+
+
+@dataclass(frozen=True)
+class ExportFilters:
+    # created_from inclusive, created_to exclusive
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    api_key_id: Optional[str] = None
+    action: Optional[str] = None
+    status: Optional[str] = None
+
+
+def parquet_available() -> bool:
+    return parquet is not None
+
+
+def export_statement(filters: ExportFilters) -> Select:
+    stmt = select(*(getattr(CommandLogModel, name) for name in EXPORT_COLUMNS))
+    if filters.created_from:
+        stmt = stmt.where(CommandLogModel.created_at >= filters.created_from)
+    if filters.created_to:
+        stmt = stmt.where(CommandLogModel.created_at < filters.created_to)
+    if filters.api_key_id:
+        stmt = stmt.where(CommandLogModel.api_key_id == filters.api_key_id)
+    if filters.action:
+        stmt = stmt.where(CommandLogModel.action == filters.action)
+    if filters.status:
+        stmt = stmt.where(CommandLogModel.status == filters.status)
+    # Oldest first: partitions are read one after the other
+    return stmt.order_by(CommandLogModel.created_at, CommandLogModel.id)
+
+
+async def iter_batches(filters: ExportFilters) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Matching rows, `command_log_export_batch_size` at a time, from a
+    server-side cursor: only one batch is ever held in memory.
+    """
+    batch_size = max(1, settings.command_log_export_batch_size)
+    stmt = export_statement(filters).execution_options(yield_per=batch_size)
+    # A session of its own: the export outlives the request's unit of work
+    async with get_async_session() as session:
+        result = await session.stream(stmt)
+        async for rows in result.partitions():
+            yield [row._asdict() for row in rows]
+
+
+async def export_chunks(fmt: str, filters: ExportFilters) -> AsyncIterator[bytes]:
+    """The export encoded as `fmt`, one chunk per batch of rows."""
+    if fmt not in SUPPORTED_EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "parquet":
+        async for chunk in _parquet_chunks(filters):
+            yield chunk
+        return
+
+    encode = _ndjson_lines if fmt == "ndjson" else _CsvEncoder().encode
+    async for rows in iter_batches(filters):
+        yield encode(rows)
+
+
+def _ndjson_lines(rows: list[dict[str, Any]]) -> bytes:
+    return "".join(
+        json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+class _CsvEncoder:
+    def __init__(self) -> None:
+        self._header_written = False
+
+    def encode(self, rows: list[dict[str, Any]]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not self._header_written:
+            writer.writerow(EXPORT_COLUMNS)
+            self._header_written = True
+        for row in rows:
+            row = {
+                **row,
+                "created_at": row["created_at"].isoformat(),
+                "intent_json": json.dumps(row["intent_json"], ensure_ascii=False),
+            }
+            writer.writerow(row[name] for name in EXPORT_COLUMNS)
+        return buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file for ParquetWriter; `take()` hands over what was written so far."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _parquet_schema():
+    return pyarrow.schema(
+        [
+            ("id", pyarrow.string()),
+            ("created_at", pyarrow.timestamp("us")),
+            ("status", pyarrow.string()),
+            ("action", pyarrow.string()),
+            ("provider", pyarrow.string()),
+            ("api_key_id", pyarrow.string()),
+            ("api_key_name", pyarrow.string()),
+            ("role", pyarrow.string()),
+            ("raw_text", pyarrow.string()),
+            # JSON text; Parquet has no schemaless column type
+            ("intent_json", pyarrow.string()),
+        ]
+    )
+
+
+async def _parquet_chunks(filters: ExportFilters) -> AsyncIterator[bytes]:
+    if parquet is None:
+        raise RuntimeError("Parquet exports need pyarrow (pip install pyarrow)")
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = parquet.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in iter_batches(filters):
+            # One row group per batch, encoded off the event loop
+            await asyncio.to_thread(_write_row_group, writer, schema, rows)
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    finally:
+        # Footer: the file is only readable once it is written
+        writer.close()
+    yield sink.take()
+
+
+def _write_row_group(writer, schema, rows: list[dict[str, Any]]) -> None:
+    columns = {name: [] for name in EXPORT_COLUMNS}
+    for row in rows:
+        for name in EXPORT_COLUMNS:
+            value = row[name]
+            if name == "intent_json":
+                value = json.dumps(value, ensure_ascii=False)
+            columns[name].append(value)
+    writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
@@ -0,0 +1,379 @@
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infra.session import get_async_session
+from app.infra.settings import settings
+
+SUPPORTED_PARTITION_INTERVALS = {"day", "month"}
+SUPPORTED_RETENTION_ACTIONS = {"detach", "drop"}
+
+ROLLUP_NAME = "hourly"
+
+# Transaction-level advisory lock: one worker maintains command_logs at a time
+_LOCK_KEY = 7_310_642_023
+# Catch-up after downtime re-counts at most this much raw log per transaction
+_ROLLUP_CHUNK = timedelta(days=1)
+
+_PARTITIONS_SQL = text(
+    """
+    SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound
+    FROM pg_inherits
+    JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = 'command_logs'::regclass
+    """
+)
+_BOUND_PATTERN = re.compile(
+    r"FROM \((?:'(?P<lower>[^']+)'|MINVALUE)\) TO \((?:'(?P<upper>[^']+)'|MAXVALUE)\)"
+)
+
+# Plain columns of command_logs; the generated ones are recomputed on insert
+_COPY_COLUMNS = "id, raw_text, intent_json, status, api_key_id, created_at"
+
+_ROLLUP_SQL = text(
+    """
+    INSERT INTO command_log_rollups_hourly
+        (bucket, action, status, provider, mode, api_key_id, count)
+    SELECT
+        date_trunc('hour', created_at),
+        coalesce(action, ''),
+        status,
+        coalesce(provider, ''),
+        coalesce(intent_json #>> '{resolution,mode}', ''),
+        coalesce(api_key_id, ''),
+        count(*)
+    FROM command_logs
+    WHERE created_at >= :since AND created_at < :until
+    GROUP BY 1, 2, 3, 4, 5, 6
+    ON CONFLICT (bucket, action, status, provider, mode, api_key_id)
+    DO UPDATE SET count = EXCLUDED.count
+    """
+)
+_WATERMARK_SQL = text(
+    """
+    INSERT INTO command_log_rollup_state (name, watermark)
+    VALUES (:name, :watermark)
+    ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark
+    """
+)
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    # None: MINVALUE / MAXVALUE
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+    default: bool = False
+
+
+def truncate_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def period_start(value: datetime, interval: str) -> datetime:
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day if interval == "day" else day.replace(day=1)
+
+
+def period_end(start: datetime, interval: str) -> datetime:
+    """End of the period containing `start` (a partial first period is fine)."""
+    first = period_start(start, interval)
+    if interval == "day":
+        return first + timedelta(days=1)
+    return (first + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"command_logs_p{start:%Y%m%d}"
+
+
+def _parse_partition(name: str, bound: str) -> Partition:
+    if bound == "DEFAULT":
+        return Partition(name, None, None, default=True)
+    match = _BOUND_PATTERN.search(bound)
+    if match is None:
+        raise ValueError(f"Unexpected partition bound for {name}: {bound}")
+    lower, upper = match.group("lower"), match.group("upper")
+    return Partition(
+        name,
+        datetime.fromisoformat(lower) if lower else None,
+        datetime.fromisoformat(upper) if upper else None,
+    )
+
+
+class CommandLogMaintenance:
+    """
+    Keeps the range-partitioned command_logs table in shape.
+
+    - creates the partitions for the current period and
+      `command_log_partitions_ahead` more, so rows never land in the default
+      partition. Rows that did (maintenance was down) are moved into the
+      partition created for them; what is left there is reported as
+      `default_rows` and makes /health/command_log degraded;
+    - retires partitions that are entirely older than
+      `command_log_retention_days` (detach or drop: no DELETE, no vacuum);
+    - counts new rows into command_log_rollups_hourly. Hours from the
+      watermark on are re-counted on every run, and the watermark only moves
+      past an hour `command_log_rollup_lag_seconds` after it ended, so rows
+      written late by the write-behind queue are still counted.
+
+    Every step takes an advisory lock; with several workers only one does
+    the work.
+    """
+
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+        self._last_maintenance: Optional[float] = None
+        self.runs = 0
+        self.partitions_created = 0
+        self.partitions_retired = 0
+        self.default_rows_moved = 0
+        # Rows in the default partition after the last ensure_partitions
+        self.default_rows: Optional[int] = None
+        self.rollup_rows = 0
+        self.last_watermark: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def interval(self) -> str:
+        interval = settings.command_log_partition_interval
+        return interval if interval in SUPPORTED_PARTITION_INTERVALS else "month"
+
+    @property
+    def retention_action(self) -> str:
+        action = settings.command_log_retention_action
+        return action if action in SUPPORTED_RETENTION_ACTIONS else "detach"
+
+    async def run_once(self, partitions: bool = True) -> dict[str, Any]:
+        now = datetime.utcnow()
+        result: dict[str, Any] = {}
+        if partitions:
+            result["created"] = await self._locked(self.ensure_partitions, now)
+            result["retired"] = await self._locked(self.apply_retention, now)
+        result["rollup_rows"] = await self.refresh_rollups(now)
+        self.runs += 1
+        return result
+
+    async def ensure_partitions(self, session: AsyncSession, now: datetime) -> list[str]:
+        interval = self.interval
+        partitions = await self._partitions(session)
+        default = next((p for p in partitions if p.default), None)
+        ranged = [p for p in partitions if not p.default]
+        uppers = [p.upper for p in ranged if p.upper is not None]
+        if len(uppers) < len(ranged):
+            # Open-ended (MAXVALUE) partition: nothing left to create
+            await self._count_default(session, default)
+            return []
+        start = max(uppers) if uppers else period_start(now, interval)
+
+        horizon = period_end(now, interval)
+        for _ in range(max(0, settings.command_log_partitions_ahead)):
+            horizon = period_end(horizon, interval)
+
+        created = []
+        while start < horizon:
+            end = period_end(start, interval)
+            name = partition_name(start)
+            self.default_rows_moved += await self._create_partition(
+                session, name, start, end, default
+            )
+            created.append(name)
+            start = end
+        self.partitions_created += len(created)
+        await self._count_default(session, default)
+        return created
+
+    async def apply_retention(self, session: AsyncSession, now: datetime) -> list[str]:
+        if settings.command_log_retention_days <= 0:
+            return []
+        cutoff = now - timedelta(days=settings.command_log_retention_days)
+        retired = []
+        for partition in await self._partitions(session):
+            if partition.default or partition.upper is None or partition.upper > cutoff:
+                continue
+            if self.retention_action == "drop":
+                await session.execute(text(f"DROP TABLE {partition.name}"))
+            else:
+                # Plain tables afterwards: archive (pg_dump) and drop them at leisure
+                await session.execute(
+                    text(f"ALTER TABLE command_logs DETACH PARTITION {partition.name}")
+                )
+            retired.append(partition.name)
+        self.partitions_retired += len(retired)
+        return retired
+
+    async def refresh_rollups(self, now: datetime) -> int:
+        lag = timedelta(seconds=settings.command_log_rollup_lag_seconds)
+        final_before = truncate_hour(now - lag)
+        async with get_async_session() as session:
+            since = await session.scalar(
+                text("SELECT watermark FROM command_log_rollup_state WHERE name = :name"),
+                {"name": ROLLUP_NAME},
+            )
+            if since is None:
+                oldest = await session.scalar(text("SELECT min(created_at) FROM command_logs"))
+                since = truncate_hour(oldest or now)
+
+        counted = 0
+        while True:
+            until = min(now, since + _ROLLUP_CHUNK)
+            watermark = min(until, final_before)
+            rows = await self._locked(self._rollup_chunk, since, until, watermark)
+            if rows is None:
+                # Another worker holds the lock
+                break
+            counted += rows
+            self.last_watermark = watermark
+            if until >= now:
+                break
+            since = until
+
+        self.rollup_rows += counted
+        return counted
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.default_rows) or self.last_error is not None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": settings.command_log_maintenance_enabled,
+            "running": self._task is not None and not self._task.done(),
+            "interval": self.interval,
+            "retention_days": settings.command_log_retention_days,
+            "retention_action": self.retention_action,
+            "runs": self.runs,
+            "partitions_created": self.partitions_created,
+            "partitions_retired": self.partitions_retired,
+            "default_rows": self.default_rows,
+            "default_rows_moved": self.default_rows_moved,
+            "rollup_rows": self.rollup_rows,
+            "rollup_watermark": (
+                self.last_watermark.isoformat() if self.last_watermark else None
+            ),
+            "last_error": self.last_error,
+        }
+
+    async def _rollup_chunk(
+        self,
+        session: AsyncSession,
+        since: datetime,
+        until: datetime,
+        watermark: datetime,
+    ) -> int:
+        result = await session.execute(_ROLLUP_SQL, {"since": since, "until": until})
+        await session.execute(_WATERMARK_SQL, {"name": ROLLUP_NAME, "watermark": watermark})
+        return result.rowcount
+
+    @staticmethod
+    async def _create_partition(
+        session: AsyncSession,
+        name: str,
+        start: datetime,
+        end: datetime,
+        default: Optional[Partition],
+    ) -> int:
+        """Creates one partition; returns the rows moved into it from the default partition."""
+        create = text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF command_logs "
+            f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') "
+            f"TO ('{end.isoformat(sep=' ')}')"
+        )
+        bounds = {"start": start, "end": end}
+        stranded = default is not None and await session.scalar(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {default.name} "
+                "WHERE created_at >= :start AND created_at < :end)"
+            ),
+            bounds,
+        )
+        if not stranded:
+            await session.execute(create)
+            return 0
+
+        # CREATE fails while the default partition holds rows of the new range.
+        # Detached, it takes no rows; writers wait on the parent's lock until
+        # the transaction commits
+        await session.execute(text(f"ALTER TABLE command_logs DETACH PARTITION {default.name}"))
+        await session.execute(create)
+        moved = await session.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {default.name} "
+                "WHERE created_at >= :start AND created_at < :end "
+                f"RETURNING {_COPY_COLUMNS}) "
+                f"INSERT INTO command_logs ({_COPY_COLUMNS}) SELECT {_COPY_COLUMNS} FROM moved"
+            ),
+            bounds,
+        )
+        await session.execute(
+            text(f"ALTER TABLE command_logs ATTACH PARTITION {default.name} DEFAULT")
+        )
+        return moved.rowcount
+
+    async def _count_default(self, session: AsyncSession, default: Optional[Partition]) -> None:
+        if default is None:
+            self.default_rows = None
+            return
+        self.default_rows = await session.scalar(text(f"SELECT count(*) FROM {default.name}"))
+
+    @staticmethod
+    async def _partitions(session: AsyncSession) -> list[Partition]:
+        rows = (await session.execute(_PARTITIONS_SQL)).all()
+        return [_parse_partition(row.name, row.bound) for row in rows]
+
+    @staticmethod
+    async def _locked(step, *args):
+        """Runs `step(session, *args)` in its own transaction; None when the lock is taken."""
+        async with get_async_session() as session:
+            locked = await session.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:key)"),
+                {"key": _LOCK_KEY},
+            )
+            if not locked:
+                return None
+            result = await step(session, *args)
+            await session.commit()
+            return result
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                due = (
+                    self._last_maintenance is None
+                    or time.monotonic() - self._last_maintenance
+                    >= settings.command_log_maintenance_seconds
+                )
+                await self.run_once(partitions=due)
+                if due:
+                    self._last_maintenance = time.monotonic()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Rows still go to the default partition; try again on the next tick
+                # (reported as degraded by /health/command_log meanwhile)
+                self.last_error = f"{type(exc).__name__}: {exc}"
+            await asyncio.sleep(settings.command_log_rollup_seconds)
+
+
+command_log_maintenance = CommandLogMaintenance()
@@ -0,0 +1,498 @@
+import asyncio
+import fcntl
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import (
+    DBAPIError,
+    DisconnectionError,
+    InterfaceError,
+    OperationalError,
+    SQLAlchemyError,
+)
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.infra.models.command_log_model import CommandLogModel
+from app.infra.session import get_async_session
+from app.infra.settings import settings
+
+SUPPORTED_LOG_MODES = {"sync", "async", "async_wal"}
+
+_RETRY_BASE_SECONDS = 0.5
+_RETRY_MAX_SECONDS = 30.0
+# A WAL segment is closed after this many batches' worth of rows
+_SEGMENT_BATCHES = 20
+
+_TRANSIENT_ERRORS = (
+    OperationalError,
+    InterfaceError,
+    DisconnectionError,
+    PoolTimeoutError,
+    OSError,
+    asyncio.TimeoutError,
+)
+
+# (WAL segment number or None, command_logs row)
+_Item = tuple[Optional[int], dict[str, Any]]
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Connection trouble worth retrying, as opposed to rows the database refuses."""
+    if isinstance(exc, _TRANSIENT_ERRORS):
+        return True
+    return isinstance(exc, DBAPIError) and exc.connection_invalidated
+
+
+def _encode_row(row: dict[str, Any]) -> str:
+    return json.dumps(
+        {**row, "created_at": row["created_at"].isoformat()},
+        ensure_ascii=False,
+    )
+
+
+def _decode_row(line: str) -> dict[str, Any]:
+    row = json.loads(line)
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+def _segment_counts(items: list[_Item]) -> dict[int, int]:
+    counts: dict[int, int] = {}
+    for segment, _ in items:
+        counts[segment] = counts.get(segment, 0) + 1
+    return counts
+
+
+class _Segment:
+    def __init__(self, number: int, path: Path, appended: int = 0) -> None:
+        self.number = number
+        self.path = path
+        self.file = None
+        self.appended = appended
+        self.committed = 0
+
+    def close(self) -> None:
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+
+
+_LOCK_FILE = ".lock"
+
+
+def _try_lock(directory: Path):
+    """An exclusive flock on `directory`'s lock file, or None while another process holds it."""
+    try:
+        lock_file = (directory / _LOCK_FILE).open("a")
+    except OSError:
+        # Removed meanwhile by the process that recovered it
+        return None
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _segment_files(directory: Path) -> list[Path]:
+    try:
+        return sorted(directory.glob("*.wal"), key=lambda path: int(path.stem))
+    except (OSError, ValueError):
+        return []
+
+
+class _OrphanedWal:
+    """The WAL directory of a process that is gone, locked while its segments are replayed."""
+
+    def __init__(self, directory: Path, lock_file) -> None:
+        self.directory = directory
+        self._lock_file = lock_file
+
+    def segment_files(self) -> list[Path]:
+        return _segment_files(self.directory)
+
+    def release(self, remove: bool) -> None:
+        if remove and not self.segment_files():
+            (self.directory / _LOCK_FILE).unlink(missing_ok=True)
+            try:
+                self.directory.rmdir()
+            except OSError:
+                pass
+        self._lock_file.close()
+
+
+def claim_orphaned_wals(root: Path) -> list[_OrphanedWal]:
+    """
+    WAL directories under `root` whose owner died: their flock is free.
+    Segments written to `root` itself by older versions count as one more.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    orphans = []
+    directories = sorted(
+        path for path in root.iterdir() if path.is_dir() and not path.name.startswith(".")
+    )
+    for directory in [root, *directories]:
+        lock_file = _try_lock(directory)
+        if lock_file is not None:
+            orphans.append(_OrphanedWal(directory, lock_file))
+    return orphans
+
+
+class _WriteAheadLog:
+    """
+    Append-only JSON-lines segments holding queued log rows until they are
+    in Postgres. A segment is deleted once it is closed and every row in it
+    was inserted. Each process writes to a directory of its own under the
+    configured root and holds an flock on it; a directory whose lock is free
+    at startup belongs to a dead process and is replayed.
+    """
+
+    def __init__(self, root: Path, rotate_rows: int, fsync: bool) -> None:
+        # Host and pid for whoever looks at the disk, plus a suffix: a restarted
+        # container gets the same pid again
+        name = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Locked under a hidden name first, so no other process can take the
+        # new, still unlocked directory for an orphan; the lock survives the rename
+        staging = root / f".{name}"
+        staging.mkdir(parents=True)
+        self._lock_file = _try_lock(staging)
+        self.directory = root / name
+        staging.rename(self.directory)
+        self.rotate_rows = max(1, rotate_rows)
+        self.fsync = fsync
+        self._segments: dict[int, _Segment] = {}
+        self._current: Optional[_Segment] = None
+        self._next_number = 0
+
+    def adopt(self, path: Path, rows: int) -> int:
+        """
+        Tracks a segment of a dead process; removed once its rows are in.
+        Numbered like our own segments so the two never collide.
+        """
+        segment = _Segment(self._next_number, path, appended=rows)
+        self._next_number += 1
+        self._segments[segment.number] = segment
+        if rows == 0:
+            self._remove(segment)
+        return segment.number
+
+    async def append(self, rows: list[dict[str, Any]]) -> int:
+        segment = self._current
+        if segment is None or segment.appended >= self.rotate_rows:
+            segment = self._rotate()
+        segment.file.write("".join(_encode_row(row) + "\n" for row in rows))
+        segment.file.flush()
+        segment.appended += len(rows)
+        if self.fsync:
+            await asyncio.to_thread(os.fsync, segment.file.fileno())
+        return segment.number
+
+    def commit(self, counts: dict[int, int]) -> None:
+        for number, count in counts.items():
+            segment = self._segments.get(number)
+            if segment is None:
+                continue
+            segment.committed += count
+            if segment is not self._current and segment.committed >= segment.appended:
+                self._remove(segment)
+
+    def close(self) -> None:
+        """
+        Closes the open segment (removed too when fully committed) and
+        releases the directory: left behind with rows still pending, it is
+        replayed by the next process that starts.
+        """
+        current, self._current = self._current, None
+        if current is not None:
+            current.close()
+            if current.committed >= current.appended:
+                self._remove(current)
+        for segment in self._segments.values():
+            segment.close()
+        if not _segment_files(self.directory):
+            (self.directory / _LOCK_FILE).unlink(missing_ok=True)
+            try:
+                self.directory.rmdir()
+            except OSError:
+                pass
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @property
+    def segments(self) -> int:
+        return len(self._segments)
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(segment.appended - segment.committed for segment in self._segments.values())
+
+    def _rotate(self) -> _Segment:
+        previous = self._current
+        number = self._next_number
+        self._next_number += 1
+        segment = _Segment(number, self.directory / f"{number:012d}.wal")
+        segment.file = segment.path.open("a", encoding="utf-8")
+        self._segments[number] = segment
+        self._current = segment
+        if previous is not None:
+            previous.close()
+            if previous.committed >= previous.appended:
+                self._remove(previous)
+        return segment
+
+    def _remove(self, segment: _Segment) -> None:
+        segment.close()
+        segment.path.unlink(missing_ok=True)
+        self._segments.pop(segment.number, None)
+
+
+class CommandLogWriter:
+    """
+    Write-behind pipeline for command_logs.
+
+    Requests put finished log rows on a bounded queue and return; one
+    background task drains it with multi-row INSERTs whenever
+    `command_log_batch_size` rows are waiting or `command_log_flush_seconds`
+    passed since the first one. A full queue makes producers wait, which
+    shows up as `blocked_puts` / `blocked_seconds`. Rows carry their own id,
+    so inserts are idempotent (ON CONFLICT DO NOTHING) and a batch that
+    failed on a connection error is simply retried. A batch the database
+    refuses (integrity or data errors) is split until the offending rows are
+    isolated; those are appended to `command_log_reject_file` and counted
+    as `dropped`.
+
+    In `async_wal` mode every row is appended to a local WAL before it is
+    queued and replayed on the next startup if the process died first.
+    """
+
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wal: Optional[_WriteAheadLog] = None
+        # Directories of dead processes, locked until replayed
+        self._orphans: list[_OrphanedWal] = []
+        # Taken off the queue but not confirmed written yet
+        self._inflight: list[_Item] = []
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.recovered = 0
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+        self.max_depth = 0
+        self.last_flush_ms: Optional[float] = None
+
+    @property
+    def mode(self) -> str:
+        mode = settings.command_log_mode
+        return mode if mode in SUPPORTED_LOG_MODES else "sync"
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "sync"
+
+    async def start(self) -> None:
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=max(1, settings.command_log_queue_size))
+        if self.mode == "async_wal" and self._wal is None:
+            root = Path(settings.command_log_wal_dir)
+            # Claimed first: our own directory is locked from the moment it exists
+            self._orphans = claim_orphaned_wals(root)
+            self._wal = _WriteAheadLog(
+                root,
+                rotate_rows=settings.command_log_batch_size * _SEGMENT_BATCHES,
+                fsync=settings.command_log_wal_fsync,
+            )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the drain task after one last flush of whatever is queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        pending, self._inflight = self._inflight, []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            unwritten = await self._write_with_retry(pending, retry=False)
+            # async_wal: still on disk and replayed on the next start
+            if unwritten and self._wal is None:
+                self.dropped += len(unwritten)
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        # Not replayed yet: unlocked again for the next process
+        orphans, self._orphans = self._orphans, []
+        for orphan in orphans:
+            orphan.release(remove=False)
+
+    async def submit(self, rows: list[dict[str, Any]]) -> None:
+        """Queues command_logs rows (as built for the sync path, status included)."""
+        if not rows:
+            return
+        if self._task is None or self._task.done():
+            await self.start()
+
+        now = datetime.utcnow()
+        rows = [{"id": str(uuid.uuid4()), "created_at": now, **row} for row in rows]
+        segment = await self._wal.append(rows) if self._wal is not None else None
+
+        for row in rows:
+            item = (segment, row)
+            if self._queue.full():
+                self.blocked_puts += 1
+                started = time.perf_counter()
+                await self._queue.put(item)
+                self.blocked_seconds += time.perf_counter() - started
+            else:
+                self._queue.put_nowait(item)
+        self.enqueued += len(rows)
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "running": self._task is not None and not self._task.done(),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": settings.command_log_queue_size,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "recovered": self.recovered,
+            "blocked_puts": self.blocked_puts,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "last_flush_ms": self.last_flush_ms,
+            "wal_segments": self._wal.segments if self._wal is not None else None,
+            "wal_pending_rows": self._wal.pending_rows if self._wal is not None else None,
+        }
+
+    async def _run(self) -> None:
+        await self._recover()
+        await self._drain_loop()
+
+    async def _drain_loop(self) -> None:
+        batch_size = max(1, settings.command_log_batch_size)
+        while True:
+            batch = self._inflight
+            batch.append(await self._queue.get())
+            deadline = time.monotonic() + settings.command_log_flush_seconds
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._write_with_retry(batch)
+            self._inflight = []
+
+    async def _write_with_retry(self, batch: list[_Item], retry: bool = True) -> list[_Item]:
+        """
+        Writes `batch`, retrying connection errors with backoff, or gives up
+        on the first one when `retry` is false and returns what was left.
+        Refused chunks are halved until single rows can be set aside.
+        """
+        attempt = 0
+        chunks = [batch]
+        while chunks:
+            chunk = chunks.pop()
+            try:
+                await self._write(chunk)
+                attempt = 0
+            except (SQLAlchemyError, OSError, asyncio.TimeoutError) as exc:
+                self.failures += 1
+                if _is_transient(exc):
+                    chunks.append(chunk)
+                    if not retry:
+                        return [item for pending in chunks for item in pending]
+                    # Keep the batch; the full queue pushes back on producers meanwhile
+                    await asyncio.sleep(min(_RETRY_MAX_SECONDS, _RETRY_BASE_SECONDS * 2 ** attempt))
+                    attempt += 1
+                elif len(chunk) == 1:
+                    self._reject(chunk, exc)
+                else:
+                    # First half on top: rows still go in in order
+                    middle = len(chunk) // 2
+                    chunks += [chunk[middle:], chunk[:middle]]
+        return []
+
+    async def _write(self, batch: list[_Item]) -> None:
+        started = time.perf_counter()
+        await self._insert([row for _, row in batch])
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.written += len(batch)
+        self.batches += 1
+
+        if self._wal is not None:
+            self._wal.commit(_segment_counts(batch))
+
+    def _reject(self, items: list[_Item], exc: Exception) -> None:
+        """Sets rows the database refuses aside so they stop blocking the queue."""
+        error = str(getattr(exc, "orig", None) or exc)[:1000]
+        path = Path(settings.command_log_reject_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as reject_file:
+            for _, row in items:
+                record = {"error": error, "row": json.loads(_encode_row(row))}
+                reject_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.dropped += len(items)
+
+        if self._wal is not None:
+            self._wal.commit(_segment_counts(items))
+
+    async def _recover(self) -> None:
+        """Replays the WAL directories of dead processes (rows already in are skipped)."""
+        batch_size = max(1, settings.command_log_batch_size)
+        while self._orphans:
+            orphan = self._orphans[0]
+            for path in orphan.segment_files():
+                rows = []
+                with path.open(encoding="utf-8") as wal_file:
+                    for line in wal_file:
+                        try:
+                            rows.append(_decode_row(line))
+                        except (ValueError, KeyError):
+                            # Torn last line of a crashed append
+                            continue
+                number = self._wal.adopt(path, len(rows))
+                for start in range(0, len(rows), batch_size):
+                    await self._write_with_retry(
+                        [(number, row) for row in rows[start:start + batch_size]]
+                    )
+                self.recovered += len(rows)
+            self._orphans.pop(0)
+            orphan.release(remove=True)
+
+    @staticmethod
+    async def _insert(rows: list[dict[str, Any]]) -> None:
+        stmt = insert(CommandLogModel).values(rows).on_conflict_do_nothing(
+            index_elements=["id", "created_at"]
+        )
+        async with get_async_session() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+
+command_log_writer = CommandLogWriter()
@@ -1,26 +1,179 @@
-import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
 
 import httpx
 from fastapi import HTTPException
+from sqlalchemy import insert
 
 from app.api.schemas.command import CommandRequest
 from app.domain.types.auth import AuthContext
+from app.infra.metrics import CommandTimer, label_command, stage
 from app.infra.models.command_log_model import CommandLogModel
-from app.infra.session import get_session
 from app.infra.settings import settings
+from app.infra.unit_of_work import current_unit_of_work, request_session
 from app.services.command_executor import CommandExecutor
+from app.services.command_log_writer import command_log_writer
 from app.services.command_validator import CommandValidator
 from app.services.intent_resolver import IntentResolver
+from app.services.intent_types import ResolvedIntent
+from app.services.rag.retriever import RagContext
+
+
+@dataclass(frozen=True)
+class PreparedCommand:
+    command: CommandRequest
+    action: str
+    payload: Dict[str, Any]
+    used_raw_text: bool
+    resolution: Optional[ResolvedIntent]
+    rag: Optional[RagContext]
+    cache: Optional[Dict[str, Any]] = None
 
 
 class CommandService:
-    def execute(
+    async def execute(
+        self,
+        command: CommandRequest,
+        auth_context: AuthContext | None = None,
+    ):
+        timer = CommandTimer()
+        try:
+            with timer.active():
+                response = await self._execute(command, auth_context)
+        except HTTPException as exc:
+            timer.label(status=_error_code(exc))
+            raise
+        finally:
+            timer.observe()
+        return response
+
+    async def _execute(
         self,
         command: CommandRequest,
         auth_context: AuthContext | None = None,
     ):
+        prepared = await self._prepare(command, auth_context)
+        log_values = self._build_log_values(prepared, auth_context=auth_context)
+        write_behind = command_log_writer.enabled
+
+        # sync: the command and its log row go out as one statement, then COMMIT
+        async with request_session() as session:
+            with stage("execute"):
+                result = await CommandExecutor.execute(
+                    session=session,
+                    action=prepared.action,
+                    payload=prepared.payload,
+                    log_values=None if write_behind else log_values,
+                )
+            with stage("log_commit"):
+                await session.commit()
+
+        status = "noop" if result.get("already_exists") else "success"
+        if write_behind:
+            with stage("log_submit"):
+                await command_log_writer.submit([{**log_values, "status": status}])
+        label_command(status=status)
+
+        return {
+            "status": status,
+            "action": prepared.action,
+            "result": result,
+        }
+
+    async def execute_batch(
+        self,
+        commands: list[CommandRequest],
+        auth_context: AuthContext | None = None,
+    ):
+        if len(commands) > settings.command_batch_max_size:
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "error_code": "batch_too_large",
+                    "message": (
+                        f"A batch accepts at most {settings.command_batch_max_size} commands."
+                    ),
+                },
+            )
+
+        results: list[Optional[Dict[str, Any]]] = [None] * len(commands)
+        grouped: Dict[str, list[tuple[int, PreparedCommand]]] = {}
+        # Per item: its own resolution stages, observed once its status is known
+        timers: Dict[int, CommandTimer] = {}
+
+        # 1) Validação e resolução de intenção antes de tocar no banco
+        for index, command in enumerate(commands):
+            timer = timers[index] = CommandTimer()
+            try:
+                with timer.active():
+                    prepared = await self._prepare(command, auth_context)
+            except HTTPException as exc:
+                timer.label(status=_error_code(exc))
+                timer.observe(duration=False)
+                detail = exc.detail if isinstance(exc.detail, dict) else {}
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "http_status": exc.status_code,
+                    "error_code": detail.get("error_code"),
+                    "message": detail.get("message", str(exc.detail)),
+                }
+                continue
+            grouped.setdefault(prepared.action, []).append((index, prepared))
+
+        # 2) Execução set-based por ação + um único INSERT em command_logs
+        if grouped:
+            batch_timer = CommandTimer(mode="batch", provider="batch", action="batch")
+            with batch_timer.active():
+                async with request_session() as session:
+                    log_rows = []
+                    for action, items in grouped.items():
+                        with stage("execute"):
+                            outcomes = await CommandExecutor.execute_batch(
+                                session=session,
+                                action=action,
+                                payloads=[prepared.payload for _, prepared in items],
+                            )
+                        for (index, prepared), result in zip(items, outcomes):
+                            status = "noop" if result.get("already_exists") else "success"
+                            results[index] = {
+                                "index": index,
+                                "status": status,
+                                "action": action,
+                                "result": result,
+                            }
+                            log_rows.append(
+                                self._build_log_values(prepared, status, auth_context)
+                            )
+                            timers[index].label(status=status)
+                            timers[index].observe(duration=False)
+
+                    with stage("log_commit"):
+                        if not command_log_writer.enabled:
+                            await session.execute(insert(CommandLogModel), log_rows)
+                        await session.commit()
+
+                if command_log_writer.enabled:
+                    with stage("log_submit"):
+                        await command_log_writer.submit(log_rows)
+            batch_timer.label(status="success")
+            # Items were counted one by one above
+            batch_timer.observe(count=False)
+
+        summary = {"total": len(commands), "success": 0, "noop": 0, "error": 0}
+        for item in results:
+            summary[item["status"]] += 1
+
+        return {"summary": summary, "results": results}
+
+    async def _prepare(
+        self,
+        command: CommandRequest,
+        auth_context: AuthContext | None = None,
+    ) -> PreparedCommand:
         try:
-            CommandValidator.validate_request(command)
+            with stage("validate"):
+                CommandValidator.validate_request(command)
         except ValueError as exc:
             raise HTTPException(
                 status_code=422,
@@ -44,16 +197,27 @@ class CommandService:
         used_raw_text = False
         resolution = None
         rag = None
+        cache = None
 
         if not action and command.raw_text:
+            # Auth reads are done: give the request's connection back to the pool
+            # instead of holding it through retrieval and the LLM call
+            unit_of_work = current_unit_of_work()
+            if unit_of_work is not None:
+                await unit_of_work.release()
+
+            label_command(mode=settings.intent_resolution_mode)
             try:
-                resolution_result = IntentResolver.resolve(
+                resolution_result = await IntentResolver.resolve(
                     raw_text=command.raw_text,
                     fallback_payload=payload,
                 )
                 resolution = resolution_result.intent
                 rag = resolution_result.rag
+                cache = resolution_result.cache
                 used_raw_text = True
+                # The action is labelled once validated: the resolver (LLM) may return anything
+                label_command(provider=resolution.provider)
 
                 # IMPORTANT: apply resolved intent to the execution variables
                 action = resolution.action
@@ -89,11 +253,14 @@ class CommandService:
                 ) from exc
 
         try:
-            action, payload = CommandValidator.validate_action_and_payload(
-                action=action,
-                payload=payload,
-            )
+            with stage("validate"):
+                action, payload = CommandValidator.validate_action_and_payload(
+                    action=action,
+                    payload=payload,
+                )
         except ValueError as exc:
+            # One label value for every unknown action keeps the series count bounded
+            label_command(action="invalid")
             raise HTTPException(
                 status_code=422,
                 detail={
@@ -102,6 +269,8 @@ class CommandService:
                 },
             ) from exc
 
+        label_command(action=action)
+
         if (
             settings.auth_mode == "api_key"
             and action == "assign_task"
@@ -116,65 +285,79 @@ class CommandService:
                 },
             )
 
-        with get_session() as session:
-            result = CommandExecutor.execute(
-                session=session,
-                action=action,
-                payload=payload,
-            )
+        return PreparedCommand(
+            command=command,
+            action=action,
+            payload=payload,
+            used_raw_text=used_raw_text,
+            resolution=resolution,
+            rag=rag,
+            cache=cache,
+        )
 
-            status = "noop" if result.get("already_exists") else "success"
+    @staticmethod
+    def _build_log_values(
+        prepared: PreparedCommand,
+        status: Optional[str] = None,
+        auth_context: AuthContext | None = None,
+    ) -> Dict[str, Any]:
+        """Values for a command_logs row; without `status` the executor derives it."""
+        resolution = prepared.resolution
+        rag = prepared.rag
+        used_raw_text = prepared.used_raw_text
 
-            resolution_metadata = {
-                "mode": settings.intent_resolution_mode if used_raw_text else "direct",
-                "provider": resolution.provider if resolution else "direct",
-                "model": resolution.model if resolution else "direct",
-                "confidence": resolution.confidence if resolution else 1.0,
-            }
+        resolution_metadata = {
+            "mode": settings.intent_resolution_mode if used_raw_text else "direct",
+            "provider": resolution.provider if resolution else "direct",
+            "model": resolution.model if resolution else "direct",
+            "confidence": resolution.confidence if resolution else 1.0,
+        }
 
-            if resolution and resolution.raw_output:
-                resolution_metadata["raw_output"] = resolution.raw_output
+        if resolution and resolution.raw_output:
+            resolution_metadata["raw_output"] = resolution.raw_output
 
-            if used_raw_text and rag:
-                rag_metadata = {
-                    "enabled": rag.enabled,
-                    "sources": rag.sources,
-                    "context_chars": len(rag.context_text),
-                }
-                if rag.mode:
-                    rag_metadata["mode"] = rag.mode
-                if rag.top_k is not None:
-                    rag_metadata["top_k"] = rag.top_k
-                if rag.retrieved_chunks is not None:
-                    rag_metadata["retrieved_chunks"] = rag.retrieved_chunks
-                resolution_metadata["rag"] = rag_metadata
-
-            if settings.auth_mode == "api_key" and auth_context:
-                resolution_metadata["auth"] = {
-                    "mode": "api_key",
-                    "api_key_name": auth_context.name,
-                    "role": auth_context.role,
-                }
+        # Tokens spent by this command; a cached resolution spent none
+        if resolution and resolution.usage and not (prepared.cache or {}).get("hit"):
+            resolution_metadata["usage"] = resolution.usage
 
-            log = CommandLogModel(
-                raw_text=command.raw_text if used_raw_text else action,
-                intent_json=json.dumps(
-                    {
-                        "action": action,
-                        "payload": payload,
-                        "resolution": resolution_metadata,
-                    },
-                    ensure_ascii=False,
-                ),
-                status=status,
-                api_key_id=auth_context.api_key_id if auth_context else None,
-            )
+        if used_raw_text and rag:
+            rag_metadata = {
+                "enabled": rag.enabled,
+                "sources": rag.sources,
+                "context_chars": len(rag.context_text),
+            }
+            if rag.mode:
+                rag_metadata["mode"] = rag.mode
+            if rag.top_k is not None:
+                rag_metadata["top_k"] = rag.top_k
+            if rag.retrieved_chunks is not None:
+                rag_metadata["retrieved_chunks"] = rag.retrieved_chunks
+            resolution_metadata["rag"] = rag_metadata
 
-            session.add(log)
-            session.commit()
+        if used_raw_text and prepared.cache:
+            resolution_metadata["cache"] = prepared.cache
 
-        return {
-            "status": status,
-            "action": action,
-            "result": result,
+        if settings.auth_mode == "api_key" and auth_context:
+            resolution_metadata["auth"] = {
+                "mode": "api_key",
+                "api_key_name": auth_context.name,
+                "role": auth_context.role,
+            }
+
+        values = {
+            "raw_text": prepared.command.raw_text if used_raw_text else prepared.action,
+            "intent_json": {
+                "action": prepared.action,
+                "payload": prepared.payload,
+                "resolution": resolution_metadata,
+            },
+            "api_key_id": auth_context.api_key_id if auth_context else None,
         }
+        if status is not None:
+            values["status"] = status
+        return values
+
+
+def _error_code(exc: HTTPException) -> str:
+    detail = exc.detail if isinstance(exc.detail, dict) else {}
+    return detail.get("error_code") or f"http_{exc.status_code}"
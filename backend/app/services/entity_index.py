@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+
+from app.infra.models.asset_model import AssetModel
+from app.infra.models.task_model import TaskModel
+from app.infra.session import get_async_session
+from app.infra.settings import settings
+
+# Keeps "server-12", "v1.2" and UUIDs as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+# Words around a name that are not part of it ("the Backup Rotation task")
+_FILLER_TOKENS = {
+    "the", "a", "an", "task", "asset",
+    "o", "os", "as", "tarefa", "ativo",
+}
+_FUZZY_CANDIDATES = 20
+# Best fuzzy score must beat the runner-up by this much to be unambiguous
+_FUZZY_MARGIN = 0.05
+_END = "\0"
+_NUMBER_PATTERN = re.compile(r"\d+")
+
+
+def normalize_tokens(text: str) -> list[str]:
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = decomposed.encode("ascii", "ignore").decode("ascii").lower()
+    return TOKEN_PATTERN.findall(ascii_text)
+
+
+@dataclass(frozen=True)
+class EntityMatch:
+    id: str
+    name: str
+    # exact | trie | fuzzy
+    method: str
+    score: float
+
+
+class _NameIndex:
+    """Token trie plus a trigram index (fuzzy candidates) over one entity type."""
+
+    def __init__(self) -> None:
+        self.names: dict[str, str] = {}
+        # Every id added, including names with no usable tokens
+        self._ids: set[str] = set()
+        self._normalized: dict[str, str] = {}
+        self._trie: dict[str, Any] = {}
+        self._trigrams: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, entity_id: str, name: str) -> None:
+        if entity_id in self._ids:
+            return
+        self._ids.add(entity_id)
+        tokens = normalize_tokens(name)
+        if not tokens:
+            return
+        self.names[entity_id] = name
+
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_END, set()).add(entity_id)
+
+        normalized = " ".join(tokens)
+        self._normalized[entity_id] = normalized
+        for trigram in _trigrams(normalized):
+            self._trigrams.setdefault(trigram, set()).add(entity_id)
+
+    def lookup(self, tokens: list[str]) -> Optional[EntityMatch]:
+        """The single entity named in `tokens`, or None when absent/ambiguous."""
+        if not tokens:
+            return None
+
+        best_length = 0
+        best_ids: set[str] = set()
+        best_starts: list[int] = []
+        for start in range(len(tokens)):
+            node = self._trie
+            for position in range(start, len(tokens)):
+                node = node.get(tokens[position])
+                if node is None:
+                    break
+                ids = node.get(_END)
+                if not ids:
+                    continue
+                length = position - start + 1
+                if length > best_length:
+                    best_length, best_ids, best_starts = length, set(ids), [start]
+                elif length == best_length:
+                    best_ids |= ids
+                    best_starts.append(start)
+
+        if best_ids:
+            if len(best_ids) != 1:
+                return None
+            # Everything around the name must be filler: "server 14" is not
+            # asset "Server", "backup rotation for database" is not task "Backup"
+            if any(
+                only_filler(tokens[:start] + tokens[start + best_length:])
+                for start in best_starts
+            ):
+                entity_id = next(iter(best_ids))
+                method = "exact" if best_length == len(tokens) else "trie"
+                return EntityMatch(entity_id, self.names[entity_id], method, 1.0)
+
+        return self._fuzzy(tokens)
+
+    def _fuzzy(self, tokens: list[str]) -> Optional[EntityMatch]:
+        core = [token for token in tokens if token not in _FILLER_TOKENS]
+        phrase = " ".join(core)
+        if len(phrase) < 3:
+            return None
+
+        shared: dict[str, int] = {}
+        for trigram in _trigrams(phrase):
+            for entity_id in self._trigrams.get(trigram, ()):
+                shared[entity_id] = shared.get(entity_id, 0) + 1
+        # Typos are forgiven, different numbers are not: "server 14" is not "server 13"
+        numbers = _NUMBER_PATTERN.findall(phrase)
+        candidates = [
+            entity_id
+            for entity_id in sorted(shared, key=shared.get, reverse=True)
+            if _NUMBER_PATTERN.findall(self._normalized[entity_id]) == numbers
+        ][:_FUZZY_CANDIDATES]
+
+        scored = sorted(
+            (
+                (SequenceMatcher(None, phrase, self._normalized[entity_id]).ratio(), entity_id)
+                for entity_id in candidates
+            ),
+            reverse=True,
+        )
+        if not scored or scored[0][0] < settings.entity_fuzzy_threshold:
+            return None
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < _FUZZY_MARGIN:
+            return None
+        score, entity_id = scored[0]
+        return EntityMatch(entity_id, self.names[entity_id], "fuzzy", round(score, 3))
+
+
+def only_filler(tokens: list[str]) -> bool:
+    """True when `tokens` carry nothing but filler words ("the", "task", ...)."""
+    return all(token in _FILLER_TOKENS for token in tokens)
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class _Table:
+    def __init__(self, model, name_column, *filters) -> None:
+        self.model = model
+        self.name_column = name_column
+        self.filters = filters
+        self.index = _NameIndex()
+        self.version: Optional[tuple[int, Optional[datetime]]] = None
+        self.watermark: Optional[datetime] = None
+
+    async def refresh(self, session, full: bool) -> int:
+        """Returns the number of rows fetched."""
+        version = tuple(
+            (
+                await session.execute(
+                    select(func.count(), func.max(self.model.created_at)).where(*self.filters)
+                )
+            ).one()
+        )
+        if not full and version == self.version:
+            return 0
+
+        stmt = select(self.model.id, self.name_column, self.model.created_at).where(*self.filters)
+        # Incremental: only rows created since the last sync (>= keeps ties)
+        incremental = not full and self.watermark is not None
+        if incremental:
+            stmt = stmt.where(self.model.created_at >= self.watermark)
+        rows = (await session.execute(stmt)).all()
+
+        index = self.index if incremental else _NameIndex()
+        for entity_id, name, _ in rows:
+            index.add(entity_id, name)
+
+        if incremental and len(index) != version[0]:
+            # Rows were deleted or deactivated: rebuild from scratch
+            return len(rows) + await self.refresh(session, full=True)
+
+        self.index = index
+        self.version = version
+        if rows:
+            newest = max(created_at for _, _, created_at in rows)
+            self.watermark = max(self.watermark, newest) if incremental else newest
+        elif not incremental:
+            self.watermark = None
+        return len(rows)
+
+
+class EntityIndex:
+    """
+    In-memory name index over active assets and tasks, for resolving commands
+    like "assign Backup Rotation to server-12" without the LLM.
+
+    Polls count(*)/max(created_at) per table and fetches only new rows; a full
+    reload runs every `entity_index_full_refresh_seconds` (or when rows
+    disappear) to pick up renames. Lookups read whatever is loaded and never
+    wait on a refresh once the first load is done.
+    """
+
+    def __init__(self) -> None:
+        self._assets = _Table(AssetModel, AssetModel.name, AssetModel.active.is_(True))
+        self._tasks = _Table(TaskModel, TaskModel.title)
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._last_full_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.rows_fetched = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def ensure_loaded(self) -> None:
+        if not self._loaded:
+            await self.refresh()
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            full = (
+                not self._loaded
+                or now - self._last_full_refresh >= settings.entity_index_full_refresh_seconds
+            )
+            async with get_async_session() as session:
+                fetched = await self._assets.refresh(session, full)
+                fetched += await self._tasks.refresh(session, full)
+            self._last_refresh = now
+            if full:
+                self._last_full_refresh = now
+            self._loaded = True
+            self.refreshes += 1
+            self.rows_fetched += fetched
+
+    def find_asset(self, tokens: list[str]) -> Optional[EntityMatch]:
+        return self._assets.index.lookup(tokens)
+
+    def find_task(self, tokens: list[str]) -> Optional[EntityMatch]:
+        return self._tasks.index.lookup(tokens)
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "loaded": self._loaded,
+            "assets": len(self._assets.index),
+            "tasks": len(self._tasks.index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "rows_fetched": self.rows_fetched,
+            "seconds_since_refresh": (
+                round(time.monotonic() - self._last_refresh, 1) if self._loaded else None
+            ),
+        }
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Keep serving the loaded names; try again on the next tick
+                pass
+            await asyncio.sleep(settings.entity_index_refresh_seconds)
+
+
+entity_index = EntityIndex()
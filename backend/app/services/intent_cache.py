@@ -0,0 +1,258 @@
+import json
+import re
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Any, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.infra.models.intent_cache_model import IntentCacheEntryModel
+from app.infra.session import get_async_session
+from app.infra.settings import settings
+from app.infra.ttl_cache import TTLCache
+from app.services.intent_types import ResolvedIntent
+from app.services.llm.llm_intent_resolver import SYSTEM_PROMPT_VERSION
+from app.services.rag.retriever import RagContext
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Transient LLM failures (e.g. invalid JSON) are not replayed from cache
+CACHEABLE_ERRORS = {None, "missing_fields"}
+
+# How often a worker deletes expired rows of the shared table
+_PURGE_INTERVAL_SECONDS = 600.0
+
+
+def normalize_raw_text(raw_text: str) -> str:
+    # Case is preserved: resolved payloads echo IDs exactly as the user typed them
+    return WHITESPACE_PATTERN.sub(" ", (raw_text or "").strip())
+
+
+@dataclass(frozen=True)
+class CachedResolution:
+    intent: ResolvedIntent
+    rag: RagContext
+    latency_ms: float
+    tier: str
+
+
+class IntentResolutionCache:
+    """
+    Cache of LLM intent resolutions.
+
+    Entries are keyed on the normalized raw_text, the chat model, the system
+    prompt version, the RAG mode and a hash of the RAG context the LLM saw.
+    The context fingerprint seen last for a query is remembered, so a repeat
+    query is answered before retrieval runs (no embedding, no chat call).
+    When that lookup misses, the full key is checked again once the context
+    is known, which still saves the chat call.
+    """
+
+    def __init__(self) -> None:
+        self._by_query: TTLCache[tuple[str, CachedResolution]] = TTLCache(
+            settings.intent_cache_max_entries,
+            settings.intent_cache_ttl_seconds,
+        )
+        self._by_context: TTLCache[CachedResolution] = TTLCache(
+            settings.intent_cache_max_entries,
+            settings.intent_cache_ttl_seconds,
+        )
+        self.query_hits = 0
+        self.context_hits = 0
+        self.misses = 0
+        self.postgres_hits = 0
+        self.saved_ms = 0.0
+        self.purged = 0
+        self._purged_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.intent_cache_enabled
+
+    @property
+    def shared(self) -> bool:
+        return settings.intent_cache_backend == "postgres"
+
+    @staticmethod
+    def query_key(raw_text: str) -> str:
+        parts = [
+            normalize_raw_text(raw_text),
+            settings.openai_model,
+            SYSTEM_PROMPT_VERSION,
+            settings.rag_mode,
+        ]
+        return sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def cache_key(query_key: str, context_text: str) -> str:
+        context_hash = sha256((context_text or "").encode("utf-8")).hexdigest()
+        return sha256(f"{query_key}:{context_hash}".encode("utf-8")).hexdigest()
+
+    async def lookup(self, raw_text: str) -> Optional[CachedResolution]:
+        query_key = self.query_key(raw_text)
+
+        entry = self._by_query.get(query_key)
+        if entry:
+            self.query_hits += 1
+            return entry[1]
+
+        if self.shared:
+            cached = await self._fetch_shared(IntentCacheEntryModel.query_key == query_key)
+            if cached:
+                self.query_hits += 1
+                return cached
+
+        return None
+
+    async def lookup_with_context(
+        self,
+        raw_text: str,
+        rag: RagContext,
+    ) -> Optional[CachedResolution]:
+        query_key = self.query_key(raw_text)
+        cache_key = self.cache_key(query_key, rag.context_text)
+
+        cached = self._by_context.get(cache_key)
+        if not cached and self.shared:
+            cached = await self._fetch_shared(IntentCacheEntryModel.cache_key == cache_key)
+
+        if cached:
+            self.context_hits += 1
+            return cached
+
+        self.misses += 1
+        return None
+
+    async def store(
+        self,
+        raw_text: str,
+        rag: RagContext,
+        intent: ResolvedIntent,
+        latency_ms: float,
+    ) -> None:
+        if intent.error not in CACHEABLE_ERRORS:
+            return
+
+        query_key = self.query_key(raw_text)
+        cache_key = self.cache_key(query_key, rag.context_text)
+        self._remember(query_key, cache_key, intent, rag, latency_ms)
+
+        if not self.shared:
+            return
+
+        now = datetime.utcnow()
+        values = {
+            "query_key": query_key,
+            "cache_key": cache_key,
+            "intent_json": json.dumps(asdict(intent), ensure_ascii=False),
+            "rag_json": json.dumps(asdict(rag), ensure_ascii=False),
+            "latency_ms": latency_ms,
+            "expires_at": now + timedelta(seconds=settings.intent_cache_ttl_seconds),
+            "created_at": now,
+        }
+        stmt = insert(IntentCacheEntryModel).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["query_key"],
+            set_={key: stmt.excluded[key] for key in values if key != "query_key"},
+        )
+        try:
+            async with get_async_session() as session:
+                await session.execute(stmt)
+                # Lookups skip expired rows; this keeps them from piling up
+                monotonic_now = time.monotonic()
+                if monotonic_now - self._purged_at >= _PURGE_INTERVAL_SECONDS:
+                    self._purged_at = monotonic_now
+                    result = await session.execute(
+                        delete(IntentCacheEntryModel).where(
+                            IntentCacheEntryModel.expires_at <= now
+                        )
+                    )
+                    self.purged += result.rowcount
+                await session.commit()
+        except SQLAlchemyError:
+            # The shared tier is best effort; the in-memory tier already has the entry
+            return
+
+    def record_saved(self, saved_ms: float) -> None:
+        self.saved_ms += max(0.0, saved_ms)
+
+    def clear(self) -> None:
+        self._by_query.clear()
+        self._by_context.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.query_hits + self.context_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": settings.intent_cache_backend,
+            "entries": len(self._by_query),
+            "query_hits": self.query_hits,
+            "context_hits": self.context_hits,
+            "misses": self.misses,
+            "postgres_hits": self.postgres_hits,
+            "purged": self.purged,
+            "hit_ratio": (
+                round((self.query_hits + self.context_hits) / lookups, 4)
+                if lookups
+                else None
+            ),
+            "saved_ms": round(self.saved_ms, 2),
+        }
+
+    def _remember(
+        self,
+        query_key: str,
+        cache_key: str,
+        intent: ResolvedIntent,
+        rag: RagContext,
+        latency_ms: float,
+        ttl_seconds: Optional[float] = None,
+    ) -> CachedResolution:
+        cached = CachedResolution(intent=intent, rag=rag, latency_ms=latency_ms, tier="memory")
+        self._by_query.set(query_key, (cache_key, cached), ttl_seconds)
+        self._by_context.set(cache_key, cached, ttl_seconds)
+        return cached
+
+    async def _fetch_shared(self, condition) -> Optional[CachedResolution]:
+        now = datetime.utcnow()
+        try:
+            async with get_async_session() as session:
+                row = (
+                    await session.execute(
+                        select(IntentCacheEntryModel).where(
+                            condition,
+                            IntentCacheEntryModel.expires_at > now,
+                        )
+                    )
+                ).scalar_one_or_none()
+        except SQLAlchemyError:
+            return None
+
+        if not row:
+            return None
+
+        try:
+            intent = ResolvedIntent(**json.loads(row.intent_json))
+            rag = RagContext(**json.loads(row.rag_json))
+        except (TypeError, ValueError):
+            return None
+
+        self.postgres_hits += 1
+        # Warm the local tier for the remaining lifetime of the shared entry
+        remaining = (row.expires_at - now).total_seconds()
+        cached = self._remember(
+            row.query_key,
+            row.cache_key,
+            intent,
+            rag,
+            row.latency_ms,
+            ttl_seconds=remaining,
+        )
+        return replace(cached, tier="postgres")
+
+
+intent_cache = IntentResolutionCache()
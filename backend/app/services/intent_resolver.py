@@ -1,26 +1,18 @@
 import re
+import time
 from typing import Any, Dict, Optional
 
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.infra.metrics import stage
 from app.infra.settings import settings
+from app.services.command_grammar import UUID_PATTERN, command_grammar, parse_command
+from app.services.entity_index import EntityMatch, entity_index, normalize_tokens, only_filler
+from app.services.intent_cache import intent_cache
 from app.services.intent_types import ResolvedIntent, ResolvedIntentResult
 from app.services.llm.llm_intent_resolver import LLMIntentResolver
 from app.services.rag.retriever import RagContext, Retriever
 
-UUID_PATTERN = r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
-
-ASSET_ID_REGEX = re.compile(
-    rf"asset_id\s*[:=]\s*(?P<asset_id>{UUID_PATTERN})",
-    re.IGNORECASE,
-)
-TASK_ID_REGEX = re.compile(
-    rf"task_id\s*[:=]\s*(?P<task_id>{UUID_PATTERN})",
-    re.IGNORECASE,
-)
-ASSIGN_TASK_REGEX = re.compile(
-    rf"(?:assign|atribuir)\s+task\s+(?P<task_id>{UUID_PATTERN}).*?(?:to|ao)\s+asset\s+(?P<asset_id>{UUID_PATTERN})",
-    re.IGNORECASE,
-)
-
 
 class PreAIIntentResolver:
     @staticmethod
@@ -34,21 +26,12 @@ class PreAIIntentResolver:
         used_fallback = False
         used_weak_match = False
 
-        asset_id = None
-        task_id = None
-
-        assign_match = ASSIGN_TASK_REGEX.search(raw_text)
-        if assign_match:
-            asset_id = assign_match.group("asset_id")
-            task_id = assign_match.group("task_id")
-        else:
-            asset_match = ASSET_ID_REGEX.search(raw_text)
-            task_match = TASK_ID_REGEX.search(raw_text)
-
-            if asset_match:
-                asset_id = asset_match.group("asset_id")
-            if task_match:
-                task_id = task_match.group("task_id")
+        # One tokenizer pass; the grammar covers "assign task <uuid> to asset
+        # <uuid>" and asset_id=/task_id= pairs
+        match = command_grammar.match(parse_command(raw_text))
+        fields = match.payload if match and match.action == "assign_task" else {}
+        asset_id = fields.get("asset_id")
+        task_id = fields.get("task_id")
 
         if not asset_id and "asset_id" in fallback_payload:
             asset_id = fallback_payload.get("asset_id")
@@ -84,9 +67,81 @@ class PreAIIntentResolver:
         )
 
 
+ASSIGN_VERBS = {"assign", "atribuir", "atribua", "atribui"}
+# Token between the task and the asset ("assign X to Y", "atribuir X ao Y")
+ASSIGN_SEPARATORS = {"to", "ao", "para", "a"}
+# Politeness allowed before the verb besides filler; anything else ("do not",
+# "never", "why did you") makes the command the LLM's call
+COMMAND_PREFIXES = {"please", "pls", "kindly", "por", "favor"}
+FULL_UUID_REGEX = re.compile(rf"^{UUID_PATTERN}$")
+
+
+class EntityIntentResolver:
+    """
+    Deterministic tier between the regex and the LLM: resolves task titles
+    and asset names (or bare UUIDs) through the in-memory entity index.
+    Returns None when the command does not parse, a name is ambiguous, or
+    the text is not a plain imperative (words before the verb, a question).
+    """
+
+    @staticmethod
+    async def resolve(raw_text: str) -> Optional[ResolvedIntent]:
+        tokens = normalize_tokens(raw_text)
+        verb_at = next(
+            (index for index, token in enumerate(tokens) if token in ASSIGN_VERBS),
+            None,
+        )
+        if verb_at is None or raw_text.rstrip().endswith("?"):
+            return None
+        # "do not assign ...", "never assign ...": a negation is not a command
+        if not only_filler([token for token in tokens[:verb_at] if token not in COMMAND_PREFIXES]):
+            return None
+
+        try:
+            await entity_index.ensure_loaded()
+        except SQLAlchemyError:
+            # Index unavailable: let the LLM tier handle the command
+            return None
+
+        resolved: Dict[tuple, tuple] = {}
+        for index in range(verb_at + 1, len(tokens)):
+            if tokens[index] not in ASSIGN_SEPARATORS:
+                continue
+            task = EntityIntentResolver._match(tokens[verb_at + 1:index], entity_index.find_task)
+            asset = EntityIntentResolver._match(tokens[index + 1:], entity_index.find_asset)
+            if task and asset:
+                resolved[(task.id, asset.id)] = (task, asset)
+
+        # Several separators may parse; they must agree on one pair
+        if len(resolved) != 1:
+            entity_index.record(hit=False)
+            return None
+        entity_index.record(hit=True)
+
+        task, asset = next(iter(resolved.values()))
+        fuzzy = "fuzzy" in (task.method, asset.method)
+        return ResolvedIntent(
+            action="assign_task",
+            payload={"asset_id": asset.id, "task_id": task.id},
+            confidence=0.8 if fuzzy else 0.9,
+            provider="pre_ai",
+            model="entity_index",
+        )
+
+    @staticmethod
+    def _match(tokens, find) -> Optional[EntityMatch]:
+        ids = [token for token in tokens if FULL_UUID_REGEX.match(token)]
+        if not ids:
+            return find(tokens)
+        # Same rule as names: a UUID with other words around it is not a plain reference
+        if len(ids) != 1 or not only_filler([token for token in tokens if token != ids[0]]):
+            return None
+        return EntityMatch(ids[0], ids[0], "id", 1.0)
+
+
 class IntentResolver:
     @staticmethod
-    def resolve(
+    async def resolve(
         raw_text: str,
         fallback_payload: Optional[Dict[str, Any]] = None,
     ) -> ResolvedIntentResult:
@@ -94,31 +149,87 @@ class IntentResolver:
         empty_rag = RagContext(enabled=False, sources=[], context_text="")
 
         if mode == "llm":
-            rag = Retriever.get_context(raw_text)
-            intent = LLMIntentResolver().resolve(
-                raw_text,
-                context=rag.context_text,
-            )
-            return ResolvedIntentResult(intent=intent, rag=rag)
+            return await IntentResolver._resolve_with_llm(raw_text)
 
         if mode == "hybrid":
+            with stage("pre_ai"):
+                pre = PreAIIntentResolver.resolve(
+                    raw_text,
+                    fallback_payload=fallback_payload,
+                )
+
+            if pre.error and settings.entity_resolver_enabled:
+                with stage("entity"):
+                    entity = await EntityIntentResolver.resolve(raw_text)
+                if entity is not None:
+                    return ResolvedIntentResult(intent=entity, rag=empty_rag)
+
+            if pre.error:
+                return await IntentResolver._resolve_with_llm(raw_text)
+
+            return ResolvedIntentResult(intent=pre, rag=empty_rag)
+
+        with stage("pre_ai"):
             pre = PreAIIntentResolver.resolve(
                 raw_text,
                 fallback_payload=fallback_payload,
             )
+        return ResolvedIntentResult(intent=pre, rag=empty_rag)
 
-            if pre.error:
-                rag = Retriever.get_context(raw_text)
-                intent = LLMIntentResolver().resolve(
-                    raw_text,
-                    context=rag.context_text,
-                )
-                return ResolvedIntentResult(intent=intent, rag=rag)
+    @staticmethod
+    async def _resolve_with_llm(raw_text: str) -> ResolvedIntentResult:
+        if not intent_cache.enabled:
+            rag = await Retriever.get_context(raw_text)
+            intent = await LLMIntentResolver().resolve(
+                raw_text,
+                context=rag.context_text,
+            )
+            return ResolvedIntentResult(intent=intent, rag=rag)
 
-            return ResolvedIntentResult(intent=pre, rag=empty_rag)
+        # Repeat phrasing: skip retrieval (embedding) and the chat call
+        cached = await intent_cache.lookup(raw_text)
+        if cached:
+            intent_cache.record_saved(cached.latency_ms)
+            return ResolvedIntentResult(
+                intent=cached.intent,
+                rag=cached.rag,
+                cache={
+                    "hit": True,
+                    "tier": cached.tier,
+                    "stage": "query",
+                    "saved_ms": round(cached.latency_ms, 2),
+                },
+            )
 
-        pre = PreAIIntentResolver.resolve(
+        started = time.perf_counter()
+        rag = await Retriever.get_context(raw_text)
+
+        # Same query and same context: skip the chat call
+        cached = await intent_cache.lookup_with_context(raw_text, rag)
+        if cached:
+            retrieval_ms = (time.perf_counter() - started) * 1000
+            saved_ms = max(0.0, cached.latency_ms - retrieval_ms)
+            intent_cache.record_saved(saved_ms)
+            return ResolvedIntentResult(
+                intent=cached.intent,
+                rag=rag,
+                cache={
+                    "hit": True,
+                    "tier": cached.tier,
+                    "stage": "context",
+                    "saved_ms": round(saved_ms, 2),
+                },
+            )
+
+        intent = await LLMIntentResolver().resolve(
             raw_text,
-            fallback_payload=fallback_payload,
+            context=rag.context_text,
+        )
+        latency_ms = (time.perf_counter() - started) * 1000
+        await intent_cache.store(raw_text, rag, intent, latency_ms)
+
+        return ResolvedIntentResult(
+            intent=intent,
+            rag=rag,
+            cache={"hit": False, "latency_ms": round(latency_ms, 2)},
         )
-        return ResolvedIntentResult(intent=pre, rag=empty_rag)
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from app.services.rag.retriever import RagContext
 
@@ -13,9 +13,13 @@ class ResolvedIntent:
     model: str
     raw_output: Optional[str] = None
     error: Optional[str] = None
+    missing_fields: Optional[List[str]] = None
+    # LLM token usage of the call that produced this intent
+    usage: Optional[Dict[str, int]] = None
 
 
 @dataclass(frozen=True)
 class ResolvedIntentResult:
     intent: ResolvedIntent
     rag: RagContext
+    cache: Optional[Dict[str, Any]] = None
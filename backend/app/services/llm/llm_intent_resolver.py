@@ -1,5 +1,7 @@
 import json
+from hashlib import sha256
 
+from app.infra.metrics import stage
 from app.infra.settings import settings
 from app.services.intent_types import ResolvedIntent
 from app.services.llm.openai_client import OpenAIClient
@@ -26,17 +28,22 @@ Rules:
 - Use CONTEXT only as reference. Do not invent IDs. Output JSON only.
 """.strip()
 
+# Changes whenever the prompt text changes (used to key cached resolutions)
+SYSTEM_PROMPT_VERSION = sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
 
 class LLMIntentResolver:
     def __init__(self) -> None:
         self.client = OpenAIClient()
 
-    def resolve(self, raw_text: str, context: str = "") -> ResolvedIntent:
+    async def resolve(self, raw_text: str, context: str = "") -> ResolvedIntent:
         user_content = raw_text
         if context:
             user_content = f"CONTEXT:\n{context}\n\nUSER_INPUT:\n{raw_text}"
 
-        content = self.client.chat(SYSTEM_PROMPT, user_content)
+        with stage("llm"):
+            completion = await self.client.chat(SYSTEM_PROMPT, user_content)
+        content = completion.content
 
         try:
             data = json.loads(content)
@@ -49,6 +56,7 @@ class LLMIntentResolver:
                 model=settings.openai_model,
                 raw_output=content,
                 error="invalid_json_from_llm",
+                usage=completion.usage,
             )
 
         return ResolvedIntent(
@@ -59,4 +67,5 @@ class LLMIntentResolver:
             model=settings.openai_model,
             raw_output=content,
             error=data.get("error"),
+            usage=completion.usage,
         )
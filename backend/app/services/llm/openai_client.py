@@ -1,15 +1,25 @@
-import httpx
+from dataclasses import dataclass
+from typing import Optional
 
+from app.infra.http_client import http_clients
+from app.infra.metrics import LLM_REQUESTS_TOTAL, LLM_TOKENS_TOTAL
 from app.infra.settings import settings
 
 
+@dataclass(frozen=True)
+class ChatCompletion:
+    content: str
+    # prompt_tokens / completion_tokens / total_tokens as reported by the API
+    usage: Optional[dict[str, int]] = None
+
+
 class OpenAIClient:
     def __init__(self) -> None:
         self.api_key = settings.openai_api_key
         self.model = settings.openai_model
         self.timeout = settings.openai_timeout_seconds
 
-    def chat(self, system_prompt: str, user_prompt: str) -> str:
+    async def chat(self, system_prompt: str, user_prompt: str) -> ChatCompletion:
         if not self.api_key:
             raise RuntimeError("OPENAI_API_KEY is not set")
 
@@ -27,8 +37,30 @@ class OpenAIClient:
             "temperature": 0,
         }
 
-        with httpx.Client(timeout=self.timeout) as client:
-            response = client.post(url, headers=headers, json=payload)
+        client = http_clients.get_async_client()
+        try:
+            response = await client.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=self.timeout,
+            )
             response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
\ No newline at end of file
+        except Exception:
+            LLM_REQUESTS_TOTAL.labels(model=self.model, outcome="error").inc()
+            raise
+        LLM_REQUESTS_TOTAL.labels(model=self.model, outcome="ok").inc()
+
+        data = response.json()
+        usage = {
+            name: int(value)
+            for name, value in (data.get("usage") or {}).items()
+            if name.endswith("_tokens") and isinstance(value, int)
+        }
+        for kind in ("prompt", "completion"):
+            if f"{kind}_tokens" in usage:
+                LLM_TOKENS_TOTAL.labels(model=self.model, kind=kind).inc(usage[f"{kind}_tokens"])
+        return ChatCompletion(
+            content=data["choices"][0]["message"]["content"],
+            usage=usage or None,
+        )
@@ -1,5 +1,6 @@
 import httpx
 
+from app.infra.http_client import http_clients
 from app.infra.settings import settings
 
 
@@ -17,6 +18,57 @@ class OpenAIEmbeddingsClient:
         if not self.api_key:
             return []
 
+        try:
+            return self.embed_texts_strict(texts)
+        except (httpx.HTTPError, KeyError, TypeError, ValueError):
+            return []
+
+    def embed_texts_strict(self, texts: list[str]) -> list[list[float]]:
+        """
+        Like `embed_texts`, but provider errors propagate (httpx.HTTPStatusError,
+        httpx.TransportError) so callers can retry, and a short response raises
+        ValueError instead of returning [].
+        """
+        if not texts:
+            return []
+
+        if not self.api_key:
+            raise RuntimeError("OPENAI_API_KEY is not set")
+
+        url, headers, payload = self._build_request(texts)
+        client = http_clients.get_sync_client()
+        response = client.post(url, headers=headers, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        embeddings = self._parse_embeddings(response.json(), texts)
+        if len(embeddings) != len(texts):
+            raise ValueError(
+                f"Embeddings response has {len(embeddings)} vectors for {len(texts)} inputs"
+            )
+        return embeddings
+
+    async def embed_texts_async(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+
+        if not self.api_key:
+            return []
+
+        url, headers, payload = self._build_request(texts)
+
+        try:
+            client = http_clients.get_async_client()
+            response = await client.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return self._parse_embeddings(response.json(), texts)
+        except (httpx.HTTPError, KeyError, TypeError):
+            return []
+
+    def _build_request(self, texts: list[str]) -> tuple[str, dict, dict]:
         url = "https://api.openai.com/v1/embeddings"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -27,15 +79,11 @@ class OpenAIEmbeddingsClient:
             "input": texts,
             "dimensions": self.dimensions,
         }
+        return url, headers, payload
 
-        try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                data = response.json()
-                embeddings = [item["embedding"] for item in data.get("data", [])]
-                if len(embeddings) != len(texts):
-                    return []
-                return embeddings
-        except (httpx.HTTPError, KeyError, TypeError):
+    @staticmethod
+    def _parse_embeddings(data: dict, texts: list[str]) -> list[list[float]]:
+        embeddings = [item["embedding"] for item in data.get("data", [])]
+        if len(embeddings) != len(texts):
             return []
+        return embeddings
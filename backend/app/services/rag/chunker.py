@@ -1,11 +1,34 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from hashlib import sha256
 from pathlib import Path
+from typing import Iterator, Optional
 
 from app.infra.settings import settings
 
+try:  # optional: exact token counts for the markdown chunker
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+# Rough chars-per-token ratio of OpenAI tokenizers on English/Markdown text
+CHARS_PER_TOKEN = 4
+
+SUPPORTED_CHUNKERS = {"fixed", "markdown", "cdc"}
+
+# cdc: gear table for the rolling hash. Derived from sha256 rather than a PRNG
+# so boundaries (and therefore content hashes) are identical on every machine.
+_GEAR = tuple(
+    int.from_bytes(sha256(bytes([value])).digest()[:4], "big") for value in range(256)
+)
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s+\S")
+LIST_ITEM_PATTERN = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
 
 @dataclass(frozen=True)
 class KnowledgeChunk:
@@ -15,46 +38,120 @@ class KnowledgeChunk:
     content_hash: str
 
 
+@dataclass(frozen=True)
+class _Block:
+    text: str
+    # heading | paragraph | item | table | code
+    kind: str
+
+
 def load_markdown_chunks(base_path: Path) -> list[KnowledgeChunk]:
+    chunks: list[KnowledgeChunk] = []
+    for file_path in iter_markdown_files(base_path):
+        content = read_markdown_file(file_path)
+        if content is None:
+            continue
+        chunks.extend(iter_file_chunks(file_path.name, content))
+    return chunks
+
+
+def iter_markdown_files(base_path: Path) -> Iterator[Path]:
     if not base_path.exists() or not base_path.is_dir():
-        return []
+        return
+    yield from sorted(base_path.glob("*.md"))
 
-    chunk_size = settings.kb_chunk_size
-    chunk_overlap = settings.kb_chunk_overlap
-    chunks: list[KnowledgeChunk] = []
 
-    for file_path in sorted(base_path.glob("*.md")):
-        try:
-            content = file_path.read_text(encoding="utf-8")
-        except OSError:
-            continue
+def read_markdown_file(file_path: Path) -> Optional[str]:
+    try:
+        return file_path.read_text(encoding="utf-8")
+    except OSError:
+        return None
 
-        for index, chunk in enumerate(
-            _split_text(content, chunk_size, chunk_overlap)
-        ):
-            chunk_hash = sha256(chunk.encode("utf-8")).hexdigest()
-            chunks.append(
-                KnowledgeChunk(
-                    source=file_path.name,
-                    chunk_index=index,
-                    content=chunk,
-                    content_hash=chunk_hash,
-                )
-            )
 
-    return chunks
+def iter_file_chunks(
+    source: str,
+    content: str,
+    chunker: Optional[str] = None,
+) -> Iterator[KnowledgeChunk]:
+    for index, chunk in enumerate(split_content(content, chunker)):
+        yield KnowledgeChunk(
+            source=source,
+            chunk_index=index,
+            content=chunk,
+            content_hash=sha256(chunk.encode("utf-8")).hexdigest(),
+        )
 
 
-def _split_text(text: str, size: int, overlap: int) -> list[str]:
+def split_content(content: str, chunker: Optional[str] = None) -> Iterator[str]:
+    chunker = (chunker or settings.kb_chunker).lower()
+    if chunker == "markdown":
+        return _split_markdown(content, settings.kb_chunk_tokens, settings.kb_chunk_min_tokens)
+    if chunker == "fixed":
+        return _split_text(content, settings.kb_chunk_size, settings.kb_chunk_overlap)
+    if chunker == "cdc":
+        return _split_content_defined(content, settings.kb_chunk_size)
+    raise ValueError(
+        f"Unsupported chunker '{chunker}'. "
+        f"Expected one of: {', '.join(sorted(SUPPORTED_CHUNKERS))}."
+    )
+
+
+def chunker_signature(chunker: Optional[str] = None) -> str:
+    """Identifies the chunking configuration; changing it changes chunk boundaries."""
+    chunker = (chunker or settings.kb_chunker).lower()
+    if chunker == "markdown":
+        return (
+            f"markdown:{settings.kb_chunk_tokens}:{settings.kb_chunk_min_tokens}:"
+            f"{_tokenizer_name()}"
+        )
+    if chunker == "cdc":
+        return f"cdc:{settings.kb_chunk_size}"
+    return f"fixed:{settings.kb_chunk_size}:{settings.kb_chunk_overlap}"
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return max(1, len(encoding.encode(text, disallowed_special=())))
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.encoding_for_model(settings.openai_embeddings_model)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:  # BPE files unavailable (offline image)
+                _encoding = None
+    return _encoding
+
+
+def _tokenizer_name() -> str:
+    encoding = _get_encoding()
+    return f"tiktoken-{encoding.name}" if encoding is not None else f"chars{CHARS_PER_TOKEN}"
+
+
+def _split_text(text: str, size: int, overlap: int) -> Iterator[str]:
     if size <= 0:
-        return []
+        return
 
     normalized = text.strip()
     if not normalized:
-        return []
+        return
 
     overlap = max(0, min(overlap, size - 1))
-    chunks: list[str] = []
     start = 0
     length = len(normalized)
 
@@ -62,9 +159,210 @@ def _split_text(text: str, size: int, overlap: int) -> list[str]:
         end = min(start + size, length)
         chunk = normalized[start:end].strip()
         if chunk:
-            chunks.append(chunk)
+            yield chunk
         if end >= length:
             break
         start = end - overlap
 
-    return chunks
+
+def _split_content_defined(text: str, average: int) -> Iterator[str]:
+    """
+    Content-defined chunking: a gear rolling hash over the last ~32 characters
+    marks a boundary when its low bits are zero, so boundaries depend only on
+    nearby text. An edit moves the boundaries around it and leaves every
+    other chunk (and its content_hash) unchanged. Cuts land on the first
+    whitespace after a boundary, never inside a word or UUID. Chunks are
+    between `average // 4` and `average * 2` characters.
+    """
+    normalized = text.strip()
+    if not normalized or average <= 0:
+        return
+
+    minimum = max(1, average // 4)
+    maximum = max(minimum + 1, average * 2)
+    # Boundary probability 1 / 2**bits once past the minimum: mean ~ average.
+    # High bits: the low bits of a gear hash only see the last few characters.
+    bits = max(1, (average - minimum).bit_length() - 1)
+    mask = ((1 << bits) - 1) << (32 - bits)
+
+    start = 0
+    rolling = 0
+    armed = False
+    last_space = -1
+    for position, char in enumerate(normalized):
+        rolling = ((rolling << 1) + _GEAR[ord(char) & 0xFF]) & 0xFFFFFFFF
+        length = position - start + 1
+        if char.isspace():
+            last_space = position
+            if armed:
+                yield from _emit(normalized[start:position])
+                start, rolling, armed = position + 1, 0, False
+                continue
+        if length < minimum:
+            continue
+        if not armed and (rolling & mask) == 0:
+            armed = True
+        if length >= maximum:
+            # Forced cut: fall back to the last whitespace inside the window
+            cut = last_space if last_space > start else position + 1
+            yield from _emit(normalized[start:cut])
+            start, rolling, armed = cut, 0, False
+
+    yield from _emit(normalized[start:])
+
+
+def _emit(chunk: str) -> Iterator[str]:
+    chunk = chunk.strip()
+    if chunk:
+        yield chunk
+
+
+def _split_markdown(text: str, max_tokens: int, min_tokens: int) -> Iterator[str]:
+    """
+    Packs whole Markdown blocks (headings, paragraphs, list items, tables,
+    fenced code) into chunks of at most `max_tokens`. A heading closes the
+    current chunk once it holds `min_tokens`; chunks that start mid-section
+    repeat the section heading. Oversized blocks are cut between lines, then
+    sentences, then words, so identifiers such as UUIDs are never split.
+    """
+    max_tokens = max(1, max_tokens)
+    heading = ""
+    parts: list[_Block] = []
+    used = 0
+
+    for block in _iter_blocks(text):
+        if block.kind == "heading":
+            if parts and used >= min_tokens:
+                yield _join_blocks(parts)
+                parts, used = [], 0
+            heading = block.text
+
+        tokens = count_tokens(block.text)
+        if tokens <= max_tokens:
+            pieces = [(block, tokens)]
+        else:
+            room = max(1, max_tokens - (count_tokens(heading) if heading else 0))
+            pieces = [
+                (_Block(text=piece, kind=block.kind), count_tokens(piece))
+                for piece in _split_block(block, room)
+            ]
+
+        for piece, piece_tokens in pieces:
+            if parts and used + piece_tokens > max_tokens:
+                yield _join_blocks(parts)
+                parts, used = [], 0
+            if not parts and heading and piece.text != heading:
+                parts.append(_Block(text=heading, kind="heading"))
+                used += count_tokens(heading)
+            parts.append(piece)
+            used += piece_tokens
+
+    if parts:
+        yield _join_blocks(parts)
+
+
+def _join_blocks(blocks: list[_Block]) -> str:
+    # Consecutive list items stay a tight list; everything else is a paragraph apart
+    text = blocks[0].text
+    for previous, block in zip(blocks, blocks[1:]):
+        separator = "\n" if previous.kind == block.kind == "item" else "\n\n"
+        text += separator + block.text
+    return text
+
+
+def _iter_blocks(text: str) -> Iterator[_Block]:
+    lines: list[str] = []
+    kind = ""
+    fence: Optional[str] = None
+
+    def flush() -> Iterator[_Block]:
+        if lines:
+            yield _Block(text="\n".join(lines).strip("\n"), kind=kind)
+            lines.clear()
+
+    for line in text.splitlines():
+        if fence is not None:
+            lines.append(line)
+            if line.strip().startswith(fence):
+                yield from flush()
+                fence = None
+            continue
+
+        stripped = line.strip()
+        fence_match = FENCE_PATTERN.match(line)
+        if fence_match:
+            yield from flush()
+            kind, fence = "code", fence_match.group(1)
+            lines.append(line)
+        elif not stripped:
+            yield from flush()
+        elif HEADING_PATTERN.match(stripped):
+            yield from flush()
+            yield _Block(text=stripped, kind="heading")
+        elif stripped.startswith("|"):
+            if kind != "table":
+                yield from flush()
+                kind = "table"
+            lines.append(line)
+        elif LIST_ITEM_PATTERN.match(line):
+            yield from flush()
+            kind = "item"
+            lines.append(line)
+        else:
+            # Continuation lines stay with their list item / paragraph
+            if kind not in ("item", "paragraph") or not lines:
+                yield from flush()
+                kind = "paragraph"
+            lines.append(line)
+
+    yield from flush()
+
+
+def _split_block(block: _Block, max_tokens: int) -> Iterator[str]:
+    if block.kind in ("table", "code", "item") and "\n" in block.text:
+        lines = block.text.split("\n")
+        # Tables keep their header rows on every piece
+        header = lines[:2] if block.kind == "table" and len(lines) > 2 else []
+        units = lines[len(header):]
+        separator = "\n"
+    else:
+        header = []
+        units = SENTENCE_BREAK.split(block.text)
+        separator = " "
+
+    prefix = "\n".join(header)
+    budget = max(1, max_tokens - (count_tokens(prefix) if prefix else 0))
+    current: list[str] = []
+    used = 0
+    for unit in units:
+        for piece in _split_words(unit, budget):
+            tokens = count_tokens(piece)
+            if current and used + tokens > budget:
+                yield _join_piece(prefix, separator.join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += tokens
+    if current:
+        yield _join_piece(prefix, separator.join(current))
+
+
+def _split_words(text: str, max_tokens: int) -> Iterator[str]:
+    if count_tokens(text) <= max_tokens:
+        yield text
+        return
+    current: list[str] = []
+    used = 0
+    for word in text.split():
+        # +1 for the joining space
+        tokens = count_tokens(word) + 1
+        if current and used + tokens > max_tokens:
+            yield " ".join(current)
+            current, used = [], 0
+        current.append(word)
+        used += tokens
+    if current:
+        yield " ".join(current)
+
+
+def _join_piece(prefix: str, body: str) -> str:
+    return f"{prefix}\n{body}" if prefix else body
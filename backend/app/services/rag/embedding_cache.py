@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import re
+import time
+from array import array
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Any, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.infra.models.query_embedding_cache_model import QueryEmbeddingCacheModel
+from app.infra.session import get_async_session
+from app.infra.settings import settings
+from app.infra.ttl_cache import TTLCache
+from app.services.llm.openai_embeddings_client import OpenAIEmbeddingsClient
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# How often a worker deletes expired rows of the postgres tier
+_PURGE_INTERVAL_SECONDS = 600.0
+
+
+def normalize_query_text(text: str) -> str:
+    # Case is kept: embeddings of "Pump" and "pump" are not the same vector
+    return WHITESPACE_PATTERN.sub(" ", (text or "").strip())
+
+
+class QueryEmbeddingCache:
+    """
+    Cache of query embeddings used by vector retrieval.
+
+    Vectors are held as compact float32 `array('f')` buffers (4 bytes per
+    dimension instead of a boxed Python float per item). The optional
+    Postgres tier survives restarts and is shared by every worker; its rows
+    expire after `embedding_cache_postgres_ttl_seconds`.
+    """
+
+    def __init__(self) -> None:
+        self._memory: TTLCache[array] = TTLCache(
+            settings.embedding_cache_max_entries,
+            settings.embedding_cache_ttl_seconds,
+        )
+        self.memory_hits = 0
+        self.postgres_hits = 0
+        self.misses = 0
+        self.purged = 0
+        self._purged_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.embedding_cache_enabled
+
+    @property
+    def persistent(self) -> bool:
+        return settings.embedding_cache_backend == "postgres"
+
+    @staticmethod
+    def cache_key(text: str) -> str:
+        parts = [
+            settings.openai_embeddings_model,
+            settings.openai_embeddings_dim,
+            normalize_query_text(text),
+        ]
+        return sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    async def get_or_embed(self, text: str) -> Optional[array]:
+        """Return the float32 embedding of `text`, calling the provider only on a miss."""
+        if not self.enabled:
+            return await self._embed(text)
+
+        key = self.cache_key(text)
+
+        vector = self._memory.get(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector
+
+        if self.persistent:
+            vector = await self._fetch_persistent(key)
+            if vector is not None:
+                self.postgres_hits += 1
+                self._memory.set(key, vector)
+                return vector
+
+        self.misses += 1
+        vector = await self._embed(text)
+        if vector is None:
+            return None
+
+        self._memory.set(key, vector)
+        if self.persistent:
+            await self._store_persistent(key, vector)
+        return vector
+
+    def clear(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.memory_hits + self.postgres_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": settings.embedding_cache_backend,
+            "entries": len(self._memory),
+            "max_entries": settings.embedding_cache_max_entries,
+            "memory_bytes": len(self._memory) * settings.openai_embeddings_dim * 4,
+            "memory_hits": self.memory_hits,
+            "postgres_hits": self.postgres_hits,
+            "misses": self.misses,
+            "purged": self.purged,
+            "hit_ratio": (
+                round((self.memory_hits + self.postgres_hits) / lookups, 4)
+                if lookups
+                else None
+            ),
+        }
+
+    @staticmethod
+    async def _embed(text: str) -> Optional[array]:
+        embeddings = await OpenAIEmbeddingsClient().embed_texts_async([text])
+        if not embeddings:
+            return None
+        return array("f", embeddings[0])
+
+    @staticmethod
+    async def _fetch_persistent(key: str) -> Optional[array]:
+        try:
+            async with get_async_session() as session:
+                embedding = (
+                    await session.execute(
+                        select(QueryEmbeddingCacheModel.embedding).where(
+                            QueryEmbeddingCacheModel.cache_key == key,
+                            QueryEmbeddingCacheModel.created_at > _expired_before(),
+                        )
+                    )
+                ).scalar_one_or_none()
+        except SQLAlchemyError:
+            return None
+
+        if embedding is None:
+            return None
+        return array("f", embedding)
+
+    async def _store_persistent(self, key: str, vector: array) -> None:
+        stmt = insert(QueryEmbeddingCacheModel).values(
+            cache_key=key,
+            model=settings.openai_embeddings_model,
+            dimensions=settings.openai_embeddings_dim,
+            embedding=vector.tolist(),
+            created_at=datetime.utcnow(),
+        )
+        # An expired row under the same key is renewed
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["cache_key"],
+            set_={"embedding": stmt.excluded.embedding, "created_at": stmt.excluded.created_at},
+        )
+        try:
+            async with get_async_session() as session:
+                await session.execute(stmt)
+                now = time.monotonic()
+                if now - self._purged_at >= _PURGE_INTERVAL_SECONDS:
+                    self._purged_at = now
+                    result = await session.execute(
+                        delete(QueryEmbeddingCacheModel).where(
+                            QueryEmbeddingCacheModel.created_at <= _expired_before()
+                        )
+                    )
+                    self.purged += result.rowcount
+                await session.commit()
+        except SQLAlchemyError:
+            # Best effort: the in-memory tier already holds the vector
+            return
+
+
+def _expired_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=settings.embedding_cache_postgres_ttl_seconds)
+
+
+embedding_cache = QueryEmbeddingCache()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Integer, Text, TextClause, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.infra.settings import settings
+from app.services.command_grammar import parse_command
+
+_MAX_TERMS = 32
+
+
+def extract_uuids(raw_text: str) -> list[str]:
+    return sorted({value.lower() for value in parse_command(raw_text).uuids})
+
+
+def lexical_query(raw_text: str) -> str:
+    """
+    OR of the query terms for `to_tsquery('simple', ...)`. Commands are
+    short and rarely share every word with a chunk, so AND semantics
+    (websearch_to_tsquery) would miss most matches; ts_rank_cd still
+    ranks chunks matching more terms first.
+    """
+    # Parser words are \w+ runs (UUIDs excluded), so the tsquery needs no escaping
+    terms: list[str] = []
+    for term in parse_command(raw_text).words:
+        if len(term) >= 2 and term not in terms:
+            terms.append(term)
+        if len(terms) >= _MAX_TERMS:
+            break
+    return " | ".join(terms)
+
+
+def hybrid_search_sql(with_vector: bool) -> TextClause:
+    """
+    One statement that runs every ranker over `knowledge_chunks` and merges
+    them with reciprocal rank fusion: score = sum(1 / (rrf_k + rank)).
+
+    - ids: chunks whose `uuid_tokens` overlap the UUIDs in the command (GIN)
+    - lex: full-text match on `content_tsv` (GIN)
+    - vec: cosine distance on `embedding` (HNSW/IVFFlat), only when the
+      query was embedded
+    """
+    rankers = [
+        """
+        ids AS (
+            SELECT id,
+                   row_number() OVER (
+                       ORDER BY cardinality(
+                           ARRAY(SELECT unnest(uuid_tokens) INTERSECT SELECT unnest(:uuids))
+                       ) DESC, id
+                   ) AS rank
+            FROM knowledge_chunks
+            WHERE cardinality(:uuids) > 0 AND uuid_tokens && :uuids
+            ORDER BY rank
+            LIMIT :candidates
+        )""",
+        """
+        lex AS (
+            SELECT id,
+                   row_number() OVER (ORDER BY ts_rank_cd(content_tsv, query) DESC, id) AS rank
+            FROM knowledge_chunks, to_tsquery('simple', :lexical) AS query
+            WHERE :lexical <> '' AND content_tsv @@ query
+            ORDER BY rank
+            LIMIT :candidates
+        )""",
+    ]
+    ranked = ["SELECT id, rank FROM ids", "SELECT id, rank FROM lex"]
+    if with_vector:
+        rankers.append(
+            """
+        vec AS (
+            SELECT id, row_number() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT id, embedding <=> CAST(:embedding AS vector) AS distance
+                FROM knowledge_chunks
+                ORDER BY embedding <=> CAST(:embedding AS vector)
+                LIMIT :candidates
+            ) AS nearest
+        )"""
+        )
+        ranked.append("SELECT id, rank FROM vec")
+
+    statement = text(
+        f"""
+        WITH {",".join(rankers)},
+        fused AS (
+            SELECT id, sum(1.0 / (:rrf_k + rank)) AS score
+            FROM ({" UNION ALL ".join(ranked)}) AS ranked
+            GROUP BY id
+        )
+        SELECT chunks.source, chunks.content, fused.score
+        FROM fused
+        JOIN knowledge_chunks AS chunks ON chunks.id = fused.id
+        ORDER BY fused.score DESC, chunks.source, chunks.chunk_index
+        LIMIT :top_k
+        """
+    )
+    params = [
+        bindparam("uuids", type_=ARRAY(Text)),
+        bindparam("lexical", type_=Text),
+        bindparam("candidates", type_=Integer),
+        bindparam("rrf_k", type_=Integer),
+        bindparam("top_k", type_=Integer),
+    ]
+    if with_vector:
+        params.append(bindparam("embedding", type_=Vector(settings.openai_embeddings_dim)))
+    return statement.bindparams(*params)
+
+
+def hybrid_search_params(
+    uuids: list[str],
+    lexical: str,
+    embedding=None,
+) -> dict:
+    params = {
+        "uuids": uuids,
+        "lexical": lexical,
+        "candidates": max(settings.rag_hybrid_candidates, settings.rag_top_k),
+        "rrf_k": settings.rag_hybrid_rrf_k,
+        "top_k": settings.rag_top_k,
+    }
+    if embedding is not None:
+        params["embedding"] = embedding
+    return params
@@ -1,19 +1,41 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import random
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
 from datetime import datetime
+from fnmatch import fnmatch
+from hashlib import sha256
+from itertools import islice
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterator, Optional
 from uuid import uuid4
 
-from sqlalchemy import delete, select, tuple_
+import httpx
+from sqlalchemy import delete, func, select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
+from app.infra.models.kb_ingestion_checkpoint_model import KnowledgeIngestionCheckpointModel
 from app.infra.models.knowledge_chunk_model import KnowledgeChunkModel
 from app.infra.settings import settings
 from app.services.llm.openai_embeddings_client import OpenAIEmbeddingsClient
-from app.services.rag.chunker import KnowledgeChunk, load_markdown_chunks
+from app.services.rag.chunker import (
+    KnowledgeChunk,
+    chunker_signature,
+    estimate_tokens,
+    iter_file_chunks,
+    iter_markdown_files,
+    read_markdown_file,
+)
+from app.services.rag.kb_snapshot import UUID_PATTERN
 
 
 @dataclass(frozen=True)
@@ -23,112 +45,637 @@ class IngestionSummary:
     deleted: int
     skipped: int
     total: int
+    # Chunks whose embedding batch still failed after every retry
+    failed: int = 0
+    failed_batches: int = 0
+    retries: int = 0
+    # Changed chunks whose vector was copied from identical text instead of embedded
+    reused: int = 0
+    files: int = 0
+    files_done: int = 0
+    # Files left untouched because their checkpoint still matches
+    files_unchanged: int = 0
+    # Sources gone from the knowledge base whose chunks and checkpoint were removed
+    files_removed: int = 0
+    embedded_tokens: int = 0
+    elapsed_seconds: float = 0.0
+    dry_run: bool = False
 
 
-def ingest_knowledge_base(session: Session) -> IngestionSummary:
+@dataclass(frozen=True)
+class IngestionOptions:
+    workers: int = 1
+    # fnmatch patterns over file names; empty means every file
+    sources: tuple[str, ...] = ()
+    dry_run: bool = False
+    # Ignore checkpoints and re-read every file
+    full: bool = False
+
+
+@dataclass(frozen=True)
+class _PreparedFile:
+    source: str
+    mtime_ns: int
+    size: int
+    file_hash: str
+    chunks: tuple[KnowledgeChunk, ...]
+
+
+@dataclass
+class _PendingChunk:
+    chunk: KnowledgeChunk
+    is_update: bool
+    tokens: int = 0
+
+
+@dataclass
+class _Counters:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    total: int = 0
+    failed: int = 0
+    failed_batches: int = 0
+    retries: int = 0
+    reused: int = 0
+    files: int = 0
+    files_done: int = 0
+    files_unchanged: int = 0
+    files_removed: int = 0
+    embedded_tokens: int = 0
+
+
+@dataclass
+class _EmbeddingBatch:
+    items: list[_PendingChunk] = field(default_factory=list)
+    tokens: int = 0
+
+    def fits(self, tokens: int) -> bool:
+        if not self.items:
+            return True
+        return (
+            self.tokens + tokens <= settings.kb_embed_batch_tokens
+            and len(self.items) < settings.kb_embed_batch_max_items
+        )
+
+    def add(self, item: _PendingChunk, tokens: int) -> None:
+        self.items.append(item)
+        self.tokens += tokens
+
+    def drain(self) -> list[_PendingChunk]:
+        items, self.items, self.tokens = self.items, [], 0
+        return items
+
+
+def ingest_knowledge_base(
+    session: Session,
+    options: Optional[IngestionOptions] = None,
+    progress: Optional[Callable[[IngestionSummary], None]] = None,
+) -> IngestionSummary:
+    """
+    Stream the knowledge base into `knowledge_chunks`.
+
+    Files are read, chunked and hashed on a process pool (`options.workers`)
+    and consumed here as they complete. The existing-row lookup fetches only
+    (chunk_index, content_hash) for one source at a time, and changed chunks
+    are embedded in batches bounded by `kb_embed_batch_tokens`; every batch
+    is upserted and committed as soon as it comes back, so memory stays flat
+    regardless of corpus size. Up to `kb_embed_concurrency` batches are in
+    flight at once; a batch that keeps failing is counted in `failed`
+    without discarding the others.
+
+    Vectors are content-addressed: a changed chunk whose text already exists
+    anywhere in `knowledge_chunks` (or is already queued in this run) reuses
+    that vector instead of being embedded again. Combined with KB_CHUNKER=cdc,
+    an edit only re-embeds the chunks around it.
+
+    A file is checkpointed in `kb_ingestion_checkpoints` once all of its
+    chunks are stored, so an interrupted run resumes at the first
+    unfinished file without reading the finished ones again. Chunks and
+    checkpoints of files no longer in the knowledge base are deleted at the
+    end of the run.
+    """
+    options = options or IngestionOptions()
+    started = time.perf_counter()
     base_path = Path(settings.knowledge_base_path)
-    chunks = load_markdown_chunks(base_path)
-
-    if not chunks:
-        return IngestionSummary(inserted=0, updated=0, deleted=0, skipped=0, total=0)
-
-    sources = sorted({chunk.source for chunk in chunks})
-    existing_rows = session.execute(
-        select(KnowledgeChunkModel).where(KnowledgeChunkModel.source.in_(sources))
-    ).scalars().all()
-
-    existing_map = {
-        (row.source, row.chunk_index): row for row in existing_rows
-    }
-    incoming_map = {
-        (chunk.source, chunk.chunk_index): chunk for chunk in chunks
-    }
-
-    to_embed: list[KnowledgeChunk] = []
-    skipped = 0
-    inserted = 0
-    updated = 0
-    for chunk in chunks:
-        existing = existing_map.get((chunk.source, chunk.chunk_index))
-        if existing and existing.content_hash == chunk.content_hash:
-            skipped += 1
+    counters = _Counters()
+    chunker = chunker_signature()
+
+    checkpoints = {} if options.full else _load_checkpoints(session)
+    paths = []
+    present: set[str] = set()
+    for file_path in iter_markdown_files(base_path):
+        present.add(file_path.name)
+        if options.sources and not any(
+            fnmatch(file_path.name, pattern) for pattern in options.sources
+        ):
             continue
-        if existing:
-            updated += 1
-        else:
-            inserted += 1
-        to_embed.append(chunk)
-
-    embeddings_client = OpenAIEmbeddingsClient()
-    embeddings = _embed_chunks(embeddings_client, to_embed)
-
-    if embeddings or not to_embed:
-        deleted = 0
-        to_delete = [
-            (source, chunk_index)
-            for (source, chunk_index) in existing_map.keys()
-            if (source, chunk_index) not in incoming_map
-        ]
-        if to_delete:
-            delete_stmt = delete(KnowledgeChunkModel).where(
-                tuple_(KnowledgeChunkModel.source, KnowledgeChunkModel.chunk_index).in_(
-                    to_delete
-                )
-            )
-            deleted = session.execute(delete_stmt).rowcount or 0
-
-        now = datetime.utcnow()
-        rows = []
-        for chunk, embedding in zip(to_embed, embeddings):
-            rows.append(
-                {
-                    "id": str(uuid4()),
-                    "source": chunk.source,
-                    "chunk_index": chunk.chunk_index,
-                    "content": chunk.content,
-                    "content_hash": chunk.content_hash,
-                    "embedding": embedding,
-                    "created_at": now,
-                    "updated_at": now,
-                }
-            )
+        counters.files += 1
+        if _checkpoint_matches(checkpoints.get(file_path.name), file_path, chunker):
+            counters.files_unchanged += 1
+            counters.files_done += 1
+            continue
+        paths.append(file_path)
 
-        if rows:
-            stmt = insert(KnowledgeChunkModel).values(rows)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=["source", "chunk_index"],
-                set_={
-                    "content": stmt.excluded.content,
-                    "content_hash": stmt.excluded.content_hash,
-                    "embedding": stmt.excluded.embedding,
-                    "updated_at": stmt.excluded.updated_at,
-                },
-            )
-            session.execute(stmt)
+    def report() -> None:
+        if progress is not None:
+            progress(_summary(counters, started, options.dry_run))
 
-        session.commit()
-    else:
-        deleted = 0
+    if options.dry_run:
+        planned: set[str] = set()
+        for prepared in _iter_prepared(paths, options.workers):
+            _plan_file(session, prepared, planned, counters)
+            report()
+        _remove_missing_sources(session, base_path, present, options, counters)
+        session.rollback()
+        return _summary(counters, started, dry_run=True)
 
+    tracker = _CheckpointTracker(session, chunker, counters)
+    stage = _EmbeddingStage(session, OpenAIEmbeddingsClient(), counters, tracker, report)
+    try:
+        for prepared in _iter_prepared(paths, options.workers):
+            _ingest_file(session, prepared, stage, tracker, counters)
+            report()
+        stage.flush()
+    finally:
+        stage.close()
+    _remove_missing_sources(session, base_path, present, options, counters)
+    session.commit()
+    report()
+
+    return _summary(counters, started, dry_run=False)
+
+
+def _summary(counters: _Counters, started: float, dry_run: bool) -> IngestionSummary:
     return IngestionSummary(
-        inserted=inserted if embeddings else 0,
-        updated=updated if embeddings else 0,
-        deleted=deleted,
-        skipped=skipped if embeddings else skipped + len(to_embed),
-        total=len(chunks),
+        inserted=counters.inserted,
+        updated=counters.updated,
+        deleted=counters.deleted,
+        skipped=counters.skipped,
+        total=counters.total,
+        failed=counters.failed,
+        failed_batches=counters.failed_batches,
+        retries=counters.retries,
+        reused=counters.reused,
+        files=counters.files,
+        files_done=counters.files_done,
+        files_unchanged=counters.files_unchanged,
+        files_removed=counters.files_removed,
+        embedded_tokens=counters.embedded_tokens,
+        elapsed_seconds=time.perf_counter() - started,
+        dry_run=dry_run,
+    )
+
+
+def _load_checkpoints(session: Session) -> dict[str, KnowledgeIngestionCheckpointModel]:
+    rows = session.execute(select(KnowledgeIngestionCheckpointModel)).scalars().all()
+    return {row.source: row for row in rows}
+
+
+def _checkpoint_matches(
+    checkpoint: Optional[KnowledgeIngestionCheckpointModel],
+    file_path: Path,
+    chunker: str,
+) -> bool:
+    if checkpoint is None or checkpoint.chunker != chunker:
+        return False
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return False
+    return checkpoint.mtime_ns == stat.st_mtime_ns and checkpoint.size == stat.st_size
+
+
+def _remove_missing_sources(
+    session: Session,
+    base_path: Path,
+    present: set[str],
+    options: IngestionOptions,
+    counters: _Counters,
+) -> None:
+    """
+    Deletes the chunks and checkpoints of sources whose file is gone (only
+    counted on a dry run). With `options.sources`, only matching sources
+    are considered.
+    """
+    if not base_path.is_dir():
+        # Unmounted or misconfigured path: not a reason to empty the table
+        return
+
+    known = set(session.execute(select(KnowledgeChunkModel.source).distinct()).scalars())
+    known.update(session.execute(select(KnowledgeIngestionCheckpointModel.source)).scalars())
+    missing = sorted(
+        source
+        for source in known - present
+        if not options.sources or any(fnmatch(source, pattern) for pattern in options.sources)
+    )
+    if not missing:
+        return
+
+    counters.files_removed += len(missing)
+    if options.dry_run:
+        counters.deleted += session.execute(
+            select(func.count())
+            .select_from(KnowledgeChunkModel)
+            .where(KnowledgeChunkModel.source.in_(missing))
+        ).scalar_one()
+        return
+
+    result = session.execute(
+        delete(KnowledgeChunkModel).where(KnowledgeChunkModel.source.in_(missing))
+    )
+    counters.deleted += result.rowcount or 0
+    session.execute(
+        delete(KnowledgeIngestionCheckpointModel).where(
+            KnowledgeIngestionCheckpointModel.source.in_(missing)
+        )
+    )
+
+
+def _prepare_file(file_path: Path) -> Optional[_PreparedFile]:
+    # Runs in a worker process: read, chunk and hash one file
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return None
+    content = read_markdown_file(file_path)
+    if content is None:
+        return None
+    return _PreparedFile(
+        source=file_path.name,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        file_hash=sha256(content.encode("utf-8")).hexdigest(),
+        chunks=tuple(iter_file_chunks(file_path.name, content)),
+    )
+
+
+def _iter_prepared(paths: list[Path], workers: int) -> Iterator[_PreparedFile]:
+    """Yields prepared files in completion order with a bounded number in flight."""
+    if workers <= 1:
+        for file_path in paths:
+            prepared = _prepare_file(file_path)
+            if prepared is not None:
+                yield prepared
+        return
+
+    window = workers * 2
+    remaining = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = {executor.submit(_prepare_file, path) for path in islice(remaining, window)}
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for path in islice(remaining, len(done)):
+                in_flight.add(executor.submit(_prepare_file, path))
+            for future in done:
+                prepared = future.result()
+                if prepared is not None:
+                    yield prepared
+
+
+def _existing_hashes(session: Session, source: str) -> dict[int, str]:
+    return dict(
+        session.execute(
+            select(
+                KnowledgeChunkModel.chunk_index,
+                KnowledgeChunkModel.content_hash,
+            ).where(KnowledgeChunkModel.source == source)
+        ).all()
     )
 
 
-def _embed_chunks(
+def _known_embeddings(session: Session, hashes: set[str]) -> dict[str, list[float]]:
+    if not hashes:
+        return {}
+    rows = session.execute(
+        select(KnowledgeChunkModel.content_hash, KnowledgeChunkModel.embedding)
+        .where(KnowledgeChunkModel.content_hash.in_(hashes))
+        .distinct(KnowledgeChunkModel.content_hash)
+    ).all()
+    return {content_hash: embedding for content_hash, embedding in rows}
+
+
+def _ingest_file(
+    session: Session,
+    prepared: _PreparedFile,
+    stage: "_EmbeddingStage",
+    tracker: "_CheckpointTracker",
+    counters: _Counters,
+) -> None:
+    existing_hashes = _existing_hashes(session, prepared.source)
+    tracker.begin(prepared)
+
+    changed: list[_PendingChunk] = []
+    for chunk in prepared.chunks:
+        counters.total += 1
+
+        existing_hash = existing_hashes.get(chunk.chunk_index)
+        if existing_hash == chunk.content_hash:
+            counters.skipped += 1
+            continue
+        changed.append(_PendingChunk(chunk=chunk, is_update=existing_hash is not None))
+
+    # Looked up before this file's own rows are overwritten, so text that only
+    # moved to another chunk_index keeps its vector
+    known = _known_embeddings(session, {item.chunk.content_hash for item in changed})
+    reused = [item for item in changed if item.chunk.content_hash in known]
+    if reused:
+        _write_batch(
+            session,
+            reused,
+            [known[item.chunk.content_hash] for item in reused],
+            counters,
+        )
+        counters.reused += len(reused)
+
+    for item in changed:
+        if item.chunk.content_hash not in known:
+            tracker.add_pending(prepared.source)
+            stage.add(item)
+
+    # Chunk indexes are contiguous, so anything past the new count is stale
+    chunk_count = len(prepared.chunks)
+    if any(index >= chunk_count for index in existing_hashes):
+        result = session.execute(
+            delete(KnowledgeChunkModel).where(
+                KnowledgeChunkModel.source == prepared.source,
+                KnowledgeChunkModel.chunk_index >= chunk_count,
+            )
+        )
+        counters.deleted += result.rowcount or 0
+
+    tracker.finish(prepared.source)
+
+
+def _plan_file(
+    session: Session,
+    prepared: _PreparedFile,
+    planned: set[str],
+    counters: _Counters,
+) -> None:
+    existing_hashes = _existing_hashes(session, prepared.source)
+    changed = []
+    for chunk in prepared.chunks:
+        counters.total += 1
+        existing_hash = existing_hashes.get(chunk.chunk_index)
+        if existing_hash == chunk.content_hash:
+            counters.skipped += 1
+            continue
+        if existing_hash is None:
+            counters.inserted += 1
+        else:
+            counters.updated += 1
+        changed.append(chunk)
+
+    known = _known_embeddings(session, {chunk.content_hash for chunk in changed})
+    for chunk in changed:
+        if chunk.content_hash in known or chunk.content_hash in planned:
+            counters.reused += 1
+        else:
+            planned.add(chunk.content_hash)
+            counters.embedded_tokens += estimate_tokens(chunk.content)
+    counters.deleted += sum(1 for index in existing_hashes if index >= len(prepared.chunks))
+    counters.files_done += 1
+
+
+@dataclass
+class _FileState:
+    prepared: _PreparedFile
+    pending: int = 0
+    open: bool = True
+    failed: bool = False
+
+
+class _CheckpointTracker:
+    """
+    Marks a file as done once every chunk queued for it has been stored.
+    Files with a failed batch are left without a checkpoint so the next run
+    picks them up again.
+    """
+
+    def __init__(self, session: Session, chunker: str, counters: _Counters) -> None:
+        self._session = session
+        self._chunker = chunker
+        self._counters = counters
+        self._files: dict[str, _FileState] = {}
+
+    def begin(self, prepared: _PreparedFile) -> None:
+        self._files[prepared.source] = _FileState(prepared=prepared)
+
+    def add_pending(self, source: str) -> None:
+        self._files[source].pending += 1
+
+    def finish(self, source: str) -> None:
+        state = self._files[source]
+        state.open = False
+        self._maybe_complete(source, state)
+
+    def settle(self, items: list[_PendingChunk], ok: bool) -> None:
+        for item in items:
+            source = item.chunk.source
+            state = self._files[source]
+            state.pending -= 1
+            state.failed = state.failed or not ok
+            self._maybe_complete(source, state)
+
+    def _maybe_complete(self, source: str, state: _FileState) -> None:
+        if state.open or state.pending > 0:
+            return
+        del self._files[source]
+        self._counters.files_done += 1
+        if state.failed:
+            return
+
+        prepared = state.prepared
+        values = {
+            "source": prepared.source,
+            "file_hash": prepared.file_hash,
+            "mtime_ns": prepared.mtime_ns,
+            "size": prepared.size,
+            "chunker": self._chunker,
+            "chunk_count": len(prepared.chunks),
+            "updated_at": datetime.utcnow(),
+        }
+        stmt = insert(KnowledgeIngestionCheckpointModel).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["source"],
+            set_={key: stmt.excluded[key] for key in values if key != "source"},
+        )
+        self._session.execute(stmt)
+
+
+class _EmbeddingStage:
+    """
+    Embeds batches on a bounded thread pool and writes the results back on
+    the caller's thread (the SQLAlchemy session is not thread-safe). Identical
+    texts are sent once per run.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        client: OpenAIEmbeddingsClient,
+        counters: _Counters,
+        tracker: _CheckpointTracker,
+        on_batch: Callable[[], None],
+    ) -> None:
+        self._session = session
+        self._client = client
+        self._counters = counters
+        self._tracker = tracker
+        self._on_batch = on_batch
+        self._concurrency = max(1, settings.kb_embed_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._concurrency,
+            thread_name_prefix="kb-embed",
+        )
+        self._in_flight: dict[Future, list[_PendingChunk]] = {}
+        self._batch = _EmbeddingBatch()
+        # content_hash -> chunks waiting on it (queued or in flight); the first
+        # one is the item actually sent, the rest share its vector
+        self._waiting: dict[str, list[_PendingChunk]] = {}
+
+    def add(self, item: _PendingChunk) -> None:
+        content_hash = item.chunk.content_hash
+        waiting = self._waiting.get(content_hash)
+        if waiting is not None:
+            waiting.append(item)
+            return
+
+        item.tokens = estimate_tokens(item.chunk.content)
+        if not self._batch.fits(item.tokens):
+            self._submit(self._batch.drain())
+        self._waiting[content_hash] = [item]
+        self._batch.add(item, item.tokens)
+
+    def flush(self) -> None:
+        self._submit(self._batch.drain())
+
+    def _submit(self, items: list[_PendingChunk]) -> None:
+        if not items:
+            return
+        while len(self._in_flight) >= self._concurrency:
+            self._collect(FIRST_COMPLETED)
+        texts = [item.chunk.content for item in items]
+        future = self._executor.submit(_embed_with_retry, self._client, texts)
+        self._in_flight[future] = items
+
+    def close(self) -> None:
+        try:
+            while self._in_flight:
+                self._collect(FIRST_COMPLETED)
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _collect(self, return_when: str) -> None:
+        done, _ = wait(self._in_flight, return_when=return_when)
+        for future in done:
+            sent = self._in_flight.pop(future)
+            groups = [self._waiting.pop(item.chunk.content_hash) for item in sent]
+            items = [item for group in groups for item in group]
+            embeddings, retries = future.result()
+            self._counters.retries += retries
+            if embeddings is None:
+                self._counters.failed += len(items)
+                self._counters.failed_batches += 1
+                self._tracker.settle(items, ok=False)
+            else:
+                vectors = [
+                    embedding
+                    for group, embedding in zip(groups, embeddings)
+                    for _ in group
+                ]
+                self._counters.reused += len(items) - len(sent)
+                _write_batch(self._session, items, vectors, self._counters)
+                self._tracker.settle(items, ok=True)
+            self._session.commit()
+            self._on_batch()
+
+
+def _embed_with_retry(
     client: OpenAIEmbeddingsClient,
-    chunks: Iterable[KnowledgeChunk],
-) -> list[list[float]]:
-    chunk_list = list(chunks)
-    if not chunk_list:
-        return []
-
-    texts = [chunk.content for chunk in chunk_list]
-    embeddings = client.embed_texts(texts)
-    if len(embeddings) != len(chunk_list):
-        return []
-    return embeddings
+    texts: list[str],
+) -> tuple[Optional[list[list[float]]], int]:
+    """Returns (embeddings or None when every attempt failed, retries used)."""
+    max_retries = max(0, settings.kb_embed_max_retries)
+    for attempt in range(max_retries + 1):
+        try:
+            return client.embed_texts_strict(texts), attempt
+        except httpx.HTTPStatusError as exc:
+            status = exc.response.status_code
+            if status != 429 and status < 500:
+                return None, attempt
+            delay = _retry_after_seconds(exc.response)
+        except httpx.TransportError:
+            delay = None
+        except (KeyError, TypeError, ValueError, RuntimeError):
+            return None, attempt
+
+        if attempt == max_retries:
+            break
+        if delay is None:
+            # Exponential backoff with full jitter
+            ceiling = settings.kb_embed_backoff_seconds * (2 ** attempt)
+            delay = random.uniform(0, min(settings.kb_embed_backoff_max_seconds, ceiling))
+        time.sleep(min(delay, settings.kb_embed_backoff_max_seconds))
+
+    return None, max_retries
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _write_batch(
+    session: Session,
+    items: list[_PendingChunk],
+    embeddings: list[list[float]],
+    counters: _Counters,
+) -> None:
+    if not items:
+        return
+
+    now = datetime.utcnow()
+    rows = []
+    for item, embedding in zip(items, embeddings):
+        chunk = item.chunk
+        rows.append(
+            {
+                "id": str(uuid4()),
+                "source": chunk.source,
+                "chunk_index": chunk.chunk_index,
+                "content": chunk.content,
+                "content_hash": chunk.content_hash,
+                "embedding": embedding,
+                "uuid_tokens": sorted(
+                    {value.lower() for value in UUID_PATTERN.findall(chunk.content)}
+                ),
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+        counters.embedded_tokens += item.tokens
+        if item.is_update:
+            counters.updated += 1
+        else:
+            counters.inserted += 1
+
+    stmt = insert(KnowledgeChunkModel).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["source", "chunk_index"],
+        set_={
+            "content": stmt.excluded.content,
+            "content_hash": stmt.excluded.content_hash,
+            "embedding": stmt.excluded.embedding,
+            "uuid_tokens": stmt.excluded.uuid_tokens,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    session.execute(stmt)
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from app.infra.settings import settings
+
+UUID_PATTERN = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+)
+
+# (file name, mtime_ns, size) for every *.md file, in sorted order
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+@dataclass(frozen=True)
+class KnowledgeBaseSnapshot:
+    content_map: Dict[str, str]
+    # lower-cased UUID -> files (sorted) that mention it
+    uuid_index: Dict[str, Tuple[str, ...]]
+    signature: Signature = field(default=())
+
+    def files_for_uuids(self, uuids) -> list[str]:
+        matched: set[str] = set()
+        for value in uuids:
+            matched.update(self.uuid_index.get(value.lower(), ()))
+        return [name for name in self.content_map if name in matched]
+
+
+class KnowledgeBaseCache:
+    """
+    Loaded copy of the lite-mode knowledge base.
+
+    Files are read once and re-read only when their mtime or size changes.
+    The directory is re-stat'ed at most every `kb_snapshot_check_seconds`,
+    or right away when inotify reports a change (Linux only; network mounts
+    rarely deliver events, so the periodic check always stays on).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: Optional[KnowledgeBaseSnapshot] = None
+        self._base_path: Optional[Path] = None
+        self._checked_at = 0.0
+        self._dirty = True
+        self._watcher: Optional[_InotifyWatcher] = None
+        self.rebuilds = 0
+        self.files_read = 0
+
+    def get(self, base_path: Path) -> Optional[KnowledgeBaseSnapshot]:
+        with self._lock:
+            if base_path != self._base_path:
+                self._reset(base_path)
+
+            now = time.monotonic()
+            if (
+                self._snapshot is not None
+                and not self._dirty
+                and now - self._checked_at < settings.kb_snapshot_check_seconds
+            ):
+                return self._snapshot
+
+            self._dirty = False
+            self._checked_at = now
+            signature = _scan(base_path)
+            if signature is None:
+                self._snapshot = None
+                return None
+
+            if self._snapshot is None or signature != self._snapshot.signature:
+                self._snapshot = self._build(base_path, signature)
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        self._dirty = True
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "files": len(snapshot.content_map) if snapshot else 0,
+            "uuids": len(snapshot.uuid_index) if snapshot else 0,
+            "inotify": self._watcher is not None,
+            "rebuilds": self.rebuilds,
+            "files_read": self.files_read,
+        }
+
+    def _reset(self, base_path: Path) -> None:
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+        self._base_path = base_path
+        self._snapshot = None
+        self._dirty = True
+        if settings.kb_snapshot_inotify and base_path.is_dir():
+            self._watcher = _InotifyWatcher.start(base_path, self.invalidate)
+
+    def _build(self, base_path: Path, signature: Signature) -> KnowledgeBaseSnapshot:
+        previous = self._snapshot
+        previous_stats = {entry[0]: entry for entry in previous.signature} if previous else {}
+
+        content_map: Dict[str, str] = {}
+        readable: list[tuple[str, int, int]] = []
+        for entry in signature:
+            name = entry[0]
+            if previous and previous_stats.get(name) == entry and name in previous.content_map:
+                content_map[name] = previous.content_map[name]
+                readable.append(entry)
+                continue
+            try:
+                content_map[name] = (base_path / name).read_text(encoding="utf-8")
+            except OSError:
+                continue
+            readable.append(entry)
+            self.files_read += 1
+
+        uuid_index: Dict[str, list[str]] = {}
+        for name, content in content_map.items():
+            for value in {match.lower() for match in UUID_PATTERN.findall(content)}:
+                uuid_index.setdefault(value, []).append(name)
+
+        self.rebuilds += 1
+        return KnowledgeBaseSnapshot(
+            content_map=content_map,
+            uuid_index={key: tuple(names) for key, names in uuid_index.items()},
+            signature=tuple(readable),
+        )
+
+
+def _scan(base_path: Path) -> Optional[Signature]:
+    if not base_path.exists() or not base_path.is_dir():
+        return None
+
+    entries = []
+    for file_path in sorted(base_path.glob("*.md")):
+        try:
+            stat = file_path.stat()
+        except OSError:
+            continue
+        entries.append((file_path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+class _InotifyWatcher:
+    # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    # | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    MASK = 0x2 | 0x4 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x400 | 0x800
+
+    def __init__(self, fd: int, on_change: Callable[[], None]) -> None:
+        self._fd = fd
+        self._on_change = on_change
+        # Self-pipe: a byte written here wakes the thread out of poll() so it
+        # exits before the inotify fd is closed under it
+        self._wake_read, self._wake_write = os.pipe()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="kb-inotify",
+            daemon=True,
+        )
+        self._thread.start()
+
+    @classmethod
+    def start(cls, path: Path, on_change: Callable[[], None]) -> Optional["_InotifyWatcher"]:
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, os.fsencode(str(path)), cls.MASK) < 0:
+                os.close(fd)
+                return None
+        except (OSError, AttributeError):
+            return None
+        return cls(fd, on_change)
+
+    def close(self) -> None:
+        """Stops the thread, then closes the descriptors it was polling."""
+        try:
+            os.write(self._wake_write, b"x")
+        except OSError:
+            pass
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        for fd in (self._fd, self._wake_read, self._wake_write):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        poller.register(self._wake_read, select.POLLIN)
+        while True:
+            try:
+                ready = {fd for fd, _ in poller.poll()}
+            except OSError:
+                return
+            if self._wake_read in ready:
+                return
+            try:
+                data = os.read(self._fd, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            self._on_change()
+
+
+kb_cache = KnowledgeBaseCache()
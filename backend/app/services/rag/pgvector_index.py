@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from app.infra.settings import settings
+
+INDEX_NAME = "ix_knowledge_chunks_embedding"
+SUPPORTED_INDEX_TYPES = {"hnsw", "ivfflat"}
+
+
+def create_index_sql(
+    table: str = "knowledge_chunks",
+    column: str = "embedding",
+    index_name: str = INDEX_NAME,
+    index_type: Optional[str] = None,
+    concurrently: bool = False,
+) -> str:
+    """
+    DDL for the ANN index. The operator class must match the query operator:
+    the retriever orders by `<=>` (cosine distance), so `vector_cosine_ops`.
+    """
+    index_type = (index_type or settings.pgvector_index_type).lower()
+    if index_type not in SUPPORTED_INDEX_TYPES:
+        raise ValueError(
+            f"Unsupported pgvector index type '{index_type}'. "
+            f"Expected one of: {', '.join(sorted(SUPPORTED_INDEX_TYPES))}."
+        )
+
+    if index_type == "hnsw":
+        options = (
+            f"m = {int(settings.pgvector_hnsw_m)}, "
+            f"ef_construction = {int(settings.pgvector_hnsw_ef_construction)}"
+        )
+    else:
+        options = f"lists = {int(settings.pgvector_ivfflat_lists)}"
+
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index_name} "
+        f"ON {table} USING {index_type} ({column} vector_cosine_ops) WITH ({options})"
+    )
+
+
+def drop_index_sql(index_name: str = INDEX_NAME, concurrently: bool = False) -> str:
+    return f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {index_name}"
+
+
+def search_tuning_sql(
+    index_type: Optional[str] = None,
+    min_results: int = 0,
+) -> list[str]:
+    """
+    Transaction-scoped knobs for the recall/latency trade-off of ANN queries.
+    Must run inside the same transaction as the search (SET LOCAL).
+    HNSW returns at most ef_search rows, so it is raised to `min_results`
+    when a caller needs a larger candidate pool.
+    """
+    index_type = (index_type or settings.pgvector_index_type).lower()
+    if index_type == "hnsw":
+        ef_search = max(int(settings.pgvector_hnsw_ef_search), int(min_results))
+        return [f"SET LOCAL hnsw.ef_search = {ef_search}"]
+    if index_type == "ivfflat":
+        return [f"SET LOCAL ivfflat.probes = {int(settings.pgvector_ivfflat_probes)}"]
+    return []
@@ -1,19 +1,26 @@
-import re
+import asyncio
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional
 
-from sqlalchemy import select
+import numpy as np
+from sqlalchemy import select, text
 
+from app.infra.metrics import stage
 from app.infra.models.knowledge_chunk_model import KnowledgeChunkModel
-from app.infra.session import get_session
 from app.infra.settings import settings
-from app.services.llm.openai_embeddings_client import OpenAIEmbeddingsClient
-
-UUID_PATTERN = re.compile(
-    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+from app.infra.unit_of_work import request_session
+from app.services.command_grammar import parse_command
+from app.services.rag.embedding_cache import embedding_cache
+from app.services.rag.hybrid_search import (
+    extract_uuids,
+    hybrid_search_params,
+    hybrid_search_sql,
+    lexical_query,
 )
-
+from app.services.rag.kb_snapshot import KnowledgeBaseSnapshot, kb_cache
+from app.services.rag.pgvector_index import search_tuning_sql
+from app.services.rag.vector_index import vector_index
 
 @dataclass(frozen=True)
 class RagContext:
@@ -27,7 +34,7 @@ class RagContext:
 
 class Retriever:
     @staticmethod
-    def get_context(raw_text: str) -> RagContext:
+    async def get_context(raw_text: str) -> RagContext:
         raw_text = (raw_text or "").strip()
 
         if settings.rag_mode == "off":
@@ -41,10 +48,17 @@ class Retriever:
             )
 
         if settings.rag_mode == "lite":
-            return Retriever._get_lite_context(raw_text)
+            # File I/O stays off the event loop
+            return await asyncio.to_thread(Retriever._get_lite_context, raw_text)
 
         if settings.rag_mode == "vector":
-            return Retriever._get_vector_context(raw_text)
+            return await Retriever._get_vector_context(raw_text)
+
+        if settings.rag_mode == "vector_local":
+            return await Retriever._get_vector_local_context(raw_text)
+
+        if settings.rag_mode == "hybrid":
+            return await Retriever._get_hybrid_context(raw_text)
 
         # Unknown mode -> behave like off (safe default) but expose mode
         return RagContext(
@@ -58,26 +72,18 @@ class Retriever:
 
     @staticmethod
     def _get_lite_context(raw_text: str) -> RagContext:
-        base_path = Path(settings.knowledge_base_path)
-        if not base_path.exists() or not base_path.is_dir():
-            return RagContext(enabled=True, sources=[], context_text="", mode="lite")
-
-        files = sorted(base_path.glob("*.md"))
-        if not files:
-            return RagContext(enabled=True, sources=[], context_text="", mode="lite")
-
-        content_map: Dict[str, str] = {}
-        for file_path in files:
-            try:
-                content_map[file_path.name] = file_path.read_text(encoding="utf-8")
-            except OSError:
-                continue
-
-        if not content_map:
-            return RagContext(enabled=True, sources=[], context_text="", mode="lite")
-
-        selected_files = Retriever._select_files(raw_text, content_map)
-        context_text, sources = Retriever._build_context(selected_files, content_map)
+        # Files are read once and re-read only when their mtime/size changes
+        with stage("rag_search"):
+            snapshot = kb_cache.get(Path(settings.knowledge_base_path))
+            if snapshot is None or not snapshot.content_map:
+                return RagContext(enabled=True, sources=[], context_text="", mode="lite")
+            selected_files = Retriever._select_files(raw_text, snapshot)
+
+        with stage("rag_context"):
+            context_text, sources = Retriever._build_context(
+                selected_files,
+                snapshot.content_map,
+            )
 
         return RagContext(
             enabled=True,
@@ -89,7 +95,7 @@ class Retriever:
         )
 
     @staticmethod
-    def _get_vector_context(raw_text: str) -> RagContext:
+    async def _get_vector_context(raw_text: str) -> RagContext:
         # If raw_text is empty, avoid embedding call
         if not raw_text:
             return RagContext(
@@ -101,9 +107,9 @@ class Retriever:
                 retrieved_chunks=0,
             )
 
-        embeddings_client = OpenAIEmbeddingsClient()
-        embeddings = embeddings_client.embed_texts([raw_text])
-        if not embeddings:
+        with stage("rag_embed"):
+            query_embedding = await embedding_cache.get_or_embed(raw_text)
+        if query_embedding is None:
             return RagContext(
                 enabled=True,
                 sources=[],
@@ -113,48 +119,129 @@ class Retriever:
                 retrieved_chunks=0,
             )
 
-        with get_session() as session:
-            has_rows = session.execute(select(KnowledgeChunkModel.id).limit(1)).first()
-            if not has_rows:
-                return RagContext(
-                    enabled=True,
-                    sources=[],
-                    context_text="",
-                    mode="vector",
-                    top_k=settings.rag_top_k,
-                    retrieved_chunks=0,
+        # An empty table simply returns no rows: no separate existence probe
+        with stage("rag_search"):
+            async with request_session(release=True) as session:
+                for statement in search_tuning_sql():
+                    await session.execute(text(statement))
+
+                embedding = query_embedding.tolist()
+                stmt = (
+                    select(KnowledgeChunkModel)
+                    .order_by(KnowledgeChunkModel.embedding.cosine_distance(embedding))
+                    .limit(settings.rag_top_k)
                 )
+                results = (await session.execute(stmt)).scalars().all()
+
+        with stage("rag_context"):
+            context_text, sources = Retriever._build_vector_context(results)
+
+        return RagContext(
+            enabled=True,
+            sources=sources,
+            context_text=context_text,
+            mode="vector",
+            top_k=settings.rag_top_k,
+            retrieved_chunks=len(results),
+        )
 
-            embedding = embeddings[0]
-            stmt = (
-                select(KnowledgeChunkModel)
-                .order_by(KnowledgeChunkModel.embedding.cosine_distance(embedding))
-                .limit(settings.rag_top_k)
+    @staticmethod
+    async def _get_vector_local_context(raw_text: str) -> RagContext:
+        empty_context = RagContext(
+            enabled=True,
+            sources=[],
+            context_text="",
+            mode="vector_local",
+            top_k=settings.rag_top_k,
+            retrieved_chunks=0,
+        )
+        if not raw_text:
+            return empty_context
+
+        # Normally kept warm by the background refresher started with the app
+        await vector_index.ensure_loaded()
+        if vector_index.size == 0:
+            return empty_context
+
+        with stage("rag_embed"):
+            query_embedding = await embedding_cache.get_or_embed(raw_text)
+        if query_embedding is None:
+            return empty_context
+
+        with stage("rag_search"):
+            results = vector_index.search(
+                np.frombuffer(query_embedding, dtype=np.float32),
+                settings.rag_top_k,
             )
-            results = session.execute(stmt).scalars().all()
+        with stage("rag_context"):
+            context_text, sources = Retriever._build_vector_context(results)
 
-        context_text, sources = Retriever._build_vector_context(results)
+        return RagContext(
+            enabled=True,
+            sources=sources,
+            context_text=context_text,
+            mode="vector_local",
+            top_k=settings.rag_top_k,
+            retrieved_chunks=len(results),
+        )
+
+    @staticmethod
+    async def _get_hybrid_context(raw_text: str) -> RagContext:
+        if not raw_text:
+            return RagContext(
+                enabled=True,
+                sources=[],
+                context_text="",
+                mode="hybrid",
+                top_k=settings.rag_top_k,
+                retrieved_chunks=0,
+            )
+
+        uuids = extract_uuids(raw_text)
+        # Exact-ID commands are answered by the UUID and full-text rankers;
+        # embeddings add little there, so the embedding call is skipped
+        query_embedding = None
+        if not uuids:
+            with stage("rag_embed"):
+                query_embedding = await embedding_cache.get_or_embed(raw_text)
+
+        with_vector = query_embedding is not None
+        params = hybrid_search_params(
+            uuids=uuids,
+            lexical=lexical_query(raw_text),
+            embedding=query_embedding.tolist() if with_vector else None,
+        )
+
+        with stage("rag_search"):
+            async with request_session(release=True) as session:
+                if with_vector:
+                    for statement in search_tuning_sql(min_results=params["candidates"]):
+                        await session.execute(text(statement))
+                results = (
+                    await session.execute(hybrid_search_sql(with_vector), params)
+                ).all()
+
+        with stage("rag_context"):
+            context_text, sources = Retriever._build_vector_context(results)
 
         return RagContext(
             enabled=True,
             sources=sources,
             context_text=context_text,
-            mode="vector",
+            mode="hybrid",
             top_k=settings.rag_top_k,
             retrieved_chunks=len(results),
         )
 
     @staticmethod
-    def _select_files(raw_text: str, content_map: Dict[str, str]) -> List[str]:
+    def _select_files(raw_text: str, snapshot: KnowledgeBaseSnapshot) -> List[str]:
+        content_map = snapshot.content_map
         filenames = list(content_map.keys())
         policies_name = "policies.md" if "policies.md" in content_map else None
-        found_uuids = set(UUID_PATTERN.findall(raw_text or ""))
+        found_uuids = set(parse_command(raw_text).uuids)
 
         if found_uuids:
-            matched = []
-            for name in filenames:
-                if any(uuid in content_map[name] for uuid in found_uuids):
-                    matched.append(name)
+            matched = snapshot.files_for_uuids(found_uuids)
             if policies_name and policies_name not in matched:
                 matched.append(policies_name)
             return matched
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.infra.models.knowledge_chunk_model import KnowledgeChunkModel
+from app.infra.session import get_async_session
+from app.infra.settings import settings
+
+try:  # optional: approximate search for large knowledge bases
+    import hnswlib
+except ImportError:  # pragma: no cover - depends on the environment
+    hnswlib = None
+
+
+@dataclass(frozen=True)
+class IndexedChunk:
+    id: str
+    source: str
+    content: str
+    content_hash: str
+    # Bumped when the embedding is rewritten, even with unchanged content
+    # (re-embedding with another model)
+    updated_at: datetime
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    chunks: list[IndexedChunk]
+    matrix: np.ndarray
+    hnsw: Any = None
+
+
+class LocalVectorIndex:
+    """
+    In-process index over `knowledge_chunks` embeddings for `rag_mode=vector_local`.
+
+    Embeddings live in one contiguous, L2-normalized float32 matrix, so cosine
+    similarity for every chunk is a single matrix-vector product. Above
+    `rag_local_hnsw_threshold` rows an hnswlib graph is used instead (when the
+    package is installed). The index follows the table by polling
+    `count(*)`/`max(updated_at)` and fetching only rows whose `content_hash`
+    or `updated_at` changed; searches read an immutable snapshot and never wait on a refresh.
+    """
+
+    def __init__(self) -> None:
+        self._snapshot = _Snapshot(
+            chunks=[],
+            matrix=np.empty((0, settings.openai_embeddings_dim), dtype=np.float32),
+        )
+        self._vectors: dict[str, np.ndarray] = {}
+        self._chunks: dict[str, IndexedChunk] = {}
+        self._version: Optional[tuple[int, Optional[datetime]]] = None
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.rows_fetched = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._snapshot.chunks)
+
+    async def ensure_loaded(self) -> None:
+        if not self._loaded:
+            await self.refresh()
+
+    async def refresh(self) -> bool:
+        """Sync with the table. Returns True when the index changed."""
+        async with self._lock:
+            self._last_refresh = time.monotonic()
+            async with get_async_session() as session:
+                version = tuple(
+                    (
+                        await session.execute(
+                            select(
+                                func.count(KnowledgeChunkModel.id),
+                                func.max(KnowledgeChunkModel.updated_at),
+                            )
+                        )
+                    ).one()
+                )
+                if self._loaded and version == self._version:
+                    return False
+
+                current = {
+                    row.id: (row.content_hash, row.updated_at)
+                    for row in await session.execute(
+                        select(
+                            KnowledgeChunkModel.id,
+                            KnowledgeChunkModel.content_hash,
+                            KnowledgeChunkModel.updated_at,
+                        )
+                    )
+                }
+                removed = [
+                    chunk_id for chunk_id in self._chunks if chunk_id not in current
+                ]
+                changed = [
+                    chunk_id
+                    for chunk_id, stamp in current.items()
+                    if chunk_id not in self._chunks
+                    or (self._chunks[chunk_id].content_hash, self._chunks[chunk_id].updated_at)
+                    != stamp
+                ]
+
+                for chunk_id in removed:
+                    self._chunks.pop(chunk_id, None)
+                    self._vectors.pop(chunk_id, None)
+
+                for offset in range(0, len(changed), 500):
+                    batch = changed[offset : offset + 500]
+                    rows = await session.execute(
+                        select(
+                            KnowledgeChunkModel.id,
+                            KnowledgeChunkModel.source,
+                            KnowledgeChunkModel.content,
+                            KnowledgeChunkModel.content_hash,
+                            KnowledgeChunkModel.updated_at,
+                            KnowledgeChunkModel.embedding,
+                        ).where(KnowledgeChunkModel.id.in_(batch))
+                    )
+                    for row in rows:
+                        self._chunks[row.id] = IndexedChunk(
+                            id=row.id,
+                            source=row.source,
+                            content=row.content,
+                            content_hash=row.content_hash,
+                            updated_at=row.updated_at,
+                        )
+                        self._vectors[row.id] = _normalize(
+                            np.asarray(row.embedding, dtype=np.float32)
+                        )
+                        self.rows_fetched += 1
+
+            self._version = version
+            self._loaded = True
+            self.refreshes += 1
+
+            if removed or changed or not self._snapshot.chunks:
+                self._snapshot = await asyncio.to_thread(self._build_snapshot)
+                return True
+            return False
+
+    def search(self, query: np.ndarray, top_k: int) -> list[IndexedChunk]:
+        snapshot = self._snapshot
+        count = len(snapshot.chunks)
+        if count == 0 or top_k <= 0:
+            return []
+
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        k = min(top_k, count)
+
+        if snapshot.hnsw is not None:
+            labels, _ = snapshot.hnsw.knn_query(query, k=k)
+            return [snapshot.chunks[int(label)] for label in labels[0]]
+
+        scores = snapshot.matrix @ query
+        if k < count:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(count)
+        ordered = candidates[np.argsort(-scores[candidates])]
+        return [snapshot.chunks[int(index)] for index in ordered]
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "loaded": self._loaded,
+            "chunks": len(snapshot.chunks),
+            "engine": "hnsw" if snapshot.hnsw is not None else "brute_force",
+            "matrix_bytes": int(snapshot.matrix.nbytes),
+            "refreshes": self.refreshes,
+            "rows_fetched": self.rows_fetched,
+            "seconds_since_refresh": (
+                round(time.monotonic() - self._last_refresh, 1) if self._loaded else None
+            ),
+        }
+
+    def _build_snapshot(self) -> _Snapshot:
+        chunks = sorted(self._chunks.values(), key=lambda c: (c.source, c.id))
+        dim = settings.openai_embeddings_dim
+        if chunks:
+            matrix = np.ascontiguousarray(
+                np.vstack([self._vectors[chunk.id] for chunk in chunks]),
+                dtype=np.float32,
+            )
+        else:
+            matrix = np.empty((0, dim), dtype=np.float32)
+
+        hnsw = None
+        if hnswlib is not None and len(chunks) >= settings.rag_local_hnsw_threshold:
+            hnsw = hnswlib.Index(space="ip", dim=matrix.shape[1])
+            hnsw.init_index(
+                max_elements=len(chunks),
+                M=settings.rag_local_hnsw_m,
+                ef_construction=settings.rag_local_hnsw_ef_construction,
+            )
+            hnsw.add_items(matrix, np.arange(len(chunks)))
+            hnsw.set_ef(max(settings.rag_local_hnsw_ef_search, settings.rag_top_k))
+
+        return _Snapshot(chunks=chunks, matrix=matrix, hnsw=hnsw)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Keep serving the last snapshot; try again on the next tick
+                pass
+            await asyncio.sleep(settings.rag_local_refresh_seconds)
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return vector
+    return vector / norm
+
+
+vector_index = LocalVectorIndex()
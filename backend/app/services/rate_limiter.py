@@ -1,28 +1,287 @@
 import threading
 import time
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Optional, TypeVar
 
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.infra.session import get_async_session
 from app.infra.settings import settings
 
+WINDOW_SECONDS = 60
+
+S = TypeVar("S")
+
+
+def parse_role_limits(raw: str) -> dict[str, int]:
+    """"admin=600,runner=120" -> {"admin": 600, "runner": 120}; bad entries are ignored."""
+    limits: dict[str, int] = {}
+    for item in (raw or "").split(","):
+        role, _, value = item.partition("=")
+        try:
+            limit = int(value)
+        except ValueError:
+            continue
+        if role.strip():
+            limits[role.strip()] = limit
+    return limits
+
+
+class _StripedMap(Generic[S]):
+    """
+    Per-key state spread over lock stripes, so requests for different keys
+    rarely contend. Each stripe drops idle entries every `evict_seconds`.
+    """
+
+    def __init__(self, stripes: int, evict_seconds: float) -> None:
+        self._stripes = [({}, threading.Lock()) for _ in range(max(1, stripes))]
+        self._swept_at = [time.monotonic()] * len(self._stripes)
+        self.evict_seconds = evict_seconds
+        self.evictions = 0
+
+    def update(
+        self,
+        key: str,
+        now: float,
+        apply: Callable[[Optional[S]], tuple[S, Any]],
+        idle: Callable[[S, float], bool],
+    ) -> Any:
+        """Runs `apply` on the key's state under its stripe lock and stores the new state."""
+        index = hash(key) % len(self._stripes)
+        entries, lock = self._stripes[index]
+        with lock:
+            if now - self._swept_at[index] >= self.evict_seconds:
+                stale = [entry_key for entry_key, state in entries.items() if idle(state, now)]
+                for entry_key in stale:
+                    del entries[entry_key]
+                self.evictions += len(stale)
+                self._swept_at[index] = now
+            state, result = apply(entries.get(key))
+            entries[key] = state
+            return result
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries, _ in self._stripes)
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated_at: float
+    rate: float
+    capacity: float
+
+
+class MemoryRateLimiter:
+    """
+    Token bucket per key (capacity = limit, refilled over one minute), in
+    this process only: with N workers each key gets up to N x limit.
+    """
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._buckets: _StripedMap[_Bucket] = _StripedMap(
+            settings.rate_limit_stripes,
+            settings.rate_limit_evict_seconds,
+        )
+
+    async def allow(self, key: str, limit: int) -> bool:
+        return self.take(key, limit)
+
+    def take(self, key: str, limit: int) -> bool:
+        now = time.monotonic()
+        rate = limit / WINDOW_SECONDS
+
+        def consume(bucket: Optional[_Bucket]) -> tuple[_Bucket, bool]:
+            if bucket is None:
+                bucket = _Bucket(float(limit), now, rate, float(limit))
+            else:
+                bucket.tokens = min(limit, bucket.tokens + (now - bucket.updated_at) * rate)
+                bucket.updated_at, bucket.rate, bucket.capacity = now, rate, float(limit)
+            if bucket.tokens < 1:
+                return bucket, False
+            bucket.tokens -= 1
+            return bucket, True
+
+        return self._buckets.update(key, now, consume, _bucket_full)
+
+    def stats(self) -> dict[str, Any]:
+        return {"keys": len(self._buckets), "evictions": self._buckets.evictions}
+
+
+def _bucket_full(bucket: _Bucket, now: float) -> bool:
+    # A full bucket behaves exactly like a missing one
+    return bucket.tokens + (now - bucket.updated_at) * bucket.rate >= bucket.capacity
+
+
+@dataclass
+class _Lease:
+    tokens: int = 0
+    expires_at: float = 0.0
+    # The shared bucket was empty: deny locally until a token can have refilled
+    empty_until: float = 0.0
+
+
+# One statement refills the shared bucket, takes up to :lease whole tokens and
+# returns how many were granted. SET expressions see the row's previous values.
+_LEASE_SQL = text(
+    """
+    INSERT INTO rate_limit_buckets AS bucket (key, tokens, granted, updated_at)
+    VALUES (:key, :capacity - LEAST(:lease, :capacity), LEAST(:lease, :capacity), now())
+    ON CONFLICT (key) DO UPDATE SET
+        granted = LEAST(:lease, floor(LEAST(
+            :capacity,
+            bucket.tokens + EXTRACT(EPOCH FROM now() - bucket.updated_at) * :rate
+        ))),
+        tokens = LEAST(
+            :capacity,
+            bucket.tokens + EXTRACT(EPOCH FROM now() - bucket.updated_at) * :rate
+        ) - LEAST(:lease, floor(LEAST(
+            :capacity,
+            bucket.tokens + EXTRACT(EPOCH FROM now() - bucket.updated_at) * :rate
+        ))),
+        updated_at = now()
+    RETURNING granted
+    """
+)
+
+# Idle buckets have refilled completely, so dropping them changes nothing
+_EVICT_SQL = text(
+    "DELETE FROM rate_limit_buckets "
+    "WHERE updated_at < now() - make_interval(secs => :idle_seconds)"
+)
+
+
+class PostgresRateLimiter:
+    """
+    Token buckets shared by every worker through `rate_limit_buckets`.
+
+    Workers lease a few tokens per round trip and spend them locally until
+    the lease runs out or expires, so most requests never touch the
+    database. Leased tokens are already deducted from the shared bucket:
+    the limit holds across workers and hosts, and tokens left in an expired
+    lease are simply lost. When the database is unavailable the per-process
+    limiter takes over.
+    """
+
+    name = "postgres"
+
+    def __init__(self) -> None:
+        self._leases: _StripedMap[_Lease] = _StripedMap(
+            settings.rate_limit_stripes,
+            settings.rate_limit_evict_seconds,
+        )
+        self._fallback = MemoryRateLimiter()
+        self._evicted_at = time.monotonic()
+        self.db_calls = 0
+        self.db_errors = 0
+
+    async def allow(self, key: str, limit: int) -> bool:
+        if limit <= 0:
+            return False
+        now = time.monotonic()
+
+        def spend(lease: Optional[_Lease]) -> tuple[_Lease, Optional[bool]]:
+            lease = lease or _Lease()
+            if lease.tokens > 0 and lease.expires_at > now:
+                lease.tokens -= 1
+                return lease, True
+            if lease.empty_until > now:
+                return lease, False
+            return lease, None
+
+        decision = self._leases.update(key, now, spend, _lease_idle)
+        if decision is not None:
+            return decision
+
+        try:
+            granted = await self._take_lease(key, limit)
+        except SQLAlchemyError:
+            self.db_errors += 1
+            return self._fallback.take(key, limit)
+
+        now = time.monotonic()
+
+        def store(lease: Optional[_Lease]) -> tuple[_Lease, bool]:
+            lease = lease or _Lease()
+            if granted <= 0:
+                lease.tokens = 0
+                lease.empty_until = now + WINDOW_SECONDS / limit
+                return lease, False
+            # One of the granted tokens pays for this request
+            lease.tokens = granted - 1
+            lease.expires_at = now + settings.rate_limit_lease_seconds
+            lease.empty_until = 0.0
+            return lease, True
+
+        return self._leases.update(key, now, store, _lease_idle)
+
+    async def _take_lease(self, key: str, limit: int) -> int:
+        self.db_calls += 1
+        params = {
+            "key": key,
+            "capacity": float(limit),
+            "lease": max(1, min(settings.rate_limit_lease_size, limit)),
+            "rate": limit / WINDOW_SECONDS,
+        }
+        async with get_async_session() as session:
+            granted = (await session.execute(_LEASE_SQL, params)).scalar_one()
+            now = time.monotonic()
+            if now - self._evicted_at >= settings.rate_limit_evict_seconds:
+                self._evicted_at = now
+                await session.execute(_EVICT_SQL, {"idle_seconds": WINDOW_SECONDS * 2})
+            await session.commit()
+        return int(granted)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "keys": len(self._leases),
+            "evictions": self._leases.evictions,
+            "db_calls": self.db_calls,
+            "db_errors": self.db_errors,
+            "fallback": self._fallback.stats(),
+        }
+
+
+def _lease_idle(lease: _Lease, now: float) -> bool:
+    return lease.expires_at <= now and lease.empty_until <= now
+
+
+class RateLimiter:
+    """Per-role limits in front of the configured backend."""
+
+    def __init__(self) -> None:
+        self.role_limits = parse_role_limits(settings.rate_limit_role_limits)
+        self.default_limit = settings.rate_limit_per_minute
+        if settings.rate_limit_backend == "postgres":
+            self.backend = PostgresRateLimiter()
+        else:
+            self.backend = MemoryRateLimiter()
+        self.allowed = 0
+        self.denied = 0
+
+    def limit_for(self, role: Optional[str]) -> int:
+        return self.role_limits.get(role or "", self.default_limit)
+
+    async def allow(self, key: str, role: Optional[str] = None) -> bool:
+        allowed = await self.backend.allow(key, self.limit_for(role))
+        if allowed:
+            self.allowed += 1
+        else:
+            self.denied += 1
+        return allowed
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "default_limit": self.default_limit,
+            "role_limits": self.role_limits,
+            "allowed": self.allowed,
+            "denied": self.denied,
+            **self.backend.stats(),
+        }
+
 
-class FixedWindowRateLimiter:
-    def __init__(self, limit: int, window_seconds: int = 60) -> None:
-        self.limit = limit
-        self.window_seconds = window_seconds
-        self._lock = threading.Lock()
-        self._state: dict[str, tuple[float, int]] = {}
-
-    def allow(self, key: str) -> bool:
-        now = time.time()
-        with self._lock:
-            window_start, count = self._state.get(key, (now, 0))
-            if now - window_start >= self.window_seconds:
-                window_start = now
-                count = 0
-            if count >= self.limit:
-                self._state[key] = (window_start, count)
-                return False
-            self._state[key] = (window_start, count + 1)
-            return True
-
-
-rate_limiter = FixedWindowRateLimiter(settings.rate_limit_per_minute)
+rate_limiter = RateLimiter()